@@ -1,9 +1,35 @@
+import asyncio
+import contextvars
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from LLMBackend import backend_for
+from RetryPolicy import (FATAL, VALIDATION, DEFAULT_TRANSPORT_POLICY, DEFAULT_VALIDATION_POLICY,
+                         classify_error, failure_kind)
+
+# Set while a sync race candidate runs; once the race is decided the losers'
+# streams see it and close, which stops their generations on the server
+_race_cancel = contextvars.ContextVar("race_cancel", default=None)
+
+
+def _race_decided():
+    """True in a sync race candidate whose race another candidate already won."""
+    cancel = _race_cancel.get()
+    return cancel is not None and cancel.is_set()
+
+
+def _settle_race(result):
+    """Decides the sync race the current candidate is part of if `result` wins it."""
+    cancel = _race_cancel.get()
+    if cancel is not None and result.get("success"):
+        cancel.set()
 
-import ollama
 
 class Agent:
-    def __init__(self, name, model_config, validate_fn=None, llm_fn=None, system="", prompt="", context="", retry_limit=3, expected_inputs=1):
+    def __init__(self, name, model_config, validate_fn=None, llm_fn=None, system="", prompt="", context="", retry_limit=3, expected_inputs=1,
+                 retry_policy=None, validation_retry_policy=None, stream_validate_fn=None):
         self.name = name
         self.model_config = model_config
         self.system = system
@@ -15,53 +41,156 @@ class Agent:
         self.received_inputs = []
         self.validate_fn = validate_fn if validate_fn else self.default_validate
         self.llm_fn = llm_fn if llm_fn else self.default_llm_fn
+        self.retry_policy = retry_policy or DEFAULT_TRANSPORT_POLICY                          # Connection/server errors
+        self.validation_retry_policy = validation_retry_policy or DEFAULT_VALIDATION_POLICY  # validate_fn rejections
+        self.stream_validate_fn = stream_validate_fn  # Checks streamed text as it grows (see stream_validators)
 
     def execute(self, user_input):
         """Agent processes data. This function must be implemented by subclasses."""
         raise NotImplementedError("Execute method must be implemented by subclasses.")
 
+    async def aexecute(self, user_input):
+        """Async version of execute. By default runs the synchronous execute in a worker thread."""
+        return await asyncio.to_thread(self.execute, user_input)
+
+    def get_model_name(self):
+        """Name of the model this agent calls, or None for agents without one."""
+        if isinstance(self.model_config, dict):
+            return self.model_config.get("model")
+        return None
+
+    def _execute_attempt(self, input_data, run_context=None):
+        """One execute call, holding a per-model slot when the run has a model limiter."""
+        limiter = getattr(run_context, "model_limiter", None)
+        model = self.get_model_name()
+        if limiter is None or model is None:
+            return self.execute(input_data)
+        with limiter.slot(model):
+            # A race candidate that waited for its slot may have lost already
+            if _race_decided():
+                return {"output": None, "success": False, "error": "Race already decided"}
+            result = self.execute(input_data)
+            # Decided before the slot is released, so a waiting loser sees it
+            _settle_race(result)
+            return result
+
+    async def _aexecute_attempt(self, input_data, run_context=None):
+        """Async version of _execute_attempt; the limiter slot is awaited on the event loop."""
+        limiter = getattr(run_context, "model_limiter", None)
+        model = self.get_model_name()
+        if limiter is None or model is None:
+            return await self.aexecute(input_data)
+        await limiter.aacquire(model)
+        try:
+            return await self.aexecute(input_data)
+        finally:
+            limiter.release(model)
+
     def validate(self, result):
         """Validate the result using the provided validation function."""
         return self.validate_fn(result)
 
-    def should_retry(self):
+    def should_retry(self, run_context=None):
         """Check if the agent can retry based on the retry limit."""
-        return self.retry_count < self.retry_limit
+        return self.get_retry_count(run_context) < self.retry_limit
+
+    def get_retry_count(self, run_context=None):
+        """Failed attempts so far, tracked on the run context when one is given."""
+        if run_context is None:
+            return self.retry_count
+        return run_context.retry_counts.get(self.name, 0)
+
+    def _record_retry(self, run_context=None):
+        if run_context is None:
+            self.retry_count += 1
+        else:
+            run_context.retry_counts[self.name] = run_context.retry_counts.get(self.name, 0) + 1
 
-    def reset_retry(self):
+    def reset_retry(self, run_context=None):
         """Resets retry count after a successful execution."""
-        self.retry_count = 0
+        if run_context is None:
+            self.retry_count = 0
+        else:
+            run_context.retry_counts.pop(self.name, None)
 
-    def receive_input(self, user_input):
-        """Aggregates input data until the expected number of inputs is received."""
-        self.received_inputs.append(user_input)
-        if len(self.received_inputs) == self.expected_inputs:
-            if len(self.received_inputs) == 1:
+    def receive_input(self, user_input, run_context=None, expected_inputs=None):
+        """
+        Aggregates input data until the expected number of inputs is received.
+        Inputs are buffered on the run context when one is given, so concurrent
+        runs never see each other's partial fan-in. `expected_inputs` overrides
+        the hand-set count (the engine passes the join count of its plan).
+        """
+        if expected_inputs is None:
+            expected_inputs = self.expected_inputs
+        if run_context is None:
+            received_inputs = self.received_inputs
+        else:
+            received_inputs = run_context.pending_inputs.setdefault(self.name, [])
+        received_inputs.append(user_input)
+        if len(received_inputs) == expected_inputs:
+            if len(received_inputs) == 1:
                 # Single input - return as is
-                combined_input = self.received_inputs[0]
+                combined_input = received_inputs[0]
             else:
                 # Multiple inputs - join strings or handle complex objects
                 string_inputs = []
-                for inp in self.received_inputs:
+                for inp in received_inputs:
                     if isinstance(inp, str):
                         string_inputs.append(inp)
                     else:
                         string_inputs.append(str(inp))
                 combined_input = " | ".join(string_inputs)
             
-            self.received_inputs = []
+            received_inputs.clear()
             return combined_input
         return None
 
-    def run_with_retries(self, input_data):
-        """Executes the agent with retry logic."""
-        while self.should_retry():
-            result = self.execute(input_data)
+    def _retry_delay(self, result, run_context=None):
+        """
+        Records a failed attempt and returns the seconds to wait before the next
+        one, or None when the agent should stop retrying (fatal error, retry
+        limit or policy exhausted, or the run's retry budget used up).
+        """
+        self._record_retry(run_context)
+        retries = self.get_retry_count(run_context)
+        kind = failure_kind(result)
+        print(f" #################################### Agent {self.name}: Retry {retries}/{self.retry_limit} failed ({kind})")
+
+        if kind == FATAL or not self.should_retry(run_context):
+            return None
+        policy = self.validation_retry_policy if kind == VALIDATION else self.retry_policy
+        if not policy.allows(retries):
+            return None
+        budget = getattr(run_context, "retry_budget", None)
+        if budget is not None and not budget.try_spend():
+            print(f" #################################### Agent {self.name}: Run retry budget exhausted")
+            return None
+        return policy.delay(retries)
+
+    def run_with_retries(self, input_data, run_context=None):
+        """Executes the agent, retrying failures according to its retry policies."""
+        while self.should_retry(run_context):
+            result = self._execute_attempt(input_data, run_context)
             if result["success"]:
                 return result  # Success
-            else:
-                self.retry_count += 1
-                print(f" #################################### Agent {self.name}: Retry {self.retry_count}/{self.retry_limit} failed")
+            delay = self._retry_delay(result, run_context)
+            if delay is None:
+                break
+            if delay:
+                time.sleep(delay)
+        return {"output": None, "success": False}  # Failure after retries
+
+    async def arun_with_retries(self, input_data, run_context=None):
+        """Async version of run_with_retries built on aexecute."""
+        while self.should_retry(run_context):
+            result = await self._aexecute_attempt(input_data, run_context)
+            if result["success"]:
+                return result  # Success
+            delay = self._retry_delay(result, run_context)
+            if delay is None:
+                break
+            if delay:
+                await asyncio.sleep(delay)
         return {"output": None, "success": False}  # Failure after retries
 
     def default_validate(self, result):
@@ -75,50 +204,302 @@ class Agent:
         return f"{input_data}"
 
 class LLMAgent(Agent):
-    def execute(self, user_input):
-        """Executes the LLM using the ollama API."""
-        print(f" #################################### Agent {self.name}: Executing with input: {user_input}")
-        
-        # Extract clean content from input if it's a dictionary
+    def _clean_input(self, user_input):
+        """Extract clean content from input if it's a dictionary"""
         if isinstance(user_input, dict):
             if 'output' in user_input:
-                clean_input = user_input['output']
-            else:
-                clean_input = str(user_input)
-        else:
-            clean_input = user_input
-            
+                return user_input['output']
+            return str(user_input)
+        return user_input
+
+    def _build_messages(self, clean_input):
+        """Builds the chat messages sent to the model."""
         full_prompt = f"{self.context}\n\n{self.prompt}\n\n{clean_input}"
-        messages = [
+        return [
             {"role": "system", "content": self.system},
             {"role": "user", "content": full_prompt}
         ]
 
+    def _chat_options(self):
+        """Model options taken from model_config."""
+        return {
+            "temperature": self.model_config["temperature"],
+            "top_p": self.model_config["top_p"],
+            "frequency_penalty": self.model_config["frequency_penalty"],
+            "presence_penalty": self.model_config["presence_penalty"]
+        }
+
+    def get_backend(self):
+        """LLM backend from model_config ("backend" or "host", else the default Ollama host)."""
+        return backend_for(self.model_config)
+
+    def _chat(self, **request):
+        """Sends a chat request to the backend, hedged when model_config["hedging"] is set."""
+        hedging = self.model_config.get("hedging")
+        if hedging is None:
+            return self.get_backend().chat(**request)
+        return hedging.chat(self.get_backend(), (self.name, request.get("model")), **request)
+
+    async def _achat(self, **request):
+        """Async version of _chat."""
+        hedging = self.model_config.get("hedging")
+        if hedging is None:
+            return await self.get_backend().achat(**request)
+        return await hedging.achat(self.get_backend(), (self.name, request.get("model")), **request)
+
+    def _publish_token(self, stream_id, content, done=False):
+        """Publishes a piece of a streamed response as a `token` chat event."""
+        # Import here so agents stay usable without the chat layer
+        from ChatInterface import chat_event_bus, ChatEvent
+        event_bus = self.model_config.get("event_bus") or chat_event_bus
+        event_bus.publish(ChatEvent("token", {
+            "sender": self.name,
+            "stream_id": stream_id,
+            "content": content,
+            "done": done
+        }))
+
+    def _streaming(self):
+        """True when responses are streamed: for token events, a stream validator or a sync race."""
+        return (bool(self.model_config.get("stream")) or self.stream_validate_fn is not None
+                or _race_cancel.get() is not None)
+
+    def _check_stream(self, text):
+        """stream_validate_fn verdict on the text so far: False aborts, True accepts the rest, None keeps checking."""
+        verdict = self.stream_validate_fn(text)
+        if verdict is False:
+            print(f" #################################### Agent {self.name}: stream validator aborted the generation after {len(text)} chars")
+        return verdict
+
+    def _stream_chat(self, **request):
+        """
+        Streams a chat response. Pieces are published as token events when
+        model_config["stream"] is set and checked by stream_validate_fn as the
+        text grows. Returns the complete text, or None when the validator
+        aborted the generation or a sync race it was part of was decided
+        (closing the stream stops it on the server).
+        Streamed requests are not hedged.
+        """
+        publish = self.model_config.get("stream")
+        checking = self.stream_validate_fn is not None
+        stream_id = uuid.uuid4().hex
+        text = ""
+        if _race_decided():
+            return None
+        stream = self.get_backend().chat(stream=True, **request)
         try:
-            response = ollama.chat(
-                model=self.model_config["model"],
-                stream=False,
-                messages=messages,
-                options={
-                    "temperature": self.model_config["temperature"],
-                    "top_p": self.model_config["top_p"],
-                    "frequency_penalty": self.model_config["frequency_penalty"],
-                    "presence_penalty": self.model_config["presence_penalty"]
-                }
-            )
-            output = response['message']['content'].strip()
-            print(f" #################################### Agent {self.name}: output - {output}")
-            
-            success = self.validate({"output": output})
-            print(f" #################################### Agent {self.name}: validate - {success}")
-            
-            output = self.llm_fn({"output": output})
+            for chunk in stream:
+                if _race_decided():
+                    print(f" #################################### Agent {self.name}: race decided, stopping this candidate")
+                    return None
+                piece = chunk['message']['content']
+                if not piece:
+                    continue
+                text += piece
+                if publish:
+                    self._publish_token(stream_id, piece)
+                if checking:
+                    verdict = self._check_stream(text)
+                    if verdict is False:
+                        return None
+                    checking = verdict is None
+        finally:
+            if hasattr(stream, "close"):
+                stream.close()
+            if publish:
+                self._publish_token(stream_id, "", done=True)
+        return text
 
-            print(f" #################################### Agent {self.name}: tool executed - {success}")
-            
-            return {"output": output, "success": success}
+    async def _astream_chat(self, **request):
+        """Async version of _stream_chat."""
+        publish = self.model_config.get("stream")
+        checking = self.stream_validate_fn is not None
+        stream_id = uuid.uuid4().hex
+        text = ""
+        stream = await self.get_backend().achat(stream=True, **request)
+        try:
+            async for chunk in stream:
+                piece = chunk['message']['content']
+                if not piece:
+                    continue
+                text += piece
+                if publish:
+                    self._publish_token(stream_id, piece)
+                if checking:
+                    verdict = self._check_stream(text)
+                    if verdict is False:
+                        return None
+                    checking = verdict is None
+        finally:
+            if hasattr(stream, "aclose"):
+                await stream.aclose()
+            if publish:
+                self._publish_token(stream_id, "", done=True)
+        return text
+
+    def _race_size(self, run_context=None):
+        """
+        Candidates generated per attempt (model_config["race_candidates"], 1 = no race).
+        Streamed agents don't race: k candidates would publish overlapping token streams.
+        Each candidate holds its own model slot, so k is capped at the run's
+        per-model limit; more candidates would only queue behind each other.
+        """
+        if self.model_config.get("stream"):
+            return 1
+        k = max(1, int(self.model_config.get("race_candidates") or 1))
+        limiter = getattr(run_context, "model_limiter", None)
+        limit = limiter.limit(self.get_model_name()) if limiter is not None else None
+        return min(k, limit) if limit else k
+
+    def _execute_attempt(self, input_data, run_context=None):
+        """
+        One attempt; with race_candidates > 1 it issues that many generations at
+        once and returns the first one that passes validation. Candidates are
+        streamed so that the losers can close their streams at the next chunk
+        once the race is decided, which stops their generations on the server.
+        """
+        k = self._race_size(run_context)
+        if k == 1:
+            return super()._execute_attempt(input_data, run_context)
+
+        print(f" #################################### Agent {self.name}: racing {k} candidates")
+        attempt = super()._execute_attempt
+        cancel = threading.Event()
+
+        def candidate():
+            token = _race_cancel.set(cancel)
+            try:
+                return attempt(input_data, run_context)
+            finally:
+                _race_cancel.reset(token)
+
+        executor = ThreadPoolExecutor(max_workers=k, thread_name_prefix=f"race-{self.name}")
+        futures = [executor.submit(candidate) for _ in range(k)]
+        result = None
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if result["success"]:
+                    return result
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        return result  # Every candidate failed
+
+    async def _aexecute_attempt(self, input_data, run_context=None):
+        """Async version of _execute_attempt; losing candidates are cancelled."""
+        k = self._race_size(run_context)
+        if k == 1:
+            return await super()._aexecute_attempt(input_data, run_context)
+
+        print(f" #################################### Agent {self.name}: racing {k} candidates")
+        attempt = super()._aexecute_attempt
+        tasks = [asyncio.ensure_future(attempt(input_data, run_context)) for _ in range(k)]
+        result = None
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result["success"]:
+                    return result
+        finally:
+            for task in tasks:
+                task.cancel()
+        return result  # Every candidate failed
+
+    def _chat_request(self, messages):
+        """Arguments of a chat request for `messages`, including the model's keep_alive policy."""
+        request = {"model": self.model_config["model"], "messages": messages, "options": self._chat_options()}
+        if self.model_config.get("keep_alive") is not None:
+            request["keep_alive"] = self.model_config["keep_alive"]
+        return request
+
+    def _cache_lookup(self, messages):
+        """
+        Looks the request up in the optional response cache (model_config["response_cache"]).
+        Returns (cache, key, cached_content); cache and key are None when caching is off.
+        """
+        cache = self.model_config.get("response_cache")
+        if cache is None:
+            return None, None, None
+        key = cache.make_key(self.model_config["model"], self._chat_options(), messages)
+        return cache, key, cache.get(key)
+
+    def _stream_aborted(self):
+        """Result of a generation stopped by stream_validate_fn; retried as a validation failure."""
+        return {"output": None, "success": False, "error": "Generation aborted by stream validator"}
+
+    def _finish(self, content, cache=None, cache_key=None):
+        """Validates the model response, caches it if valid and runs the tool function on it."""
+        output = content.strip()
+        print(f" #################################### Agent {self.name}: output - {output}")
+        
+        success = self.validate({"output": output})
+        print(f" #################################### Agent {self.name}: validate - {success}")
+        
+        # Only responses that pass validation are cached, so retries still get fresh generations
+        if cache is not None and success:
+            cache.set(cache_key, content)
+        
+        output = self.llm_fn({"output": output})
+
+        print(f" #################################### Agent {self.name}: tool executed - {success}")
+        
+        return {"output": output, "success": success}
+
+    def execute(self, user_input):
+        """Executes the LLM through the agent's backend."""
+        print(f" #################################### Agent {self.name}: Executing with input: {user_input}")
+        
+        messages = self._build_messages(self._clean_input(user_input))
+
+        try:
+            cache, cache_key, cached = self._cache_lookup(messages)
+            if cached is not None:
+                print(f" #################################### Agent {self.name}: response cache hit")
+                return self._finish(cached)
+
+            if self._streaming():
+                content = self._stream_chat(**self._chat_request(messages))
+                if content is None:
+                    return self._stream_aborted()
+                return self._finish(content, cache, cache_key)
+
+            response = self._chat(stream=False, **self._chat_request(messages))
+            return self._finish(response['message']['content'], cache, cache_key)
+
+        except Exception as e:
+            print(f" #################################### Agent {self.name}: Error during execution - {e}")
+            return {"output": None, "success": False, "error": str(e), "error_kind": classify_error(e)}
+
+    async def aexecute(self, user_input):
+        """
+        Executes the LLM using the backend's AsyncClient without blocking the event loop.
+        Subclasses that override only `execute` run it in a worker thread instead,
+        so the async engine keeps their logic.
+        """
+        cls = type(self)
+        if cls.execute is not LLMAgent.execute and cls.aexecute is LLMAgent.aexecute:
+            return await asyncio.to_thread(self.execute, user_input)
+
+        print(f" #################################### Agent {self.name}: Executing (async) with input: {user_input}")
+        
+        messages = self._build_messages(self._clean_input(user_input))
+
+        try:
+            cache, cache_key, cached = self._cache_lookup(messages)
+            if cached is not None:
+                print(f" #################################### Agent {self.name}: response cache hit")
+                return self._finish(cached)
+
+            if self._streaming():
+                content = await self._astream_chat(**self._chat_request(messages))
+                if content is None:
+                    return self._stream_aborted()
+                return self._finish(content, cache, cache_key)
+
+            response = await self._achat(stream=False, **self._chat_request(messages))
+            return self._finish(response['message']['content'], cache, cache_key)
 
         except Exception as e:
             print(f" #################################### Agent {self.name}: Error during execution - {e}")
-            return {"output": None, "success": False}
-        
\ No newline at end of file
+            return {"output": None, "success": False, "error": str(e), "error_kind": classify_error(e)}
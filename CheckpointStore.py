@@ -0,0 +1,71 @@
+"""
+Local checkpoint store for resumable workflow runs.
+
+WorkflowManager saves a snapshot of a run after every successful agent: the
+agent outputs, pending fan-in buffers, the active workflow and the frontier of
+agents still to run. Each run is one JSON file named after its run id, written
+atomically so a crash mid-write never leaves a corrupt checkpoint behind.
+
+    store = CheckpointStore(".checkpoints")
+    run_context = manager.run_workflow("Agent1", "hello", checkpoint_store=store)
+    # ... Agent4 failed, fix the cause, then:
+    manager.resume_workflow(run_context.run_id, checkpoint_store=store)
+
+Agent inputs and outputs must be JSON-serializable to be restored faithfully;
+anything else is stored as its string form.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class CheckpointStore:
+    def __init__(self, directory=".checkpoints"):
+        """
+        Args:
+            directory (str): Folder holding one <run_id>.json file per run (created if missing)
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, run_id):
+        return os.path.join(self.directory, f"{run_id}.json")
+
+    def save(self, run_id, state):
+        """Writes the snapshot of `run_id`, replacing any previous one."""
+        state = dict(state, run_id=run_id, updated_at=time.time())
+        path = self._path(run_id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+
+    def load(self, run_id):
+        """Returns the last snapshot of `run_id`, or None if there is none."""
+        try:
+            with open(self._path(run_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def delete(self, run_id):
+        """Removes the checkpoint of `run_id` (no-op if missing)."""
+        try:
+            os.remove(self._path(run_id))
+        except FileNotFoundError:
+            pass
+
+    def list_runs(self, status=None):
+        """Run ids with a checkpoint, optionally only those with the given status."""
+        run_ids = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                continue
+            run_id = filename[:-len(".json")]
+            if status is None or (self.load(run_id) or {}).get("status") == status:
+                run_ids.append(run_id)
+        return run_ids
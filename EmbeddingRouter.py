@@ -0,0 +1,98 @@
+"""
+Embedding-based routing for SwitchAgent.
+
+Each flow is described by a few texts (a description and example requests).
+They are embedded once; every input then costs a single embedding call and a
+cosine similarity against that matrix instead of a chat completion. A flow
+scores the similarity of its closest text. When the best flow doesn't beat
+the runner-up by `min_margin` the decision is reported as not confident and
+SwitchAgent asks the LLM instead:
+
+    router = EmbeddingRouter({
+        "science_flow": ["Scientific questions", "How does photosynthesis work?"],
+        "engineering_flow": ["Building software or hardware", "Design a REST API"],
+    }, model="nomic-embed-text", min_margin=0.05)
+    router.route("Explain black holes")   # {"flow": "science_flow", "confident": True, ...}
+"""
+
+import threading
+
+import numpy as np
+
+from LLMBackend import get_backend
+
+
+class EmbeddingRouter:
+    def __init__(self, routes, model="nomic-embed-text", backend=None, min_margin=0.05, min_score=None):
+        """
+        Args:
+            routes (dict): flow name -> description string or list of descriptions/examples
+            model (str): Ollama embedding model
+            backend: LLM backend with an embed method (None = the default backend)
+            min_margin (float): Top-two score gap below which a decision is not confident
+            min_score (float): Optional best score below which a decision is not confident
+        """
+        self.routes = {flow: [texts] if isinstance(texts, str) else list(texts) for flow, texts in routes.items()}
+        self.model = model
+        self.backend = backend
+        self.min_margin = min_margin
+        self.min_score = min_score
+        self._matrix = None         # Normalised embeddings of every route text, one row each
+        self._flow_index = None     # Flow position of each row
+        self._fitted_flows = []     # Flows in the order the matrix was built
+        self._lock = threading.Lock()
+
+    @property
+    def flows(self):
+        return list(self.routes)
+
+    def _embed(self, texts):
+        backend = self.backend if self.backend is not None else get_backend()
+        response = backend.embed(model=self.model, input=texts)
+        vectors = np.asarray(response["embeddings"], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def fit(self):
+        """Embeds every route text; called on the first route() and again after add_route()."""
+        flows = list(self.routes)
+        texts, flow_index = [], []
+        for position, flow in enumerate(flows):
+            texts.extend(self.routes[flow])
+            flow_index.extend([position] * len(self.routes[flow]))
+        if not texts:
+            raise ValueError("EmbeddingRouter needs at least one route text")
+        fitted = (self._embed(texts), np.asarray(flow_index), flows)
+        with self._lock:
+            self._matrix, self._flow_index, self._fitted_flows = fitted
+        return fitted
+
+    def add_route(self, flow, texts):
+        """Adds descriptions or examples to `flow`; they are embedded on the next route()."""
+        self.routes.setdefault(flow, []).extend([texts] if isinstance(texts, str) else texts)
+        with self._lock:
+            self._matrix = None
+
+    def scores(self, text):
+        """Cosine similarity of `text` to each flow (its closest route text)."""
+        with self._lock:
+            fitted = (self._matrix, self._flow_index, self._fitted_flows)
+        if fitted[0] is None:
+            fitted = self.fit()
+        matrix, flow_index, flows = fitted
+        similarities = matrix @ self._embed([text])[0]
+        flow_scores = np.full(len(flows), -1.0, dtype=np.float32)
+        np.maximum.at(flow_scores, flow_index, similarities)
+        return {flow: float(score) for flow, score in zip(flows, flow_scores)}
+
+    def route(self, text):
+        """
+        Best flow for `text` as {"flow", "score", "margin", "confident", "scores"};
+        `confident` is False when the margin (or score) is below the thresholds.
+        """
+        scores = self.scores(text)
+        ranked = sorted(scores.values(), reverse=True)
+        best = max(scores, key=scores.get)
+        margin = ranked[0] - ranked[1] if len(ranked) > 1 else ranked[0]
+        confident = margin >= self.min_margin and (self.min_score is None or ranked[0] >= self.min_score)
+        return {"flow": best, "score": ranked[0], "margin": margin, "confident": confident, "scores": scores}
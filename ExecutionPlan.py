@@ -0,0 +1,134 @@
+"""
+Compiled, immutable execution plans for WorkflowManager workflows.
+
+A workflow is declared as a plain dict (`{agent_name: [next_agent_names]}`).
+`compile_workflow` validates it once and precomputes everything the engine
+needs at run time: successor tuples, topological order, in-degrees, entry
+nodes and the fan-in (join) count of every agent for every possible start
+agent. The engine then schedules from the plan without re-reading the dict.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+
+class WorkflowCompileError(ValueError):
+    """Raised when a workflow graph can't be compiled (cycles, unknown agents)."""
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Immutable, precomputed view of one workflow graph"""
+
+    name: Optional[str]
+    start_node: Optional[str]                       # First declared agent, where a switch enters
+    entry_nodes: Tuple[str, ...]                    # Agents with no predecessors
+    topological_order: Tuple[str, ...]
+    successors: Mapping[str, Tuple[str, ...]]
+    in_degree: Mapping[str, int]
+    join_counts: Mapping[str, Mapping[str, int]]    # start agent -> agent -> inputs to wait for
+
+    def next_agents(self, agent_name):
+        """Agents that receive `agent_name`'s output."""
+        return self.successors.get(agent_name, ())
+
+    def join_count(self, start_agent, agent_name):
+        """
+        Number of inputs `agent_name` waits for in a run entered at `start_agent`.
+        Only predecessors reachable from the start count, so an agent shared by
+        several branches never waits for a branch this run can't take.
+        """
+        counts = self.join_counts.get(start_agent)
+        if counts is None:
+            return 1
+        return max(1, counts.get(agent_name, 0))
+
+    def missing_agents(self, agent_names):
+        """Agents referenced by the plan that aren't registered."""
+        return [node for node in self.topological_order if node not in agent_names]
+
+
+def reachable_subgraph(agent_sequence, start):
+    """
+    The part of `agent_sequence` a run entered at `start` can reach.
+    Flows merged into the same connection map that the run never enters are
+    left out, so their cycles or stale agents don't stop it.
+    """
+    subgraph = {}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if node in subgraph:
+            continue
+        subgraph[node] = list(agent_sequence.get(node) or [])
+        queue.extend(subgraph[node])
+    return subgraph
+
+
+def compile_workflow(name, agent_sequence, agent_names=None):
+    """
+    Compiles `agent_sequence` (`{agent_name: [next_agent_names]}`) into an ExecutionPlan.
+    Raises WorkflowCompileError if the graph has a cycle or, when `agent_names`
+    is given, references agents that aren't registered.
+    """
+    label = f"Workflow '{name}'" if name else "Workflow connections"
+
+    nodes = list(agent_sequence.keys())
+    seen = set(nodes)
+    for next_agents in agent_sequence.values():
+        for next_agent in next_agents or []:
+            if next_agent not in seen:
+                seen.add(next_agent)
+                nodes.append(next_agent)
+
+    successors = {node: tuple(agent_sequence.get(node) or ()) for node in nodes}
+    in_degree = {node: 0 for node in nodes}
+    for next_agents in successors.values():
+        for next_agent in next_agents:
+            in_degree[next_agent] += 1
+
+    # Kahn's algorithm: O(V+E), leftover nodes are on a cycle
+    remaining = dict(in_degree)
+    ready = deque(node for node in nodes if remaining[node] == 0)
+    order = []
+    while ready:
+        node = ready.popleft()
+        order.append(node)
+        for next_agent in successors[node]:
+            remaining[next_agent] -= 1
+            if remaining[next_agent] == 0:
+                ready.append(next_agent)
+    if len(order) != len(nodes):
+        cyclic = [node for node in nodes if remaining[node] > 0]
+        raise WorkflowCompileError(f"{label} has a cycle through: {', '.join(cyclic)}")
+
+    if agent_names is not None:
+        missing = [node for node in nodes if node not in agent_names]
+        if missing:
+            raise WorkflowCompileError(f"{label} references unknown agents: {', '.join(missing)}")
+
+    # Fan-in counts per possible start agent (workflow graphs are small)
+    position = {node: index for index, node in enumerate(order)}
+    join_counts = {}
+    for start in nodes:
+        reachable = {start}
+        counts = {}
+        for node in order[position[start]:]:
+            if node not in reachable:
+                continue
+            for next_agent in successors[node]:
+                reachable.add(next_agent)
+                counts[next_agent] = counts.get(next_agent, 0) + 1
+        join_counts[start] = MappingProxyType(counts)
+
+    return ExecutionPlan(
+        name=name,
+        start_node=nodes[0] if nodes else None,
+        entry_nodes=tuple(node for node in nodes if in_degree[node] == 0),
+        topological_order=tuple(order),
+        successors=MappingProxyType(successors),
+        in_degree=MappingProxyType(in_degree),
+        join_counts=MappingProxyType(join_counts),
+    )
@@ -0,0 +1,215 @@
+"""
+Hedged LLM requests.
+
+A HedgingPolicy learns the latency of every agent/model pair. When a request
+takes longer than the chosen percentile of that history, a duplicate is sent
+to another host and whichever answer arrives first is used. The async path
+cancels the slower request. A blocking ollama call can't be interrupted, so
+the thread path streams both requests and closes the slower stream at its next
+chunk, which stops that generation on the server (like a decided LLMAgent race).
+
+Hedging needs a backend that can pin requests to hosts (LoadBalancedBackend):
+
+    model_config["backend"] = LoadBalancedBackend(["http://box1:11434", "http://box2:11434"])
+    model_config["hedging"] = HedgingPolicy(percentile=95)
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+
+
+def _first_success(done, pending, exception_of):
+    """A finished request without error, or a failed one once nothing is pending (so its error surfaces)."""
+    for request in done:
+        if exception_of(request) is None:
+            return request
+    if not pending:
+        return next(iter(done))
+    return None
+
+
+class _StreamedRequest:
+    """One request of a sync hedge, streamed on its own thread so the loser can be stopped"""
+
+    def __init__(self, backend, host, request, finished):
+        self.cancel = threading.Event()     # Set once the hedge is decided
+        self.response = None
+        self.error = None
+        threading.Thread(target=self._run, args=(backend, host, request, finished),
+                         name="hedge", daemon=True).start()
+
+    def _run(self, backend, host, request, finished):
+        try:
+            stream = backend.chat(host=host, stream=True, **request)
+            try:
+                content = ""
+                for chunk in stream:
+                    if self.cancel.is_set():
+                        return
+                    content += chunk['message']['content'] or ""
+            finally:
+                if hasattr(stream, "close"):
+                    stream.close()
+            self.response = {"message": {"role": "assistant", "content": content}}
+        except Exception as e:
+            self.error = e
+        finally:
+            finished.put(self)
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+class LatencyTracker:
+    """Rolling window of request latencies per key, e.g. (agent name, model)"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def count(self, key):
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def percentile(self, key, percentile):
+        """Latency below which `percentile` % of the recorded requests finished, or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(percentile / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class HedgingPolicy:
+    """
+    Sends a second request once the first is slower than usual.
+
+    Args:
+        percentile: Latency percentile after which a request is hedged
+        min_samples: Requests to observe per agent/model before hedging starts
+        min_delay: Lower bound of the hedge delay, in seconds
+        window: Latencies kept per agent/model
+        tracker: LatencyTracker to share between policies (a new one by default)
+    """
+
+    def __init__(self, percentile=95, min_samples=20, min_delay=0.5, window=200, tracker=None):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.tracker = tracker or LatencyTracker(window)
+        self.hedged = 0         # Requests that sent a duplicate
+        self.hedge_wins = 0     # Duplicates that answered first
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, key):
+        """Seconds to wait before hedging a request for `key`, or None while still learning."""
+        if self.tracker.count(key) < self.min_samples:
+            return None
+        return max(self.min_delay, self.tracker.percentile(key, self.percentile))
+
+    def _plan(self, backend, key, model):
+        """(delay, primary_host) for a request, or (None, None) when it can't be hedged."""
+        delay = self.hedge_delay(key)
+        if delay is None or not hasattr(backend, "select_host"):
+            return None, None
+        return delay, backend.select_host(model)
+
+    def _count(self, hedge_won):
+        with self._lock:
+            self.hedged += 1
+            if hedge_won:
+                self.hedge_wins += 1
+
+    def chat(self, backend, key, **request):
+        """backend.chat(**request), hedged to a second host when it runs late."""
+        started = time.monotonic()
+        delay, primary_host = self._plan(backend, key, request.get("model"))
+        if primary_host is None:
+            response = backend.chat(**request)
+            self.tracker.record(key, time.monotonic() - started)
+            return response
+
+        # Both requests are streamed, so the one that loses can be closed at its next chunk
+        request.pop("stream", None)
+        finished = queue.Queue()
+        requests = [_StreamedRequest(backend, primary_host, request, finished)]
+        try:
+            try:
+                first = finished.get(timeout=delay)
+            except queue.Empty:
+                first = None
+            hedge_host = None if first else backend.select_host(request.get("model"), exclude=(primary_host,))
+            if hedge_host is None:
+                response = (first or finished.get()).result()
+                self.tracker.record(key, time.monotonic() - started)
+                return response
+
+            print(f" #################################### Hedging {key} to {hedge_host} after {delay:.2f}s")
+            hedge = _StreamedRequest(backend, hedge_host, request, finished)
+            requests.append(hedge)
+            remaining = len(requests)
+            while True:
+                done = finished.get()
+                remaining -= 1
+                # A failed request only decides the hedge once the other one failed too
+                if done.error is None or not remaining:
+                    self._count(done is hedge)
+                    self.tracker.record(key, time.monotonic() - started)
+                    return done.result()
+        finally:
+            for streamed in requests:
+                streamed.cancel.set()
+
+    async def achat(self, backend, key, **request):
+        """Async version of chat; the slower request is cancelled."""
+        started = time.monotonic()
+        delay, primary_host = self._plan(backend, key, request.get("model"))
+        if primary_host is None:
+            response = await backend.achat(**request)
+            self.tracker.record(key, time.monotonic() - started)
+            return response
+
+        primary = asyncio.ensure_future(backend.achat(host=primary_host, **request))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            hedge_host = None if done else backend.select_host(request.get("model"), exclude=(primary_host,))
+            if hedge_host is None:
+                response = await primary
+                self.tracker.record(key, time.monotonic() - started)
+                return response
+
+            print(f" #################################### Hedging {key} to {hedge_host} after {delay:.2f}s")
+            hedge = asyncio.ensure_future(backend.achat(host=hedge_host, **request))
+            tasks.add(hedge)
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = _first_success(done, pending, lambda task: task.exception())
+                if winner is not None:
+                    self._count(winner is hedge)
+                    self.tracker.record(key, time.monotonic() - started)
+                    return winner.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self):
+        """How many requests were hedged and how often the duplicate won."""
+        with self._lock:
+            return {"hedged": self.hedged, "hedge_wins": self.hedge_wins,
+                    "win_rate": self.hedge_wins / self.hedged if self.hedged else 0.0}
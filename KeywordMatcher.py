@@ -0,0 +1,115 @@
+"""
+Compiled keyword matching for SwitchAgent.keyword_mapping.
+
+All keywords are merged into one regular expression shaped like a prefix
+tree, so an input is scanned once no matter how many keywords there are,
+instead of once per keyword. Matching is case-insensitive and, by default,
+only whole words or phrases match ("app" doesn't match "application").
+
+When several keywords occur, the one with the highest priority wins (lower
+number first; by default the order of the mapping, like the old first-match
+scan). Keywords that start a longer one ("machine" in "machine learning")
+are found too. Ties go to the longer keyword, then to the one found first:
+
+    matcher = KeywordMatcher({"machine learning": "science_flow", "software": "engineering_flow"})
+    matcher.match("Machine learning software")   # ("machine learning", "science_flow")
+"""
+
+import re
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _build_trie(words):
+    """Nested dicts of characters; "" marks the end of a keyword."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = None     # End of a keyword
+    return trie
+
+
+def _trie_pattern(words):
+    """Regex alternation for `words` built as a prefix tree; longer continuations are tried first."""
+    trie = _build_trie(words)
+
+    def build(node):
+        ends_here = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends_here:
+            single = len(branches) == 1 and len(pattern) == 1
+            pattern = (pattern if single else "(?:" + pattern + ")") + "?"
+        return pattern
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    def __init__(self, mapping, priorities=None, word_boundaries=True):
+        """
+        Args:
+            mapping (dict): keyword -> flow name
+            priorities (dict): Optional keyword -> priority (lower wins); default = mapping order
+            word_boundaries (bool): Only match whole words/phrases instead of any substring
+        """
+        self.mapping = dict(mapping)
+        self.word_boundaries = word_boundaries
+        priorities = {keyword.lower(): value for keyword, value in (priorities or {}).items()}
+        self._entries = {}      # lowercase keyword -> (priority, keyword, flow)
+        for position, (keyword, flow) in enumerate(self.mapping.items()):
+            key = keyword.lower()
+            if key and key not in self._entries:
+                self._entries[key] = (priorities.get(key, position), keyword, flow)
+        self._trie = _build_trie(self._entries)
+        self._regex = self._compile()
+
+    def _compile(self):
+        if not self._entries:
+            return None
+        body = _trie_pattern(self._entries)
+        if self.word_boundaries:
+            body = r"(?<!\w)" + body + r"(?!\w)"
+        # A lookahead reports a match at every position, so overlapping keywords are all seen
+        return re.compile("(?=(" + body + "))", re.IGNORECASE)
+
+    def _ends_word(self, text, end):
+        return not self.word_boundaries or end == len(text) or not _WORD_CHAR.match(text, end)
+
+    def find_all(self, text):
+        """Every (keyword, flow, position) found in `text`, including keywords that start a longer one."""
+        if self._regex is None:
+            return []
+        found = []
+        # The regex finds the positions where a keyword starts; the trie walk from
+        # there reports each keyword ending at that point, not only the longest
+        for match in self._regex.finditer(text):
+            start = end = match.start()
+            node, key = self._trie, ""
+            while end < len(text):
+                char = text[end].lower()
+                node = node.get(char)
+                if node is None:
+                    break
+                key += char
+                end += 1
+                if "" in node and self._ends_word(text, end):
+                    entry = self._entries[key]
+                    found.append((entry[1], entry[2], start))
+        return found
+
+    def match(self, text):
+        """(keyword, flow) of the winning keyword in `text`, or None."""
+        best, best_rank = None, None
+        for keyword, flow, position in self.find_all(text):
+            rank = (self._entries[keyword.lower()][0], -len(keyword), position)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = (keyword, flow), rank
+        return best
+
+    def __len__(self):
+        return len(self._entries)
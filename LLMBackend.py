@@ -0,0 +1,349 @@
+"""
+Pooled LLM backends for agents.
+
+An OllamaBackend owns one ollama.Client (shared by all threads) and one
+ollama.AsyncClient per event loop for a single host, with bounded HTTP
+keep-alive pools and finite timeouts, so agents reuse connections instead
+of opening one per call and never hang forever on a stalled request.
+
+Agents pick their backend through model_config:
+
+    model_config["backend"] = OllamaBackend("http://gpu-box:11434", timeout=60)
+    model_config["host"] = "http://gpu-box:11434"   # shared backend for that host
+
+Without either, agents use the shared backend of the default host
+(OLLAMA_HOST or localhost), or whatever set_default_backend installed. Any
+object with the same chat/achat methods can be used as a backend.
+
+LoadBalancedBackend spreads requests over several Ollama hosts, optionally
+tagged with the models each one serves. Every request goes to the healthy host
+with the fewest requests in flight; hosts that keep failing are ejected for a
+while and health checks bring them back:
+
+    set_default_backend(LoadBalancedBackend([
+        {"host": "http://box1:11434", "models": ["gemma3:latest"]},
+        "http://box2:11434",
+    ]))
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
+import ollama
+
+from RetryPolicy import TRANSPORT, classify_error
+
+
+class OllamaBackend:
+    def __init__(self, host=None, timeout=120.0, connect_timeout=5.0, max_connections=16,
+                 max_keepalive_connections=8, keepalive_expiry=30.0):
+        """
+        Args:
+            host (str): Ollama server URL (None = OLLAMA_HOST or the default local server)
+            timeout (float): Seconds to wait for a response (None = no limit)
+            connect_timeout (float): Seconds to wait for a connection
+            max_connections (int): Maximum concurrent HTTP connections to the host
+            max_keepalive_connections (int): Idle connections kept open for reuse
+            keepalive_expiry (float): Seconds an idle connection stays open
+        """
+        self.host = host
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncClient
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Synchronous client, created on first use and shared by all threads."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = ollama.Client(host=self.host, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def async_client(self):
+        """AsyncClient bound to the running event loop (httpx pools can't be shared across loops)."""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = ollama.AsyncClient(host=self.host, timeout=self.timeout,
+                                                                    limits=self.limits)
+        return client
+
+    def chat(self, **kwargs):
+        """Same arguments as ollama.chat."""
+        return self.client.chat(**kwargs)
+
+    def generate(self, **kwargs):
+        """Same arguments as ollama.generate; with only a model it loads the model."""
+        return self.client.generate(**kwargs)
+
+    def embed(self, **kwargs):
+        """Same arguments as ollama.embed."""
+        return self.client.embed(**kwargs)
+
+    def ps(self):
+        """Models currently loaded on the host."""
+        return self.client.ps()
+
+    async def achat(self, **kwargs):
+        """Same arguments as ollama.AsyncClient.chat."""
+        return await self.async_client().chat(**kwargs)
+
+    def close(self):
+        """Closes the synchronous connection pool."""
+        with self._lock:
+            if self._client is not None:
+                self._client._client.close()
+                self._client = None
+
+    def __repr__(self):
+        return f"OllamaBackend(host={self.host!r})"
+
+
+class _Host:
+    """Routing state of one host behind a LoadBalancedBackend"""
+
+    def __init__(self, backend, models=None):
+        self.backend = backend
+        self.models = set(models) if models else None   # None = serves any model
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0                               # Consecutive transport failures
+        self.ejected_until = 0.0
+
+    @property
+    def name(self):
+        return self.backend.host
+
+    def serves(self, model):
+        return self.models is None or model is None or model in self.models
+
+    def healthy(self, now):
+        return now >= self.ejected_until
+
+
+class LoadBalancedBackend:
+    """
+    Routes each request to the least busy healthy host that serves its model.
+
+    Args:
+        hosts: Host URLs, {"host": url, "models": [...]} dicts or OllamaBackend instances
+        failure_threshold: Consecutive transport failures before a host is ejected
+        ejection_time: Seconds an ejected host receives no traffic
+        **backend_kwargs: Passed to the OllamaBackend created for each host URL
+    """
+
+    def __init__(self, hosts, failure_threshold=3, ejection_time=30.0, **backend_kwargs):
+        self.failure_threshold = failure_threshold
+        self.ejection_time = ejection_time
+        self.hosts = []
+        for entry in hosts:
+            models = None
+            if isinstance(entry, dict):
+                models = entry.get("models")
+                entry = entry["host"]
+            backend = entry if hasattr(entry, "chat") else OllamaBackend(entry, **backend_kwargs)
+            self.hosts.append(_Host(backend, models))
+        if not self.hosts:
+            raise ValueError("LoadBalancedBackend needs at least one host")
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._stop_health = threading.Event()
+
+    def select_host(self, model=None, exclude=()):
+        """
+        Name of the host the next request for `model` would go to, or None.
+        Hosts in `exclude` are skipped; when every candidate is ejected the one
+        that comes back soonest is used rather than failing outright.
+        """
+        with self._lock:
+            host = self._pick(model, exclude)
+            return host.name if host else None
+
+    def hosts_for(self, model=None):
+        """Names of all hosts that serve `model`."""
+        return [host.name for host in self.hosts if host.serves(model)]
+
+    def _pick(self, model, exclude=()):
+        now = time.time()
+        candidates = [host for host in self.hosts if host.serves(model) and host.name not in exclude]
+        healthy = [host for host in candidates if host.healthy(now)]
+        if healthy:
+            return min(healthy, key=lambda host: (host.in_flight, host.requests))
+        if candidates:
+            return min(candidates, key=lambda host: host.ejected_until)
+        return None
+
+    def _acquire(self, model, host_name=None):
+        with self._lock:
+            if host_name is not None:
+                host = next((host for host in self.hosts if host.name == host_name), None)
+            else:
+                host = self._pick(model)
+            if host is None:
+                raise ValueError(f"No host available for model {model!r}")
+            host.in_flight += 1
+            host.requests += 1
+            return host
+
+    def _release(self, host, error=None):
+        with self._lock:
+            host.in_flight -= 1
+            if error is None:
+                host.failures = 0
+            elif classify_error(error) == TRANSPORT:
+                host.failures += 1
+                if host.failures >= self.failure_threshold:
+                    host.ejected_until = time.time() + self.ejection_time
+                    print(f" #################################### Ejecting {host.name} for {self.ejection_time}s "
+                          f"after {host.failures} failures")
+
+    def chat(self, host=None, **kwargs):
+        """Same arguments as ollama.chat; `host` pins the request to one host."""
+        target = self._acquire(kwargs.get("model"), host)
+        try:
+            response = target.backend.chat(**kwargs)
+        except Exception as e:
+            self._release(target, e)
+            raise
+        if kwargs.get("stream"):
+            return self._tracked_stream(target, response)
+        self._release(target)
+        return response
+
+    def generate(self, host=None, **kwargs):
+        """Same arguments as ollama.generate; `host` pins the request to one host."""
+        return self._call("generate", host, kwargs)
+
+    def embed(self, host=None, **kwargs):
+        """Same arguments as ollama.embed; `host` pins the request to one host."""
+        return self._call("embed", host, kwargs)
+
+    def _call(self, method, host, kwargs):
+        """Runs a non-streaming backend method on the least busy host."""
+        target = self._acquire(kwargs.get("model"), host)
+        try:
+            response = getattr(target.backend, method)(**kwargs)
+        except Exception as e:
+            self._release(target, e)
+            raise
+        self._release(target)
+        return response
+
+    def _tracked_stream(self, target, stream):
+        """Yields a streamed response, keeping the request in flight until the stream ends."""
+        error = None
+        try:
+            yield from stream
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(target, error)
+
+    async def _atracked_stream(self, target, stream):
+        """Async version of _tracked_stream."""
+        error = None
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(target, error)
+
+    async def achat(self, host=None, **kwargs):
+        """Async version of chat."""
+        target = self._acquire(kwargs.get("model"), host)
+        try:
+            response = await target.backend.achat(**kwargs)
+        except (Exception, asyncio.CancelledError) as e:
+            self._release(target, e)    # Only transport errors count against the host
+            raise
+        if kwargs.get("stream"):
+            return self._atracked_stream(target, response)
+        self._release(target)
+        return response
+
+    def check_health(self):
+        """Pings every host; ejects unreachable ones and brings back the ones that answer."""
+        results = {}
+        for host in self.hosts:
+            try:
+                host.backend.ps()
+                healthy = True
+            except Exception:
+                healthy = False
+            with self._lock:
+                if healthy:
+                    host.failures = 0
+                    host.ejected_until = 0.0
+                else:
+                    host.ejected_until = time.time() + self.ejection_time
+            results[host.name] = healthy
+        return results
+
+    def start_health_checks(self, interval=15.0):
+        """Runs check_health every `interval` seconds on a daemon thread."""
+        if self._health_thread is not None:
+            return
+        self._stop_health.clear()
+
+        def loop():
+            while not self._stop_health.wait(interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, name="llm-health", daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self):
+        self._stop_health.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+            self._health_thread = None
+
+    def stats(self):
+        """In-flight requests, total requests, failures and health per host."""
+        now = time.time()
+        with self._lock:
+            return {host.name: {"in_flight": host.in_flight, "requests": host.requests,
+                                "failures": host.failures, "healthy": host.healthy(now)}
+                    for host in self.hosts}
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def set_default_backend(backend):
+    """Makes `backend` the one used by agents whose model_config names no host or backend."""
+    with _backends_lock:
+        if backend is None:
+            _backends.pop(None, None)   # Back to the default Ollama host
+        else:
+            _backends[None] = backend
+
+
+def get_backend(host=None, **kwargs):
+    """Shared OllamaBackend for `host`, created with `kwargs` on first use."""
+    with _backends_lock:
+        backend = _backends.get(host)
+        if backend is None:
+            backend = _backends[host] = OllamaBackend(host, **kwargs)
+        return backend
+
+
+def backend_for(model_config):
+    """Backend configured in model_config ("backend", else the shared one for "host")."""
+    backend = model_config.get("backend")
+    if backend is None:
+        backend = get_backend(model_config.get("host"))
+    return backend
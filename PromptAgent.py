@@ -1,6 +1,38 @@
 from Agent import LLMAgent
+import contextvars
 import json
-import ollama
+
+from RetryPolicy import classify_error
+
+# (agent, system prompt) applied for the current call only, so concurrent runs
+# can use different PromptAgent modifications on the same EnhancedLLMAgent
+_system_override = contextvars.ContextVar("system_override", default=None)
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json(text):
+    """
+    Parses the first JSON object in `text`, tolerating ``` fences and text
+    before or after it. Returns the object, or None if there is none.
+    """
+    text = text.strip()
+    try:
+        data = json.loads(text)
+        return data if isinstance(data, dict) else None
+    except json.JSONDecodeError:
+        pass
+    start = text.find("{")
+    while start != -1:
+        try:
+            data, _ = _decoder.raw_decode(text, start)
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
 
 class PromptAgent(LLMAgent):
     """
@@ -10,10 +42,36 @@ class PromptAgent(LLMAgent):
     """
     
     def __init__(self, name, model_config, system=None, retry_limit=3, 
-                 prompt_templates=None, target_agents=None):
-        super().__init__(name, model_config, system, retry_limit)
+                 prompt_templates=None, target_agents=None, stream_validate_fn=None, structured_output=True,
+                 prompt_cache=None):
+        super().__init__(name, model_config, system=system, retry_limit=retry_limit,
+                         stream_validate_fn=stream_validate_fn)
         self.prompt_templates = prompt_templates or {}
         self.target_agents = target_agents or {}
+        self.structured_output = structured_output  # Enforce the response schema through Ollama's `format`
+        self.prompt_cache = prompt_cache            # Optional PromptCache of modifications per intent
+
+    def response_schema(self):
+        """JSON schema of the response; prompt_modifications is limited to the target agents when known."""
+        modifications = {"type": "object", "additionalProperties": {"type": "string"}}
+        if self.target_agents:
+            modifications = {"type": "object", "additionalProperties": False,
+                             "properties": {name: {"type": "string"} for name in self.target_agents}}
+        return {
+            "type": "object",
+            "properties": {
+                "analysis": {"type": "string"},
+                "prompt_modifications": modifications,
+                "workflow_suggestions": {"type": "string"}
+            },
+            "required": ["analysis", "prompt_modifications", "workflow_suggestions"]
+        }
+
+    def _chat_request(self, messages):
+        request = super()._chat_request(messages)
+        if self.structured_output:
+            request["format"] = self.response_schema()
+        return request
         
     def execute(self, user_input):
         """
@@ -22,6 +80,14 @@ class PromptAgent(LLMAgent):
         """
         print(f" #################################### {self.name}: Analyzing input for prompt generation: {user_input}")
         
+        intent = self.prompt_cache.intent(user_input) if self.prompt_cache is not None else None
+        if intent is not None:
+            cached = self.prompt_cache.get(intent, self._cache_context())
+            if cached is not None:
+                print(f" #################################### {self.name}: Reusing prompt modifications for intent '{intent}'")
+                return {"output": self._prompt_result(user_input, cached, json.dumps(cached, ensure_ascii=False),
+                                                      intent), "success": True}
+        
         # Prepare the full prompt for prompt generation
         full_prompt = f"""
 Based on the user's request, generate appropriate system prompts or modifications for the following agents.
@@ -53,47 +119,58 @@ Format your response as JSON with the following structure:
         ]
         
         try:
-            response = ollama.chat(
-                model=self.model_config["model"],
-                stream=False,
-                messages=messages,
-                options={
-                    "temperature": self.model_config["temperature"],
-                    "top_p": self.model_config["top_p"],
-                    "frequency_penalty": self.model_config["frequency_penalty"],
-                    "presence_penalty": self.model_config["presence_penalty"]
-                }
-            )
-            output = response['message']['content'].strip()
+            if self._streaming():
+                # Streaming lets stream_validate_fn (e.g. require_json_object) stop a doomed answer early
+                output = self._stream_chat(**self._chat_request(messages))
+                if output is None:
+                    return self._stream_aborted()
+                output = output.strip()
+            else:
+                response = self._chat(stream=False, **self._chat_request(messages))
+                output = response['message']['content'].strip()
             print(f" #################################### {self.name}: Generated prompt analysis - {output}")
             
-            # Try to parse as JSON, fall back to plain text if needed
-            try:
-                prompt_data = json.loads(output)
-            except json.JSONDecodeError:
+            # Tolerates code fences and trailing text; falls back to plain text if there is no JSON object
+            prompt_data = extract_json(output)
+            if prompt_data is not None and not isinstance(prompt_data.get("prompt_modifications", {}), dict):
+                prompt_data["prompt_modifications"] = {}
+            parsed = prompt_data is not None
+            if prompt_data is None:
                 prompt_data = {
                     "analysis": "Could not parse structured response",
                     "prompt_modifications": {},
                     "raw_output": output
                 }
             
-            # Return both original input and prompt modifications
-            result = {
-                "original_input": user_input,
-                "prompt_data": prompt_data,
-                "output": output,
-                "prompt_modifications": prompt_data.get("prompt_modifications", {})
-            }
-            
             success = self.validate({"output": output})
             print(f" #################################### {self.name}: validate - {success}")
             
-            return {"output": result, "success": success}
+            # Only parsed, valid prompt sets are reused for later requests of the same intent
+            if intent is not None and parsed and success and prompt_data.get("prompt_modifications"):
+                self.prompt_cache.set(intent, prompt_data, self._cache_context())
+            
+            return {"output": self._prompt_result(user_input, prompt_data, output), "success": success}
             
         except Exception as e:
             print(f" #################################### {self.name}: Error during prompt generation - {e}")
-            return {"output": None, "success": False}
+            return {"output": None, "success": False, "error": str(e), "error_kind": classify_error(e)}
     
+    def _prompt_result(self, user_input, prompt_data, output, cached_intent=None):
+        """Returns both the original input and the prompt modifications."""
+        result = {
+            "original_input": user_input,
+            "prompt_data": prompt_data,
+            "output": output,
+            "prompt_modifications": prompt_data.get("prompt_modifications", {})
+        }
+        if cached_intent is not None:
+            result["cached_intent"] = cached_intent
+        return result
+
+    def _cache_context(self):
+        """Part of the prompt cache key besides the intent: prompts made for another setup don't apply."""
+        return (self.system, self.model_config.get("model"), tuple(sorted(self.target_agents.items())))
+
     def _get_agent_descriptions(self):
         """Get descriptions of available agents for prompt generation context."""
         descriptions = []
@@ -121,6 +198,14 @@ class EnhancedLLMAgent(LLMAgent):
     def restore_original_prompt(self):
         """Restore the original system prompt."""
         self.system = self.original_system
+
+    def _build_messages(self, clean_input):
+        """Uses the per-call system prompt override when one is active for this agent."""
+        messages = super()._build_messages(clean_input)
+        override = _system_override.get()
+        if override is not None and override[0] is self:
+            messages[0]["content"] = override[1]
+        return messages
         
     def execute(self, user_input):
         """Enhanced execute that handles input preservation and prompt modifications."""
@@ -144,15 +229,15 @@ class EnhancedLLMAgent(LLMAgent):
         
         # Apply prompt modification if this agent is targeted
         if self.name in prompt_modifications:
-            old_system = self.system
-            self.update_system_prompt(prompt_modifications[self.name])
+            # Override the prompt for this call only instead of mutating self.system
+            token = _system_override.set((self, prompt_modifications[self.name]))
             print(f" #################################### {self.name}: Applied new system prompt from PromptAgent")
             
-            # Execute with the original input but new prompt
-            result = self._execute_standard_with_preservation(original_input)
-            
-            # Restore original prompt for future use
-            self.system = old_system
+            try:
+                # Execute with the original input but new prompt
+                result = self._execute_standard_with_preservation(original_input)
+            finally:
+                _system_override.reset(token)
             
             # Preserve the prompt modification information
             if result["success"] and isinstance(result["output"], dict):
@@ -0,0 +1,122 @@
+"""
+Intent-keyed cache of PromptAgent prompt modifications.
+
+Most requests fall into a handful of domain / audience / format buckets, so
+the prompt set generated for one request of a bucket can be reused for the
+next instead of paying a large-model call before the real work starts. An
+intent function maps the user input to a cheap signature (a keyword bucket,
+an embedding-router cluster or a classifier label); None means "no confident
+intent", and those requests are generated as before. The cache is bounded
+with least-recently-used eviction and entries expire after a TTL:
+
+    cache = PromptCache(intent_fn=keyword_intent({"photosynthesis": "biology", "api": "software"}))
+    prompt_agent = PromptAgent("PromptAgent", model_config, system=prompt, prompt_cache=cache)
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+def keyword_intent(mapping, **matcher_kwargs):
+    """Intent = label of the winning keyword (see KeywordMatcher), None without a match."""
+    from KeywordMatcher import KeywordMatcher
+    matcher = KeywordMatcher(mapping, **matcher_kwargs)
+
+    def intent(text):
+        match = matcher.match(str(text))
+        return match[1] if match else None
+
+    return intent
+
+
+def router_intent(router):
+    """Intent = EmbeddingRouter cluster of the input, None when the router isn't confident."""
+
+    def intent(text):
+        match = router.route(str(text))
+        return match["flow"] if match["confident"] else None
+
+    return intent
+
+
+def classifier_intent(classifier, min_confidence=0.8):
+    """Intent = RoutingClassifier label of the input, None below `min_confidence`."""
+
+    def intent(text):
+        label, confidence = classifier.predict(str(text))
+        return label if confidence >= min_confidence else None
+
+    return intent
+
+
+class PromptCache:
+    def __init__(self, intent_fn, max_entries=256, ttl=3600.0):
+        """
+        Args:
+            intent_fn (callable): user input -> intent signature (hashable), or None for no cacheable intent
+            max_entries (int): Maximum number of cached prompt sets
+            ttl (float): Seconds after which a prompt set is regenerated (None = never)
+        """
+        self.intent_fn = intent_fn
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncategorized = 0      # Inputs without a confident intent
+        self._entries = OrderedDict()   # (intent, context) -> (stored at, prompt data)
+        self._lock = threading.Lock()
+
+    def intent(self, user_input):
+        """Intent signature of `user_input`; a failing intent function counts as no intent."""
+        try:
+            signature = self.intent_fn(user_input)
+        except Exception as e:
+            print(f" #################################### Intent detection failed: {e}")
+            signature = None
+        if signature is None:
+            with self._lock:
+                self.uncategorized += 1
+        return signature
+
+    def get(self, intent, context=None):
+        """Copy of the prompt data cached for `intent` (and agent `context`), or None."""
+        key = (intent, context)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, intent, prompt_data, context=None):
+        key = (intent, context)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(prompt_data))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, intent=None):
+        """Drops the prompt sets of `intent`, or all of them, e.g. after a prompt was found to be bad."""
+        with self._lock:
+            if intent is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == intent]:
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "uncategorized": self.uncategorized,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0}
@@ -0,0 +1,99 @@
+"""
+Retry policies for Agent.run_with_retries.
+
+Failures are classified before deciding whether and when to retry:
+
+- transport:  the request never produced an answer (connection refused,
+              timeout while a model loads, HTTP 429/5xx). Retried with
+              exponential backoff and jitter so a struggling Ollama server
+              gets room to recover.
+- validation: the model answered but validate_fn rejected it. Retried with a
+              separate (by default immediate) policy, since a new generation
+              may pass.
+- fatal:      retrying cannot help (unknown model, bad request). Not retried.
+
+A RetryBudget caps the retries of a whole run across all of its agents, so
+one slow server doesn't turn into a retry storm from every agent at once.
+"""
+
+import random
+import threading
+
+import httpx
+import ollama
+
+TRANSPORT = "transport"
+VALIDATION = "validation"
+FATAL = "fatal"
+
+
+def classify_error(error):
+    """Returns TRANSPORT for retryable connection/server errors, FATAL otherwise."""
+    if isinstance(error, ollama.ResponseError):
+        if error.status_code == 429 or error.status_code >= 500:
+            return TRANSPORT
+        return FATAL
+    if isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError)):
+        return TRANSPORT
+    return FATAL
+
+
+def failure_kind(result):
+    """Kind of a failed execute result; results without an `error_kind` are validation failures."""
+    return result.get("error_kind", VALIDATION)
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        max_retries: Retries allowed by this policy (None = only the agent's retry_limit applies)
+        base_delay: Delay before the first retry, in seconds
+        max_delay: Upper bound of the delay
+        multiplier: Growth factor of the delay per retry
+        jitter: Draw the delay uniformly from [0, backoff] instead of sleeping the full backoff
+    """
+
+    def __init__(self, max_retries=None, base_delay=0.5, max_delay=8.0, multiplier=2.0, jitter=True):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def allows(self, retry_number):
+        """True if this policy permits retry number `retry_number` (1-based)."""
+        return self.max_retries is None or retry_number <= self.max_retries
+
+    def delay(self, retry_number):
+        """Seconds to wait before retry number `retry_number` (1-based)."""
+        backoff = min(self.max_delay, self.base_delay * self.multiplier ** (retry_number - 1))
+        if self.jitter:
+            return random.uniform(0, backoff)
+        return backoff
+
+
+class RetryBudget:
+    """Thread-safe cap on the total retries of one workflow run"""
+
+    def __init__(self, max_retries):
+        self.max_retries = max_retries
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self):
+        """Takes one retry from the budget; False once it is used up."""
+        with self._lock:
+            if self.spent >= self.max_retries:
+                return False
+            self.spent += 1
+            return True
+
+    @property
+    def remaining(self):
+        return max(0, self.max_retries - self.spent)
+
+
+DEFAULT_TRANSPORT_POLICY = RetryPolicy(base_delay=0.5, max_delay=8.0)
+DEFAULT_VALIDATION_POLICY = RetryPolicy(base_delay=0.0)
@@ -0,0 +1,86 @@
+"""
+In-memory cache of SwitchAgent routing decisions.
+
+Chat traffic repeats itself, so a decision made by the LLM (or the embedding
+router) is remembered under the normalised input text: lowercase, collapsed
+whitespace, trailing punctuation dropped. The cache is bounded with
+least-recently-used eviction and entries expire after a TTL.
+
+Every lookup carries the switch's signature (system prompt, available flows,
+default flow). When it changes, e.g. through set_available_flows, all cached
+decisions are dropped, since they may point at flows that no longer exist:
+
+    switch_config["routing_cache"] = RoutingCache(max_entries=1024, ttl=600)
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RoutingCache:
+    def __init__(self, max_entries=1024, ttl=600.0):
+        """
+        Args:
+            max_entries (int): Maximum number of cached decisions
+            ttl (float): Seconds after which a decision expires (None = never)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()   # normalised text -> (stored at, decision)
+        self._signature = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text):
+        """Cache key of `text`: case, spacing and trailing punctuation don't matter."""
+        return _WHITESPACE.sub(" ", str(text)).strip().rstrip("?!.").strip().lower()
+
+    def _check_signature(self, signature):
+        # Caller holds the lock
+        if signature != self._signature:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._signature = signature
+
+    def get(self, text, signature):
+        """Cached decision for `text`, or None on a miss, an expired entry or a changed signature."""
+        key = self.normalize(text)
+        with self._lock:
+            self._check_signature(signature)
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def set(self, text, signature, decision):
+        """Stores `decision` for `text`, evicting the least recently used entries."""
+        key = self.normalize(text)
+        with self._lock:
+            self._check_signature(signature)
+            self._entries[key] = (time.monotonic(), dict(decision))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "invalidations": self.invalidations}
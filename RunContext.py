@@ -0,0 +1,73 @@
+"""
+Per-run execution state for WorkflowManager.
+
+Everything that changes while a workflow runs (fan-in buffers, retry counters,
+the active workflow after a switch) lives on a RunContext instead of on the
+shared agents and manager, so one pre-built manager can serve many runs at once.
+Routing comes from the immutable ExecutionPlan of the active workflow.
+"""
+
+import uuid
+
+
+class RunContext:
+    """State of a single workflow run"""
+
+    def __init__(self, plan, workflow_name=None, run_id=None):
+        self.run_id = run_id or uuid.uuid4().hex
+        self.workflow_name = workflow_name  # Active workflow (None = manager's connection map)
+        self.plan = plan                    # ExecutionPlan used for routing in this run
+        self.entry_node = None              # Agent the active plan was entered at
+        self.pending_inputs = {}            # agent name -> inputs received so far (fan-in)
+        self.retry_counts = {}              # agent name -> failed attempts in this run
+        self.outputs = {}                   # agent name -> last successful output
+        self.final_outputs = {}             # agent name -> output of agents that ended a branch
+        self.model_limiter = None           # Optional per-model concurrency limiter (WorkflowScheduler)
+        self.checkpoint_store = None        # Optional CheckpointStore saved after every successful agent
+        self.retry_budget = None            # Optional RetryBudget shared by all agents of the run
+        self.failed = []                    # (agent name, input) of agents that failed after their retries
+
+    def switch_workflow(self, workflow_name, plan):
+        """
+        Routes the rest of this run through another workflow, entered at its first agent.
+        Fan-in buffers of the old workflow are dropped like its queued agents,
+        so an agent shared by both flows only joins inputs of the new one.
+        """
+        self.workflow_name = workflow_name
+        self.plan = plan
+        self.entry_node = plan.start_node
+        self.pending_inputs = {}
+
+    def next_agents(self, agent_name):
+        """Agents that receive `agent_name`'s output in the active workflow."""
+        return self.plan.next_agents(agent_name)
+
+    def join_count(self, agent_name):
+        """Number of inputs `agent_name` waits for before it runs."""
+        return self.plan.join_count(self.entry_node, agent_name)
+
+    def checkpoint_state(self, frontier, status="running"):
+        """
+        JSON-ready snapshot of this run for a CheckpointStore.
+        `frontier` lists (agent_name, input, joined) for every agent still to
+        run; `joined` marks inputs that already went through fan-in.
+        """
+        return {
+            "status": status,
+            "workflow_name": self.workflow_name,
+            "entry_node": self.entry_node,
+            "frontier": [list(item) for item in frontier],
+            "pending_inputs": {name: list(inputs) for name, inputs in self.pending_inputs.items() if inputs},
+            "outputs": dict(self.outputs),
+            "final_outputs": dict(self.final_outputs),
+        }
+
+    def restore_checkpoint(self, state):
+        """Loads outputs, fan-in buffers and the entry node from a checkpoint snapshot."""
+        self.entry_node = state.get("entry_node")
+        self.pending_inputs = {name: list(inputs) for name, inputs in state.get("pending_inputs", {}).items()}
+        self.outputs = dict(state.get("outputs", {}))
+        self.final_outputs = dict(state.get("final_outputs", {}))
+
+    def __repr__(self):
+        return f"RunContext(run_id={self.run_id!r}, workflow={self.workflow_name!r})"
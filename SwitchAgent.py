@@ -1,12 +1,25 @@
+import asyncio
+import os
+from types import MappingProxyType
+
 from Agent import LLMAgent
+from KeywordMatcher import KeywordMatcher
 
 class SwitchAgent(LLMAgent):
     def __init__(self, name, model_config, system=None, retry_limit=1, workflow_config=None):
         super().__init__(name, model_config, system=system or "", retry_limit=retry_limit)
         self.workflow_config = workflow_config or {}
         self.available_flows = []
+        self.keyword_priorities = None  # Optional keyword -> priority (lower wins) for keyword_mapping
+        self.keyword_word_boundaries = True  # Changing either setting recompiles the keyword matcher
         self.keyword_mapping = {}
         self.default_flow = "default_flow"
+        self.embedding_router = None    # Optional EmbeddingRouter tried before the LLM
+        self.routing_cache = None       # Optional RoutingCache of embedding/LLM decisions
+        self.constrained_decision = False  # Enum schema + token cap on the LLM decision
+        self.routing_classifier = None  # Optional RoutingClassifier asked before the embedding router/LLM
+        self.classifier_confidence = 0.8
+        self.decision_log = None        # Optional DecisionLog every decision is appended to
         
         # Override llm_fn to return just the output value, not stringified dict
         self.llm_fn = self._switch_agent_llm_fn
@@ -14,9 +27,61 @@ class SwitchAgent(LLMAgent):
         # Configure from workflow_config if provided
         if workflow_config:
             self.available_flows = workflow_config.get("available_flows", [])
+            self.keyword_priorities = workflow_config.get("keyword_priorities")
+            self.keyword_word_boundaries = workflow_config.get("keyword_word_boundaries", True)
             self.keyword_mapping = workflow_config.get("keyword_mapping", {})
             self.default_flow = workflow_config.get("default_flow", "default_flow")
             self.use_llm_decision = workflow_config.get("use_llm_decision", False)
+            self.routing_cache = workflow_config.get("routing_cache")
+            self.constrained_decision = workflow_config.get("constrained_decision", False)
+            self.classifier_confidence = workflow_config.get("classifier_confidence", 0.8)
+            self._configure_distillation(workflow_config.get("routing_classifier"),
+                                         workflow_config.get("decision_log"))
+            self.embedding_router = workflow_config.get("embedding_router")
+            if self.embedding_router is None and workflow_config.get("embedding_routes"):
+                from EmbeddingRouter import EmbeddingRouter
+                self.embedding_router = EmbeddingRouter(
+                    workflow_config["embedding_routes"],
+                    model=workflow_config.get("embedding_model", "nomic-embed-text"),
+                    backend=self.get_backend(),
+                    min_margin=workflow_config.get("embedding_margin", 0.05),
+                    min_score=workflow_config.get("embedding_min_score"))
+
+    @property
+    def keyword_mapping(self):
+        """Read-only view of the keyword -> flow mapping; assign a new dict to change it."""
+        return MappingProxyType(self._keyword_matcher.mapping)
+
+    @keyword_mapping.setter
+    def keyword_mapping(self, mapping):
+        # Compiled once here so routing never rescans the mapping per request
+        self._keyword_matcher = KeywordMatcher(mapping, priorities=self.keyword_priorities,
+                                               word_boundaries=self.keyword_word_boundaries)
+
+    @property
+    def keyword_priorities(self):
+        """Optional keyword -> priority (lower wins); assign a new dict to change it."""
+        return self._keyword_priorities
+
+    @keyword_priorities.setter
+    def keyword_priorities(self, priorities):
+        self._keyword_priorities = priorities
+        self._recompile_keywords()
+
+    @property
+    def keyword_word_boundaries(self):
+        return self._keyword_word_boundaries
+
+    @keyword_word_boundaries.setter
+    def keyword_word_boundaries(self, word_boundaries):
+        self._keyword_word_boundaries = word_boundaries
+        self._recompile_keywords()
+
+    def _recompile_keywords(self):
+        """Rebuilds the keyword matcher after a matching setting changed (no-op before the mapping is set)."""
+        matcher = self.__dict__.get("_keyword_matcher")
+        if matcher is not None:
+            self.keyword_mapping = matcher.mapping
 
     def _switch_agent_llm_fn(self, input_data):
         """Custom LLM function for SwitchAgent that returns just the output value"""
@@ -24,71 +89,227 @@ class SwitchAgent(LLMAgent):
             return input_data["output"]
         return str(input_data)
 
+    def _chat_options(self):
+        """
+        In constrained mode the answer is capped at the longest flow name plus its
+        JSON quotes (a token is never shorter than one character) and stops at a newline.
+        """
+        options = super()._chat_options()
+        if self.constrained_decision and self.available_flows:
+            options["num_predict"] = max(len(flow) for flow in self.available_flows) + 2
+            options["stop"] = ["\n"]
+        return options
+
+    def _chat_request(self, messages):
+        """Constrained mode sends the flow names as an enum JSON schema through Ollama's `format`."""
+        request = super()._chat_request(messages)
+        if self.constrained_decision and self.available_flows:
+            request["format"] = {"type": "string", "enum": list(self.available_flows)}
+        return request
+
     def set_available_flows(self, flows):
         """Set available flows dynamically from WorkflowManager"""
         self.available_flows = flows
         # Don't overwrite the system prompt - it should be set properly from the prompt file
         # The available flows are already included in the prompt file content
     
+    def _configure_distillation(self, classifier, log_path):
+        """Loads the routing classifier (object or model file) and opens the decision log."""
+        if classifier is not None or log_path:
+            from routing_classifier import DecisionLog, RoutingClassifier
+            if isinstance(classifier, str):
+                if os.path.exists(classifier):
+                    classifier = RoutingClassifier.load(classifier)
+                else:
+                    print(f" #################################### Routing classifier {classifier} not found, routing without it")
+                    classifier = None
+            self.routing_classifier = classifier
+            self.decision_log = DecisionLog(log_path) if log_path else None
+
     def execute(self, user_input):
         print(f" #################################### SwitchAgent deciding on workflow with input: {user_input}")
         
         # Extract clean content from input if it's a dictionary (same as LLMAgent fix)
-        if isinstance(user_input, dict):
-            if 'output' in user_input:
-                clean_input = user_input['output']
-            else:
-                clean_input = str(user_input)
-        else:
-            clean_input = user_input
+        clean_input = self._clean_input(user_input)
+        return self._log_decision(clean_input, self._decide(clean_input))
+
+    async def aexecute(self, user_input):
+        """Async version of execute: the LLM decision awaits the async client."""
+        print(f" #################################### SwitchAgent deciding on workflow with input: {user_input}")
+        
+        clean_input = self._clean_input(user_input)
+        return self._log_decision(clean_input, await self._adecide(clean_input))
+
+    def _decide(self, clean_input):
+        """Tries the routing cache, classifier, embeddings, LLM and keywords in turn."""
+        decision = self._cached_decision(clean_input) or self._classifier_decision(clean_input)
+        if decision:
+            return decision
+        
+        # One embedding call settles most inputs; the LLM only sees the ambiguous ones
+        decision = self._embedding_decision(clean_input)
+        if decision:
+            return self._remember(clean_input, decision)
         
         # If configured to use LLM for decision making
         if self.workflow_config.get("use_llm_decision", False) and self.system:
             try:
                 # Use the parent LLM execution to make the decision with clean input
-                llm_result = super().execute(clean_input)
-                if llm_result["success"]:
-                    raw_output = llm_result["output"]
-                    # Handle case where output might be a string or needs extraction
-                    if isinstance(raw_output, str):
-                        flow_name = raw_output.strip()
-                    else:
-                        flow_name = str(raw_output).strip()
-                    # Validate that the suggested flow exists
-                    if flow_name in self.available_flows:
-                        return {
-                            "output": clean_input,  # Keep original clean input for workflow continuation
-                            "success": True, 
-                            "switch_flow": flow_name,
-                            "display_output": f"🔍 LLM Decision: Routing '{clean_input}' to '{flow_name}'",
-                            "llm_decision": flow_name
-                        }
-                    else:
-                        print(f" #################################### LLM suggested invalid flow '{flow_name}', using default")
-                        return {
-                            "output": clean_input,  # Keep original clean input for workflow continuation
-                            "success": True, 
-                            "switch_flow": self.default_flow,
-                            "display_output": f"🔍 LLM Decision: Invalid flow '{flow_name}', using default '{self.default_flow}'",
-                            "llm_decision": f"invalid:{flow_name}→{self.default_flow}"
-                        }
+                decision = self._llm_decision(clean_input, super().execute(clean_input))
+                if decision:
+                    return self._remember(clean_input, decision)
             except Exception as e:
                 print(f" #################################### Error in LLM decision: {e}, falling back to keyword matching")
                 # Continue to fallback logic, will be handled below
         
+        return self._keyword_decision(clean_input)
+
+    async def _adecide(self, clean_input):
+        """Async version of _decide."""
+        decision = self._cached_decision(clean_input) or self._classifier_decision(clean_input)
+        if decision:
+            return decision
+        
+        # The worker thread is only needed for a blocking embedding call
+        decision = None
+        if self.embedding_router is not None:
+            decision = await asyncio.to_thread(self._embedding_decision, clean_input)
+        if decision:
+            return self._remember(clean_input, decision)
+        
+        if self.workflow_config.get("use_llm_decision", False) and self.system:
+            try:
+                decision = self._llm_decision(clean_input, await super().aexecute(clean_input))
+                if decision:
+                    return self._remember(clean_input, decision)
+            except Exception as e:
+                print(f" #################################### Error in LLM decision: {e}, falling back to keyword matching")
+        
+        return self._keyword_decision(clean_input)
+
+    def _log_decision(self, clean_input, decision):
+        """Appends (input, flow, method) to the decision log; these records train the routing classifier."""
+        if self.decision_log is not None:
+            method = "cache" if decision.get("cached") else decision.get("decision_method", "unknown")
+            try:
+                self.decision_log.append(str(clean_input), decision["switch_flow"], method)
+            except OSError as e:
+                print(f" #################################### Could not log routing decision: {e}")
+        return decision
+
+    def _classifier_decision(self, clean_input):
+        """Routes with the distilled classifier; None when it is missing, unsure or names an unknown flow."""
+        if self.routing_classifier is None:
+            return None
+        flow, confidence = self.routing_classifier.predict(clean_input)
+        if confidence < self.classifier_confidence or flow not in self.available_flows:
+            print(f" #################################### Classifier unsure ({flow}, {confidence:.2f}), escalating")
+            return None
+        return {
+            "output": clean_input,
+            "success": True,
+            "switch_flow": flow,
+            "display_output": f"🔍 Classifier Decision: Routing '{clean_input}' to '{flow}' (confidence {confidence:.2f})",
+            "decision_method": "classifier"
+        }
+
+    def _routing_signature(self):
+        """Everything a cached decision depends on; a change invalidates the routing cache."""
+        return (self.system, tuple(self.available_flows), self.default_flow)
+
+    def _cached_decision(self, clean_input):
+        """Earlier embedding/LLM decision for the same (normalised) input, or None."""
+        if self.routing_cache is None:
+            return None
+        decision = self.routing_cache.get(clean_input, self._routing_signature())
+        if decision is None:
+            return None
+        print(f" #################################### SwitchAgent: routing cache hit → {decision['switch_flow']}")
+        decision["output"] = clean_input
+        decision["display_output"] = f"🔍 Cached Decision: Routing '{clean_input}' to '{decision['switch_flow']}'"
+        decision["cached"] = True
+        return decision
+
+    def _remember(self, clean_input, decision):
+        """Caches embedding decisions and valid LLM decisions; fallbacks are cheap and not cached."""
+        if self.routing_cache is not None and not str(decision.get("llm_decision", "")).startswith("invalid:"):
+            self.routing_cache.set(clean_input, self._routing_signature(), decision)
+        return decision
+
+    def _embedding_decision(self, clean_input):
+        """Routes by embedding similarity; None when no router is set, it fails, isn't confident or names an unknown flow."""
+        if self.embedding_router is None:
+            return None
+        try:
+            match = self.embedding_router.route(clean_input)
+        except Exception as e:
+            print(f" #################################### Error in embedding decision: {e}, falling back")
+            return None
+        summary = f"score {match['score']:.2f}, margin {match['margin']:.2f}"
+        if not match["confident"]:
+            print(f" #################################### Embedding match '{match['flow']}' not confident ({summary}), falling back")
+            return None
+        if match["flow"] not in self.available_flows:
+            print(f" #################################### Embedding match '{match['flow']}' is not an available flow, falling back")
+            return None
+        return {
+            "output": clean_input,
+            "success": True,
+            "switch_flow": match["flow"],
+            "display_output": f"🔍 Embedding Match: Routing '{clean_input}' to '{match['flow']}' ({summary})",
+            "decision_method": "embedding",
+            "embedding_scores": match["scores"]
+        }
+
+    def _llm_decision(self, clean_input, llm_result):
+        """Turns the LLM's flow name into a routing result, or None if the call failed."""
+        if not llm_result["success"]:
+            return None
+        raw_output = llm_result["output"]
+        # Handle case where output might be a string or needs extraction
+        if isinstance(raw_output, str):
+            flow_name = raw_output.strip()
+        else:
+            flow_name = str(raw_output).strip()
+        # Constrained decisions arrive as a JSON string ("science_flow")
+        flow_name = flow_name.strip('"').strip()
+        # Validate that the suggested flow exists
+        if flow_name in self.available_flows:
+            return {
+                "output": clean_input,  # Keep original clean input for workflow continuation
+                "success": True, 
+                "switch_flow": flow_name,
+                "display_output": f"🔍 LLM Decision: Routing '{clean_input}' to '{flow_name}'",
+                "llm_decision": flow_name,
+                "decision_method": "llm"
+            }
+        else:
+            print(f" #################################### LLM suggested invalid flow '{flow_name}', using default")
+            return {
+                "output": clean_input,  # Keep original clean input for workflow continuation
+                "success": True, 
+                "switch_flow": self.default_flow,
+                "display_output": f"🔍 LLM Decision: Invalid flow '{flow_name}', using default '{self.default_flow}'",
+                "llm_decision": f"invalid:{flow_name}→{self.default_flow}",
+                "decision_method": "llm_invalid"
+            }
+
+    def _keyword_decision(self, clean_input):
+        """Keyword-based routing used when the LLM decision is disabled or fails."""
         # Fallback to keyword-based matching
         user_input_lower = clean_input.lower()
         
         # Check configured keyword mappings first
-        for keyword, flow in self.keyword_mapping.items():
-            if keyword.lower() in user_input_lower:
-                return {
-                    "output": clean_input,  # Keep original clean input
-                    "success": True, 
-                    "switch_flow": flow,
-                    "display_output": f"🔍 Keyword Match: Found '{keyword}' → Routing to '{flow}'",
-                    "decision_method": "keyword"
-                }
+        keyword_match = self._keyword_matcher.match(clean_input)
+        if keyword_match:
+            keyword, flow = keyword_match
+            return {
+                "output": clean_input,  # Keep original clean input
+                "success": True, 
+                "switch_flow": flow,
+                "display_output": f"🔍 Keyword Match: Found '{keyword}' → Routing to '{flow}'",
+                "decision_method": "keyword"
+            }
         
         # Default hardcoded fallbacks (for backward compatibility)
         if "science" in user_input_lower:
@@ -1,11 +1,46 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from ExecutionPlan import compile_workflow, reachable_subgraph, WorkflowCompileError
+from LLMBackend import backend_for
+from RetryPolicy import RetryBudget
+from RunContext import RunContext
+
+
+class _JoinedInput:
+    """Queued input restored from a checkpoint that already went through the agent's fan-in."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
 class WorkflowManager:
-    def __init__(self):
+    def __init__(self, max_workers=1):
         self.agents = {}                # All available agents (shared across flows)
         self.connections = {}           # Main workflow connections
         self.pending_inputs = {}
         self.workflows = {}             # Multiple subflows by name
+        self.active_workflow = None     # Name of the workflow new runs start in (None = connections)
+        self.plans = {}                 # Compiled ExecutionPlan per workflow name
+        self._connections_plans = {}    # start agent -> compiled plan of self.connections, rebuilt after changes
         self.chat_enabled = False       # NEW: Flag for chat integration
         self.event_bus = None          # NEW: Optional event bus
+        self.max_workers = max_workers  # >1 runs ready sibling agents concurrently
+        self.checkpoint_store = None    # Optional CheckpointStore used by every run
+        self.retry_budget = None        # Max retries per run across all agents (None = unlimited)
+        self.keep_alive = {}            # model -> keep_alive policy sent with its requests
+        self._warmup_timers = []        # Pending scheduled warmups
+        self.prefetch_models = False    # Load the next agents' models while the current agent runs
+        self.prefetch_cooldown = 30.0   # Seconds before the same model is prefetched again
+        self._prefetched = {}           # (backend id, host, model) -> time of the last prefetch
+        self._prefetching = set()       # Prefetches still loading
+        self._prefetch_lock = threading.Lock()
 
     def enable_chat_integration(self, event_bus):
         """Enable chat integration with event bus"""
@@ -103,6 +138,9 @@ class WorkflowManager:
         self.agents[agent.name] = agent
         self.connections[agent.name] = next_agents if next_agents else []
         self.pending_inputs[agent.name] = []
+        self._connections_plans = {}
+        if agent.get_model_name() in self.keep_alive:
+            agent.model_config["keep_alive"] = self.keep_alive[agent.get_model_name()]
         
         # If this is a SwitchAgent, configure it with available workflows
         if hasattr(agent, 'set_available_flows'):
@@ -112,8 +150,12 @@ class WorkflowManager:
         """
         Adds a named subflow (workflow) with agent connections.
         `agent_sequence` is a dict: {agent_name: [next_agent_names]}
+        The workflow is compiled into an ExecutionPlan right away, so a cyclic
+        graph raises WorkflowCompileError here instead of looping at run time.
         """
+        self.plans[workflow_name] = compile_workflow(workflow_name, agent_sequence)
         self.workflows[workflow_name] = agent_sequence
+        self._connections_plans = {}
         for agent_name, next_agents in agent_sequence.items():
             self.connections[agent_name] = next_agents if next_agents else []
         
@@ -128,79 +170,530 @@ class WorkflowManager:
             print(f" #################################### Workflow '{new_workflow_name}' not found!")
             return False
         print(f" #################################### Switching to workflow: {new_workflow_name}")
-        self.connections = self.workflows[new_workflow_name]
+        # Copy so later add_workflow calls don't write into the named workflow
+        self.connections = dict(self.workflows[new_workflow_name])
+        self.active_workflow = new_workflow_name
+        self._connections_plans = {}
         return True
 
-    def run_workflow(self, start_agent_name, input_data):
-        input_queue = [(start_agent_name, input_data)]
-        
+    def get_plan(self, workflow_name=None, start_agent=None):
+        """
+        Compiled plan of a named workflow, or of the manager's current connections.
+        For the connections only the part reachable from `start_agent` (the
+        first connected agent by default) is compiled, since the map merges
+        every added workflow and a run only walks the flows it enters.
+        """
+        if workflow_name is not None:
+            return self.plans[workflow_name]
+        if start_agent is None:
+            start_agent = next(iter(self.connections), None)
+        plan = self._connections_plans.get(start_agent)
+        if plan is None:
+            agent_sequence = reachable_subgraph(self.connections, start_agent) if start_agent is not None else {}
+            plan = compile_workflow(self.active_workflow, agent_sequence)
+            self._connections_plans[start_agent] = plan
+        return plan
+
+    def _check_agents(self, plan):
+        """Raises WorkflowCompileError if the plan references unregistered agents."""
+        missing = plan.missing_agents(self.agents)
+        if missing:
+            label = f"Workflow '{plan.name}'" if plan.name else "Workflow connections"
+            raise WorkflowCompileError(f"{label} references unknown agents: {', '.join(missing)}")
+
+    def create_context(self, workflow_name=None, run_id=None, start_agent=None):
+        """
+        Creates the per-run state for a new run. The run starts in `workflow_name`
+        if given, otherwise in the manager's currently active connections,
+        entered at `start_agent`.
+        """
+        if workflow_name is not None and workflow_name not in self.plans:
+            raise ValueError(f"Workflow '{workflow_name}' not found!")
+        plan = self.get_plan(workflow_name, start_agent)
+        self._check_agents(plan)
+        run_context = RunContext(plan, workflow_name if workflow_name is not None else self.active_workflow, run_id)
+        if self.retry_budget is not None:
+            run_context.retry_budget = RetryBudget(self.retry_budget)
+        return run_context
+
+    def _switch_run_workflow(self, run_context, new_workflow_name):
+        """Switches the workflow of a single run, leaving the manager and other runs untouched."""
+        if new_workflow_name not in self.workflows:
+            print(f" #################################### Workflow '{new_workflow_name}' not found!")
+            return False
+        plan = self.plans[new_workflow_name]
+        try:
+            self._check_agents(plan)
+        except WorkflowCompileError as e:
+            print(f" #################################### {e}")
+            return False
+        print(f" #################################### Switching to workflow: {new_workflow_name}")
+        run_context.switch_workflow(new_workflow_name, plan)
+        return True
+
+    def collect_models(self):
+        """Models referenced by the agents' model_config, mapped to the agents that use them."""
+        models = {}
+        for agent in self.agents.values():
+            model = agent.get_model_name()
+            if model:
+                models.setdefault(model, []).append(agent.name)
+        return models
+
+    def set_keep_alive(self, model, keep_alive):
+        """
+        Sets how long Ollama keeps `model` loaded after each request ("30m",
+        seconds, -1 = forever, 0 = unload at once) for every agent using it.
+        """
+        self.keep_alive[model] = keep_alive
+        for agent in self.agents.values():
+            if agent.get_model_name() == model:
+                agent.model_config["keep_alive"] = keep_alive
+
+    def _warm_targets(self, models=None):
+        """(backend, host, model) for every agent model and every host serving it."""
+        targets = {}
+        for agent in self.agents.values():
+            model = agent.get_model_name()
+            if not model or (models is not None and model not in models):
+                continue
+            backend = backend_for(agent.model_config)
+            hosts = backend.hosts_for(model) if hasattr(backend, "hosts_for") else [None]
+            for host in hosts:
+                targets[(id(backend), host, model)] = (backend, host, model)
+        return list(targets.values())
+
+    def warm_models(self, models=None, keep_alive=None, max_workers=4, wait=True):
+        """
+        Loads the agents' models in parallel so no request pays the cold-start time.
+        Every host of a load-balanced backend is warmed. `keep_alive` overrides
+        the per-model policy. Returns {model: load seconds or error message};
+        with `wait=False` the warmup runs on a background thread, which is returned.
+        """
+        if not wait:
+            thread = threading.Thread(target=self.warm_models, name="model-warmup", daemon=True,
+                                      kwargs={"models": models, "keep_alive": keep_alive, "max_workers": max_workers})
+            thread.start()
+            return thread
+
+        targets = self._warm_targets(models)
+        results = {}
+        if not targets:
+            return results
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="warmup") as executor:
+            futures = [(executor.submit(self._warm, *target, keep_alive), target) for target in targets]
+            for future, (backend, host, model) in futures:
+                label = model if host is None else f"{model}@{host}"
+                try:
+                    results[label] = round(future.result(), 3)
+                    print(f" #################################### Warmed {label} in {results[label]}s")
+                except Exception as e:
+                    results[label] = f"error: {e}"
+                    print(f" #################################### Could not warm {label}: {e}")
+        return results
+
+    def _warm(self, backend, host, model, keep_alive=None):
+        """Loads `model` with an empty generate request; returns the seconds it took."""
+        started = time.monotonic()
+        request = {"model": model}
+        policy = keep_alive if keep_alive is not None else self.keep_alive.get(model)
+        if policy is not None:
+            request["keep_alive"] = policy
+        if host is not None:
+            request["host"] = host
+        backend.generate(**request)
+        return time.monotonic() - started
+
+    def _prefetch_successors(self, agent_name, agent, run_context):
+        """
+        Starts loading the models of `agent_name`'s successors in the background
+        while it runs, so a model switch overlaps with its generation instead of
+        following it. A router with `available_flows` (SwitchAgent) has no plan
+        successors, so the first agents of each flow it can switch to are used
+        instead. Models the agent itself uses, models still loading and models
+        prefetched within `prefetch_cooldown` seconds are skipped.
+        """
+        if not self.prefetch_models:
+            return
+        current_model = agent.get_model_name()
+        models = set()
+        for next_agent in self._prefetch_candidates(agent_name, agent, run_context):
+            successor = self.agents.get(next_agent)
+            model = successor.get_model_name() if successor else None
+            if model and model != current_model:
+                models.add(model)
+        if not models:
+            return
+
+        now = time.monotonic()
+        with self._prefetch_lock:
+            targets = []
+            for backend, host, model in self._warm_targets(models):
+                key = (id(backend), host, model)
+                if key in self._prefetching or now - self._prefetched.get(key, float("-inf")) < self.prefetch_cooldown:
+                    continue
+                self._prefetched[key] = now
+                self._prefetching.add(key)
+                targets.append((backend, host, model))
+
+        for backend, host, model in targets:
+            label = model if host is None else f"{model}@{host}"
+            print(f" #################################### Prefetching {label} while {agent_name} runs")
+            threading.Thread(target=self._run_prefetch, args=(backend, host, model, label),
+                             name="model-prefetch", daemon=True).start()
+
+    def _prefetch_candidates(self, agent_name, agent, run_context):
+        """Agents that may run right after `agent_name`: its successors, or the entry of each flow it can switch to."""
+        candidates = list(run_context.next_agents(agent_name))
+        flows = list(getattr(agent, "available_flows", None) or [])
+        default_flow = getattr(agent, "default_flow", None)
+        if flows and default_flow:
+            flows.append(default_flow)
+        for flow in dict.fromkeys(flows):
+            plan = self.plans.get(flow)
+            if plan is None or plan.start_node is None:
+                continue
+            # Flows often open with a model-less agent (e.g. WorkflowStart), so look one step further
+            candidates.append(plan.start_node)
+            candidates.extend(plan.next_agents(plan.start_node))
+        return candidates
+
+    def _run_prefetch(self, backend, host, model, label):
+        """Background body of a prefetch; a failure only means the next agent loads the model itself."""
+        key = (id(backend), host, model)
+        try:
+            self._warm(backend, host, model)
+        except Exception as e:
+            with self._prefetch_lock:
+                self._prefetched.pop(key, None)
+            print(f" #################################### Could not prefetch {label}: {e}")
+        finally:
+            with self._prefetch_lock:
+                self._prefetching.discard(key)
+
+    def schedule_warmup(self, at, models=None, keep_alive=None, repeat=None):
+        """
+        Re-warms models at `at` (a datetime, or seconds from now), e.g. just
+        before a batch window. With `repeat` seconds the warmup re-arms itself
+        after every run. Returns the threading.Timer of the first warmup.
+        """
+        delay = (at - datetime.now()).total_seconds() if isinstance(at, datetime) else at
+
+        def run():
+            self.warm_models(models, keep_alive)
+            if repeat and timer in self._warmup_timers:
+                self.schedule_warmup(repeat, models, keep_alive, repeat)
+
+        timer = threading.Timer(max(0.0, delay), run)
+        timer.daemon = True
+        self._warmup_timers = [pending for pending in self._warmup_timers if pending.is_alive()] + [timer]
+        timer.start()
+        return timer
+
+    def cancel_warmups(self):
+        """Cancels all scheduled warmups."""
+        timers, self._warmup_timers = self._warmup_timers, []
+        for timer in timers:
+            timer.cancel()
+
+    def _prepare_agent(self, agent_name, input_data, run_context):
+        """Looks up an agent and feeds it one input; returns (agent, combined_input) once it is ready to run."""
+        agent = self.agents.get(agent_name)
+        if agent is None:
+            error_msg = f"Agent {agent_name} not found!"
+            print(f" #################################### {error_msg}")
+            if self.chat_enabled:
+                self._publish_agent_event("system_error", "System", f"❌ {error_msg}")
+            return None
+
+        if isinstance(input_data, _JoinedInput):
+            return agent, input_data.value
+
+        combined_input = agent.receive_input(input_data, run_context, run_context.join_count(agent_name))
+        if combined_input is None:
+            wait_msg = f"{agent_name} is waiting for more inputs..."
+            print(f" #################################### {wait_msg}")
+            
+            # NEW: Show waiting status in chat
+            if self.chat_enabled:
+                self._publish_agent_event("agent_waiting", agent_name, f"⏳ Waiting for more inputs...")
+            return None
+
+        return agent, combined_input
+
+    def _handle_result(self, current_agent_name, current_agent, result, run_context, agent_input=None):
+        """
+        Publishes an agent result and works out what runs next.
+        Returns (next_items, replace_queue): `replace_queue` is True when the
+        agent switched workflows and the pending queue must be discarded.
+        """
+        if not result["success"]:
+            run_context.failed.append((current_agent_name, agent_input))
+            retries = current_agent.get_retry_count(run_context)
+            error_msg = f"❌ {current_agent_name} failed after {retries} retries"
+            print(f" #################################### {current_agent_name} failed after {retries} retries.")
+            
+            # NEW: Show failure in chat
+            if self.chat_enabled:
+                self._publish_agent_event("agent_error", current_agent_name, error_msg)
+            return [], False
+
+        current_agent.reset_retry(run_context)
+        run_context.outputs[current_agent_name] = result["output"]
+
+        # NEW: Show agent output in chat (all agents now since no DisplayAgents to handle them)
+        if self.chat_enabled and not current_agent_name.startswith(('Chat', 'Workflow', 'UserInput')):
+            # Check if agent has a special display_output (like SwitchAgent decision)
+            if "display_output" in result:
+                display_data = self._extract_content(result["display_output"])
+            else:
+                display_data = self._extract_content(result["output"])
+            self._publish_agent_event("agent_output", current_agent_name, f"✅ {display_data}")
+
+        # Special case: Agent can return `{"switch_flow": "flow_name"}`
+        if "switch_flow" in result:
+            if not self._switch_run_workflow(run_context, result["switch_flow"]):
+                return [], False
+
+            # NEW: Announce workflow switch
+            if self.chat_enabled:
+                self._publish_agent_event("workflow_switch", "System", f"🔀 Switched to workflow: {result['switch_flow']}")
+            
+            # Restart from first agent in the new flow
+            first_agent = run_context.plan.start_node
+            # Extract clean content before passing to the new workflow
+            clean_output = self._extract_content(result["output"])
+            return [(first_agent, clean_output)], True
+
+        next_agents = run_context.next_agents(current_agent_name)
+        if not next_agents:
+            run_context.final_outputs[current_agent_name] = result["output"]
+        return [(next_agent, result["output"]) for next_agent in next_agents], False
+
+    def run_workflow(self, start_agent_name, input_data, max_workers=None, run_context=None, checkpoint_store=None):
+        """
+        Runs the active workflow from `start_agent_name` and returns its RunContext.
+        With `max_workers` > 1 (or `self.max_workers` > 1) agents that become
+        ready at the same time, such as the branches of a fan-out, run
+        concurrently on a bounded thread pool and are joined at fan-in agents.
+        All run state lives on `run_context` (a fresh one by default), so
+        several threads can run workflows through the same manager.
+        With a `checkpoint_store` (or `self.checkpoint_store`) the run is saved
+        after every successful agent and can be continued with resume_workflow.
+        """
+        run_context = self._start_run(start_agent_name, input_data, run_context, checkpoint_store)
+        return self._execute(run_context, [(start_agent_name, input_data)], max_workers)
+
+    def resume_workflow(self, run_id, checkpoint_store=None, max_workers=None):
+        """
+        Continues a checkpointed run from its last completed frontier and returns its RunContext.
+        Agents that already succeeded are not run again; agents that were
+        queued, running or failed when the checkpoint was written run now.
+        """
+        run_context, frontier = self._load_checkpoint(run_id, checkpoint_store)
+        return self._execute(run_context, frontier, max_workers)
+
+    def _start_run(self, start_agent_name, input_data, run_context, checkpoint_store):
+        """Creates or completes the RunContext of a new run and announces it."""
+        run_context = run_context or self.create_context(start_agent=start_agent_name)
+        if run_context.entry_node is None:
+            run_context.entry_node = start_agent_name
+        if checkpoint_store is not None:
+            run_context.checkpoint_store = checkpoint_store
+        elif run_context.checkpoint_store is None:
+            run_context.checkpoint_store = self.checkpoint_store
+
         # NEW: Announce workflow start
         if self.chat_enabled:
             # Don't truncate input preview - show full input
             input_preview = str(input_data)
             self._publish_agent_event("workflow_start", "System", f"🚀 Starting workflow with: {input_preview}")
-        
+        return run_context
+
+    def _load_checkpoint(self, run_id, checkpoint_store):
+        """Rebuilds the RunContext and queue of a checkpointed run."""
+        store = checkpoint_store or self.checkpoint_store
+        if store is None:
+            raise ValueError("No checkpoint store to resume from")
+        state = store.load(run_id)
+        if state is None:
+            raise ValueError(f"No checkpoint found for run {run_id}")
+
+        run_context = self.create_context(state.get("workflow_name"), run_id, start_agent=state.get("entry_node"))
+        run_context.restore_checkpoint(state)
+        run_context.checkpoint_store = store
+        frontier = [(agent_name, _JoinedInput(agent_input) if joined else agent_input)
+                    for agent_name, agent_input, joined in state.get("frontier", [])]
+
+        print(f" #################################### Resuming run {run_id} with {len(frontier)} queued agents")
+        if self.chat_enabled:
+            self._publish_agent_event("workflow_start", "System", f"♻️ Resuming workflow run {run_id}")
+        return run_context, frontier
+
+    def _checkpoint(self, run_context, queued, running=(), status="running"):
+        """Saves the run to its checkpoint store, if it has one."""
+        if run_context.checkpoint_store is None:
+            return
+        frontier = []
+        for agent_name, agent_input in queued:
+            if isinstance(agent_input, _JoinedInput):
+                frontier.append((agent_name, agent_input.value, True))
+            else:
+                frontier.append((agent_name, agent_input, False))
+        frontier.extend((agent_name, agent_input, True) for agent_name, agent_input in running)
+        frontier.extend((agent_name, agent_input, True) for agent_name, agent_input in run_context.failed)
+        try:
+            run_context.checkpoint_store.save(run_context.run_id, run_context.checkpoint_state(frontier, status))
+        except OSError as e:
+            print(f" #################################### Could not checkpoint run {run_context.run_id}: {e}")
+
+    def _finish_run(self, run_context):
+        """Writes the final checkpoint and announces completion."""
+        self._checkpoint(run_context, [], status="failed" if run_context.failed else "completed")
+
+        # NEW: Announce workflow completion
+        if self.chat_enabled:
+            self._publish_agent_event("workflow_complete", "System", "🎉 Workflow execution completed!")
+        return run_context
+
+    def _execute(self, run_context, input_queue, max_workers=None):
+        """Drains `input_queue` with the sequential or concurrent engine."""
+        workers = max_workers if max_workers is not None else self.max_workers
+        if workers and workers > 1:
+            self._drain_concurrent(input_queue, workers, run_context)
+        else:
+            self._drain_sequential(input_queue, run_context)
+        return self._finish_run(run_context)
+
+    def _drain_sequential(self, input_queue, run_context):
+        """Processes queued agent inputs one at a time, in order."""
         while input_queue:
             current_agent_name, input_data = input_queue.pop(0)
-            current_agent = self.agents.get(current_agent_name)
-            if current_agent is None:
-                error_msg = f"Agent {current_agent_name} not found!"
-                print(f" #################################### {error_msg}")
-                if self.chat_enabled:
-                    self._publish_agent_event("system_error", "System", f"❌ {error_msg}")
-                continue
-
-            # NEW: Announce agent processing (only for non-chat agents to avoid noise)
-            # Removed the "Processing..." message - we only want to show actual outputs
-
-            combined_input = current_agent.receive_input(input_data)
-            if combined_input is None:
-                wait_msg = f"{current_agent_name} is waiting for more inputs..."
-                print(f" #################################### {wait_msg}")
-                
-                # NEW: Show waiting status in chat
-                if self.chat_enabled:
-                    self._publish_agent_event("agent_waiting", current_agent_name, f"⏳ Waiting for more inputs...")
+            prepared = self._prepare_agent(current_agent_name, input_data, run_context)
+            if prepared is None:
                 continue
 
-            result = current_agent.run_with_retries(combined_input)
+            current_agent, combined_input = prepared
+            self._prefetch_successors(current_agent_name, current_agent, run_context)
+            result = current_agent.run_with_retries(combined_input, run_context)
+            next_items, replace_queue = self._handle_result(current_agent_name, current_agent, result,
+                                                            run_context, combined_input)
+            if replace_queue:
+                input_queue = next_items
+            else:
+                input_queue.extend(next_items)
             if result["success"]:
-                current_agent.reset_retry()
+                self._checkpoint(run_context, input_queue)
+
+    def _drain_concurrent(self, input_queue, max_workers, run_context):
+        """
+        Dispatches every ready agent to a thread pool and joins results as they finish.
+        Fan-in bookkeeping and chat events stay on the calling thread; only
+        `run_with_retries` runs on the workers. Branches still in flight when
+        a workflow switch happens are discarded, like the queued items of the
+        sequential engine.
+        """
+        pending = deque(input_queue)
+        in_flight = {}          # future -> (agent_name, agent, generation, combined_input)
+        generation = 0          # bumped on every workflow switch
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="workflow") as executor:
+            while pending or in_flight:
+                while pending and len(in_flight) < max_workers:
+                    agent_name, input_data = pending.popleft()
+                    prepared = self._prepare_agent(agent_name, input_data, run_context)
+                    if prepared is None:
+                        continue
+                    agent, combined_input = prepared
+                    self._prefetch_successors(agent_name, agent, run_context)
+                    future = executor.submit(agent.run_with_retries, combined_input, run_context)
+                    in_flight[future] = (agent_name, agent, generation, combined_input)
+
+                if not in_flight:
+                    continue
 
-                # NEW: Show agent output in chat (all agents now since no DisplayAgents to handle them)
-                if self.chat_enabled and not current_agent_name.startswith(('Chat', 'Workflow', 'UserInput')):
-                    # Check if agent has a special display_output (like SwitchAgent decision)
-                    if "display_output" in result:
-                        display_data = self._extract_content(result["display_output"])
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    agent_name, agent, submitted_in, combined_input = in_flight.pop(future)
+                    result = future.result()
+                    if submitted_in != generation:
+                        print(f" #################################### Discarding {agent_name} output from superseded workflow")
+                        continue
+                    next_items, replace_queue = self._handle_result(agent_name, agent, result,
+                                                                    run_context, combined_input)
+                    if replace_queue:
+                        generation += 1
+                        pending = deque(next_items)
                     else:
-                        display_data = self._extract_content(result["output"])
-                    self._publish_agent_event("agent_output", current_agent_name, f"✅ {display_data}")
-
-                # Special case: Agent can return `{"switch_flow": "flow_name"}`
-                if "switch_flow" in result:
-                    if self.switch_workflow(result["switch_flow"]):
-                        # NEW: Announce workflow switch
-                        if self.chat_enabled:
-                            self._publish_agent_event("workflow_switch", "System", f"🔀 Switched to workflow: {result['switch_flow']}")
-                        
-                        # Restart from first agent in the new flow
-                        first_agent = list(self.workflows[result["switch_flow"]].keys())[0]
-                        # Extract clean content before passing to the new workflow
-                        clean_output = self._extract_content(result["output"])
-                        input_queue = [(first_agent, clean_output)]
+                        pending.extend(next_items)
+                    if result["success"]:
+                        self._checkpoint(run_context, pending, self._running_items(in_flight, generation))
+
+    @staticmethod
+    def _running_items(in_flight, generation):
+        """(agent_name, combined_input) of in-flight agents that belong to the current workflow."""
+        return [(entry[0], entry[3]) for entry in in_flight.values() if entry[2] == generation]
+
+    async def arun_workflow(self, start_agent_name, input_data, max_concurrency=None, run_context=None,
+                            checkpoint_store=None):
+        """
+        Coroutine version of run_workflow built on Agent.arun_with_retries; returns the RunContext.
+        Ready agents run as tasks on the current event loop, so one process can
+        drive many workflow runs without a thread per run. `max_concurrency`
+        optionally bounds the number of in-flight agents of this run.
+        """
+        run_context = self._start_run(start_agent_name, input_data, run_context, checkpoint_store)
+        await self._drain_async([(start_agent_name, input_data)], max_concurrency, run_context)
+        return self._finish_run(run_context)
+
+    async def aresume_workflow(self, run_id, checkpoint_store=None, max_concurrency=None):
+        """Coroutine version of resume_workflow."""
+        run_context, frontier = self._load_checkpoint(run_id, checkpoint_store)
+        await self._drain_async(frontier, max_concurrency, run_context)
+        return self._finish_run(run_context)
+
+    async def _drain_async(self, input_queue, max_concurrency, run_context):
+        """Runs ready agents as tasks and joins them as they finish; in-flight tasks are cancelled on a switch."""
+        pending = deque(input_queue)
+        in_flight = {}          # task -> (agent_name, agent, generation, combined_input)
+        generation = 0          # bumped on every workflow switch
+
+        try:
+            while pending or in_flight:
+                while pending and (not max_concurrency or len(in_flight) < max_concurrency):
+                    agent_name, agent_input = pending.popleft()
+                    prepared = self._prepare_agent(agent_name, agent_input, run_context)
+                    if prepared is None:
+                        continue
+                    agent, combined_input = prepared
+                    self._prefetch_successors(agent_name, agent, run_context)
+                    task = asyncio.ensure_future(agent.arun_with_retries(combined_input, run_context))
+                    in_flight[task] = (agent_name, agent, generation, combined_input)
+
+                if not in_flight:
                     continue
 
-                next_agents = self.connections.get(current_agent_name, [])
-                for next_agent in next_agents:
-                    input_queue.append((next_agent, result["output"]))
-            else:
-                error_msg = f"❌ {current_agent_name} failed after {current_agent.retry_count} retries"
-                print(f" #################################### {current_agent_name} failed after {current_agent.retry_count} retries.")
-                
-                # NEW: Show failure in chat
-                if self.chat_enabled:
-                    self._publish_agent_event("agent_error", current_agent_name, error_msg)
-        
-        # NEW: Announce workflow completion
-        if self.chat_enabled:
-            self._publish_agent_event("workflow_complete", "System", "🎉 Workflow execution completed!")
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    agent_name, agent, submitted_in, combined_input = in_flight.pop(task)
+                    if task.cancelled():
+                        continue
+                    result = task.result()
+                    if submitted_in != generation:
+                        print(f" #################################### Discarding {agent_name} output from superseded workflow")
+                        continue
+                    next_items, replace_queue = self._handle_result(agent_name, agent, result,
+                                                                    run_context, combined_input)
+                    if replace_queue:
+                        # Branches of the old workflow are no longer needed
+                        generation += 1
+                        pending = deque(next_items)
+                        for other in in_flight:
+                            other.cancel()
+                    else:
+                        pending.extend(next_items)
+                    if result["success"]:
+                        self._checkpoint(run_context, pending, self._running_items(in_flight, generation))
+        finally:
+            for task in in_flight:
+                task.cancel()
@@ -0,0 +1,386 @@
+"""
+Bounded multi-run scheduler for WorkflowManager.
+
+WorkflowScheduler accepts many run_workflow submissions and runs them on a
+fixed worker pool instead of one thread per request. It caps the number of
+in-flight LLM calls per Ollama model, so a burst of runs can't overload the
+local server, and queues or rejects submissions once the queue is full.
+
+ModelAffinityLimiter additionally groups requests by model: on boxes that can
+only keep one or two models in memory it keeps serving the model that is
+already loaded and switches only when its queue is empty (or other requests
+have waited too long), instead of making Ollama swap models back and forth.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class SchedulerFullError(RuntimeError):
+    """Raised when a submission arrives while the scheduler queue is full."""
+
+
+class _SlotWaiter:
+    """A thread or asyncio task queued for a model slot; release() hands the slot over directly."""
+
+    def __init__(self, loop=None):
+        self.loop = loop                                    # None = a blocked thread
+        self.granted = False
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        """Wakes the waiter; False when its event loop is gone."""
+        if self.loop is None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+        except RuntimeError:
+            return False                                    # Loop closed
+        return True
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ModelConcurrencyLimiter:
+    """
+    Caps concurrent requests per model name (models without a limit are not capped).
+    Threads block in acquire(); asyncio tasks wait in aacquire() on a future,
+    so hundreds of waiting tasks don't hold executor threads.
+    """
+
+    def __init__(self, model_limits=None, default_limit=None):
+        self.model_limits = dict(model_limits or {})
+        self.default_limit = default_limit
+        self.in_flight = {}             # model -> requests currently holding a slot
+        self._waiters = {}              # model -> deque of _SlotWaiter, served FIFO
+        self._lock = threading.Lock()
+
+    def limit(self, model):
+        """Max concurrent requests for `model`, or None when it isn't capped."""
+        return self.model_limits.get(model, self.default_limit) or None
+
+    def _try_take(self, model):
+        """Takes a free slot without waiting; call with the lock held."""
+        limit = self.limit(model)
+        if self._waiters.get(model) or (limit and self.in_flight.get(model, 0) >= limit):
+            return False
+        self.in_flight[model] = self.in_flight.get(model, 0) + 1
+        return True
+
+    def acquire(self, model):
+        """Blocks until a request slot for `model` is free."""
+        with self._lock:
+            if self._try_take(model):
+                return
+            waiter = _SlotWaiter()
+            self._waiters.setdefault(model, deque()).append(waiter)
+        waiter.event.wait()
+
+    async def aacquire(self, model):
+        """
+        Async acquire that waits on the event loop without a worker thread.
+        Safe to cancel: a slot handed over after the caller was cancelled is
+        released right away.
+        """
+        with self._lock:
+            if self._try_take(model):
+                return
+            waiter = _SlotWaiter(asyncio.get_running_loop())
+            self._waiters.setdefault(model, deque()).append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters[model].remove(waiter)
+            if granted:
+                self.release(model)
+            raise
+
+    def release(self, model):
+        """Frees a slot, handing it straight to the longest waiting thread or task."""
+        with self._lock:
+            waiters = self._waiters.get(model)
+            while waiters:
+                waiter = waiters.popleft()
+                waiter.granted = True
+                if waiter.wake():
+                    return              # The slot stays counted in in_flight for the waiter
+            self.in_flight[model] -= 1
+
+    @contextmanager
+    def slot(self, model):
+        """Holds a request slot for `model` for the duration of the block."""
+        self.acquire(model)
+        try:
+            yield
+        finally:
+            self.release(model)
+
+
+class ModelAffinityLimiter(ModelConcurrencyLimiter):
+    """
+    Admits requests so that as few model switches as possible happen.
+
+    Args:
+        model_limits: {model_name: max concurrent requests}
+        default_limit: Limit for models missing from `model_limits` (None = unlimited)
+        max_active_models: Models allowed to have requests in flight at the same time
+        max_batch: Requests admitted for one model in a row while other models wait
+        max_wait: Seconds after which a waiting model is served before the active one
+        backend: Backend whose ps() reports resident models (None = default Ollama host)
+        refresh_interval: Seconds between ps() refreshes of the resident models
+    """
+
+    def __init__(self, model_limits=None, default_limit=None, max_active_models=1, max_batch=8,
+                 max_wait=10.0, backend=None, refresh_interval=5.0):
+        super().__init__(model_limits, default_limit)
+        self.max_active_models = max_active_models
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.backend = backend
+        self.refresh_interval = refresh_interval
+        self.resident = set()           # Models Ollama reports (or we last saw) loaded
+        self.switches = 0               # Times a different model than the last one was admitted
+        self._waiting = {}              # model -> deque of (ticket, arrival time)
+        self._last_model = None
+        self._batch = 0                 # Consecutive admissions of _last_model
+        self._last_refresh = 0.0
+        self._cond = threading.Condition(self._lock)
+        self._async_waiters = set()     # _SlotWaiter of tasks waiting for the next admission check
+
+    def refresh_resident(self):
+        """Reloads the resident models from the backend's ps(); keeps the last view if it fails."""
+        self._last_refresh = time.monotonic()
+        backend = self.backend
+        if backend is None:
+            from LLMBackend import get_backend
+            backend = get_backend()
+        try:
+            models = {entry["model"] for entry in backend.ps()["models"]}
+        except Exception as e:
+            print(f" #################################### Could not read resident models: {e}")
+            return self.resident
+        with self._lock:
+            self.resident = models
+        return models
+
+    def _limit(self, model):
+        return self.model_limits.get(model, self.default_limit)
+
+    def _active(self):
+        return {model for model, count in self.in_flight.items() if count > 0}
+
+    def _starving(self, model, now):
+        queue = self._waiting.get(model)
+        return bool(queue) and now - queue[0][1] >= self.max_wait
+
+    def _next_model(self, active, now):
+        """
+        Waiting model to bring in next: starving models first, then any model
+        but one that just used up its batch, preferring resident models and
+        then the longest waiting.
+        """
+        candidates = [model for model, queue in self._waiting.items() if queue and model not in active]
+        if not candidates:
+            return None
+        exhausted = self._batch >= self.max_batch
+        return min(candidates, key=lambda model: (not self._starving(model, now),
+                                                  exhausted and model == self._last_model,
+                                                  model not in self.resident,
+                                                  self._waiting[model][0][1]))
+
+    def _can_admit(self, model, ticket, now):
+        if self._waiting[model][0][0] is not ticket:
+            return False        # FIFO within a model
+        limit = self._limit(model)
+        if limit and self.in_flight.get(model, 0) >= limit:
+            return False
+        active = self._active()
+        others_waiting = any(queue for other, queue in self._waiting.items() if other != model)
+        if model in active:
+            if len(active) < self.max_active_models or not others_waiting:
+                return True
+            # Keep batching the loaded model unless someone else has waited long enough
+            overdue = any(self._starving(other, now) for other in self._waiting if other != model)
+            return not overdue and self._batch < self.max_batch
+        if len(active) >= self.max_active_models:
+            return False
+        return self._next_model(active, now) == model
+
+    def _admit(self, model):
+        """Admits the head of `model`'s queue; call with the lock held."""
+        self._waiting[model].popleft()
+        if model != self._last_model:
+            if self._last_model is not None:
+                self.switches += 1
+            self._last_model = model
+            self._batch = 0
+        self._batch += 1
+        self.in_flight[model] = self.in_flight.get(model, 0) + 1
+        self.resident.add(model)
+        self._notify()
+
+    def _notify(self):
+        """Wakes every waiting thread and task to re-check admission; call with the lock held."""
+        self._cond.notify_all()
+        for waiter in self._async_waiters:
+            waiter.wake()
+        self._async_waiters.clear()
+
+    def acquire(self, model):
+        """Blocks until `model` may send a request."""
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh_resident()
+        ticket = object()
+        with self._cond:
+            self._waiting.setdefault(model, deque()).append((ticket, time.monotonic()))
+            while not self._can_admit(model, ticket, time.monotonic()):
+                self._cond.wait(timeout=0.1)    # Re-check periodically so max_wait can kick in
+            self._admit(model)
+
+    async def aacquire(self, model):
+        """Async version of acquire; waits on the event loop instead of in a worker thread."""
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self._last_refresh = time.monotonic()
+            await asyncio.to_thread(self.refresh_resident)
+        loop = asyncio.get_running_loop()
+        ticket = object()
+        with self._cond:
+            self._waiting.setdefault(model, deque()).append((ticket, time.monotonic()))
+        try:
+            while True:
+                with self._cond:
+                    if self._can_admit(model, ticket, time.monotonic()):
+                        self._admit(model)
+                        return
+                    waiter = _SlotWaiter(loop)
+                    self._async_waiters.add(waiter)
+                # Re-check periodically so max_wait can kick in
+                await asyncio.wait({waiter.future}, timeout=0.1)
+                with self._cond:
+                    self._async_waiters.discard(waiter)
+        except asyncio.CancelledError:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+                queue = self._waiting[model]
+                for index, (queued, _) in enumerate(queue):
+                    if queued is ticket:
+                        del queue[index]
+                        self._notify()          # The next request of this model may be admissible now
+                        break
+            raise
+
+    def release(self, model):
+        with self._cond:
+            self.in_flight[model] -= 1
+            self._notify()
+
+    def stats(self):
+        """Model switches, waiting requests per model and the resident models."""
+        with self._lock:
+            return {"switches": self.switches,
+                    "waiting": {model: len(queue) for model, queue in self._waiting.items() if queue},
+                    "resident": sorted(self.resident)}
+
+
+class WorkflowScheduler:
+    """
+    Runs workflow submissions on a fixed pool of worker threads.
+
+    Args:
+        manager: Default WorkflowManager for submissions (can be given per submit)
+        max_workers: Number of workflow runs executing at the same time
+        model_limits: {model_name: max concurrent LLM requests}
+        default_model_limit: Limit for models missing from `model_limits` (None = unlimited)
+        max_queue_depth: Submissions allowed to wait for a worker
+        block_when_full: Wait for room instead of raising SchedulerFullError
+        limiter: Limiter used instead of the per-model caps, e.g. a ModelAffinityLimiter
+    """
+
+    def __init__(self, manager=None, max_workers=4, model_limits=None, default_model_limit=None,
+                 max_queue_depth=32, block_when_full=False, limiter=None):
+        self.manager = manager
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.block_when_full = block_when_full
+        self.limiter = limiter or ModelConcurrencyLimiter(model_limits, default_model_limit)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scheduler")
+        self._capacity = threading.BoundedSemaphore(max_workers + max_queue_depth)
+        self._lock = threading.Lock()
+        self._stats = {"queued": 0, "running": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def submit(self, start_agent_name=None, input_data=None, manager=None, workflow_name=None,
+               run_id=None, max_workers=None, timeout=None):
+        """
+        Queues a workflow run and returns a Future resolving to its RunContext.
+        Without `start_agent_name` the run starts at the first agent of
+        `workflow_name` (or of the manager's active workflow).
+        Raises SchedulerFullError when the queue is full and the scheduler
+        doesn't block (or `timeout` seconds pass while blocking).
+        """
+        manager = manager or self.manager
+        if manager is None:
+            raise ValueError("No WorkflowManager given to the scheduler")
+
+        if not self._capacity.acquire(blocking=self.block_when_full, timeout=timeout if self.block_when_full else None):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise SchedulerFullError(f"Scheduler queue is full ({self.max_queue_depth} waiting runs)")
+
+        try:
+            run_context = manager.create_context(workflow_name, run_id, start_agent_name)
+            run_context.model_limiter = self.limiter
+            start_agent_name = start_agent_name or run_context.plan.start_node
+            with self._lock:
+                self._stats["queued"] += 1
+            return self._executor.submit(self._run, manager, start_agent_name, input_data, run_context, max_workers)
+        except BaseException:
+            self._capacity.release()
+            raise
+
+    def _run(self, manager, start_agent_name, input_data, run_context, max_workers):
+        with self._lock:
+            self._stats["queued"] -= 1
+            self._stats["running"] += 1
+        outcome = "failed"
+        try:
+            result = manager.run_workflow(start_agent_name, input_data, max_workers=max_workers, run_context=run_context)
+            outcome = "completed"
+            return result
+        finally:
+            with self._lock:
+                self._stats["running"] -= 1
+                self._stats[outcome] += 1
+            self._capacity.release()
+
+    def stats(self):
+        """Counts of queued, running, completed, failed and rejected runs plus in-flight requests per model."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["model_in_flight"] = dict(self.limiter.in_flight)
+        if hasattr(self.limiter, "switches"):
+            stats["model_switches"] = self.limiter.switches
+        return stats
+
+    def shutdown(self, wait=True):
+        """Stops accepting work; with `wait` blocks until queued runs finish."""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
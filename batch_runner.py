@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Batch Runner
+
+Streams requests from a JSONL file through a workflow with several runs in
+flight at once, writing one result line per request to an output JSONL file
+as soon as it finishes. Requests whose id already has a completed result in
+the output file are skipped, so an interrupted batch can simply be restarted.
+
+Usage:
+  python batch_runner.py requests.jsonl results.jsonl --workflow default_flow --concurrency 4
+  python batch_runner.py requests.jsonl results.jsonl --start-agent SwitchAgent \\
+      --id-field request_id --input-field body
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from ChatAgents import extract_clean_content
+from enhanced_main import create_base_workflow_manager, create_terminal_workflows
+from WorkflowScheduler import WorkflowScheduler
+
+
+def iter_jsonl(path):
+    """Yields (line_number, record) for every non-empty line of a JSONL file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Warning: Skipping invalid JSON on line {line_number}: {e}")
+
+
+def load_completed_ids(output_path):
+    """Ids that already have a completed result in the output file."""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    for _, record in iter_jsonl(output_path):
+        if record.get("status") == "completed":
+            completed.add(str(record.get("id")))
+    return completed
+
+
+def _result_record(request_id, future, started):
+    """Builds the output line for a finished run."""
+    record = {"id": request_id, "elapsed": round(time.time() - started, 3)}
+    error = future.exception()
+    if error is not None:
+        record.update({"status": "failed", "error": str(error)})
+        return record
+
+    run_context = future.result()
+    outputs = {name: extract_clean_content(output) for name, output in run_context.final_outputs.items()}
+    # A branch that failed makes the whole run failed, so a restart runs it again
+    failed_agents = list(dict.fromkeys(name for name, _ in run_context.failed))
+    record.update({
+        "status": "completed" if outputs and not failed_agents else "failed",
+        "run_id": run_context.run_id,
+        "workflow": run_context.workflow_name,
+        "outputs": outputs,
+    })
+    if failed_agents:
+        record["failed_agents"] = failed_agents
+        record["error"] = f"Agents failed: {', '.join(failed_agents)}"
+    elif not outputs:
+        record["error"] = "Workflow finished without a final output"
+    return record
+
+
+def run_batch(manager, input_path, output_path, start_agent=None, workflow=None, concurrency=4,
+              id_field="id", input_field="input", model_limits=None):
+    """
+    Runs every request of `input_path` through `manager` and appends results to `output_path`.
+    At most `concurrency` runs execute at once and only as many requests are
+    read ahead as there are free slots, so huge input files stream in
+    constant memory. Returns counts of submitted, skipped, completed and failed requests.
+    """
+    completed_ids = load_completed_ids(output_path)
+    summary = {"submitted": 0, "skipped": 0, "completed": 0, "failed": 0}
+    write_lock = threading.Lock()
+
+    with open(output_path, 'a', encoding='utf-8') as output_file:
+
+        def write_result(request_id, future, started):
+            record = _result_record(request_id, future, started)
+            with write_lock:
+                output_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                output_file.flush()
+                summary[record["status"]] += 1
+                done = summary["completed"] + summary["failed"]
+            print(f"[{done}/{summary['submitted']}] {request_id}: {record['status']}")
+
+        scheduler = WorkflowScheduler(manager, max_workers=concurrency, model_limits=model_limits,
+                                      max_queue_depth=concurrency, block_when_full=True)
+        with scheduler:
+            for line_number, record in iter_jsonl(input_path):
+                request_id = str(record.get(id_field, line_number))
+                if request_id in completed_ids:
+                    summary["skipped"] += 1
+                    continue
+                if input_field not in record:
+                    print(f"Warning: Request {request_id} has no '{input_field}' field, skipping")
+                    summary["skipped"] += 1
+                    continue
+
+                started = time.time()
+                future = scheduler.submit(start_agent, record[input_field], workflow_name=workflow)
+                future.add_done_callback(lambda f, rid=request_id, t=started: write_result(rid, f, t))
+                completed_ids.add(request_id)  # Duplicate ids in the input run once
+                summary["submitted"] += 1
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of requests through a workflow.")
+    parser.add_argument("input", help="JSONL file with one request per line")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--workflow", help="Workflow to run each request through (starts at its first agent)")
+    target.add_argument("--start-agent", help="Agent to start each run at (default: SwitchAgent)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Runs in flight at once (default: 4)")
+    parser.add_argument("--id-field", default="id", help="Field holding the request id (default: id)")
+    parser.add_argument("--input-field", default="input", help="Field holding the workflow input (default: input)")
+    parser.add_argument("--skip-warmup", action="store_true", help="Don't preload the agents' models before the batch")
+    args = parser.parse_args()
+
+    result = create_base_workflow_manager()
+    if result is None:
+        return 1
+    manager, _ = result
+    create_terminal_workflows(manager)
+    if not args.skip_warmup:
+        manager.warm_models()
+
+    start_agent = args.start_agent
+    if start_agent is None and args.workflow is None:
+        start_agent = "SwitchAgent"
+
+    summary = run_batch(manager, args.input, args.output, start_agent=start_agent, workflow=args.workflow,
+                        concurrency=args.concurrency, id_field=args.id_field, input_field=args.input_field)
+    print(f"\nBatch finished: {summary['completed']} completed, {summary['failed']} failed, "
+          f"{summary['skipped']} skipped")
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
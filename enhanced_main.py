@@ -6,7 +6,10 @@ It maintains backward compatibility with the original terminal version while
 adding support for chat interfaces.
 """
 
+import os
+
 from SwitchAgent import SwitchAgent
+from RoutingCache import RoutingCache
 from WorkflowManager import WorkflowManager
 from Agent import LLMAgent
 from prompt_loader import prompt_loader
@@ -33,8 +36,13 @@ def custom_llm_fn(input_data):
     return f"TOOL EXECUTED  {content}"
 
 
-def create_base_workflow_manager():
-    """Create the base workflow manager with all agents"""
+def create_base_workflow_manager(decision_log=None):
+    """
+    Create the base workflow manager with all agents.
+    Routing decisions (which include the user's input) are only written to disk
+    when `decision_log` or the ROUTING_DECISION_LOG environment variable names a file.
+    """
+    decision_log = decision_log or os.environ.get("ROUTING_DECISION_LOG")
     manager = WorkflowManager()
 
     # Load prompts from files
@@ -84,7 +92,11 @@ def create_base_workflow_manager():
             "programming": "engineering_flow",
             "development": "engineering_flow"
         },
-        "default_flow": "default_flow"
+        "default_flow": "default_flow",
+        "routing_cache": RoutingCache(max_entries=1024, ttl=600),  # Repeated chat questions skip the LLM
+        "constrained_decision": True,  # Answer is forced to one flow name, a handful of tokens
+        "decision_log": decision_log,                              # Opt-in training data for routing_classifier.py
+        "routing_classifier": "models/routing_classifier.json"     # Asked before the LLM once trained
     }
     
     switch_agent = SwitchAgent(
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Routing Classifier
+
+Every routing decision the SwitchAgent makes with the LLM (or the embedding
+router) is labelled training data. With a decision log configured, the
+SwitchAgent appends one JSONL record per decision:
+
+    {"input": "...", "flow": "science_flow", "method": "llm", "timestamp": ...}
+
+This module trains a small TF-IDF + softmax regression classifier on those
+records in NumPy. Given the model file, the SwitchAgent asks the classifier
+first and only escalates to the LLM when its confidence is low, so routing
+gets cheaper as traffic accumulates:
+
+    switch_config["decision_log"] = "logs/routing_decisions.jsonl"
+    switch_config["routing_classifier"] = "models/routing_classifier.json"
+    switch_config["classifier_confidence"] = 0.8
+
+Usage:
+  python routing_classifier.py logs/routing_decisions.jsonl models/routing_classifier.json
+  python routing_classifier.py decisions.jsonl model.json --methods llm --epochs 300
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+TRAINING_METHODS = ("llm", "embedding")     # Decisions worth learning from
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class DecisionLog:
+    """Thread-safe JSONL log of routing decisions"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, text, flow, method):
+        record = {"input": text, "flow": flow, "method": method, "timestamp": round(time.time(), 3)}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def read(self, methods=TRAINING_METHODS):
+        """(input, flow) pairs of the logged decisions made by `methods` (None = all)."""
+        examples = []
+        if not os.path.exists(self.path):
+            return examples
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"Warning: Skipping invalid JSON on line {line_number}: {e}")
+                    continue
+                if methods is None or record.get("method") in methods:
+                    examples.append((str(record.get("input", "")), record.get("flow")))
+        return examples
+
+
+def tokenize(text):
+    """Lowercase words plus word bigrams."""
+    words = _TOKEN.findall(str(text).lower())
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+class RoutingClassifier:
+    def __init__(self, max_features=5000, l2=1e-3):
+        """
+        Args:
+            max_features (int): Vocabulary size (most frequent terms across documents)
+            l2 (float): Weight decay of the softmax regression
+        """
+        self.max_features = max_features
+        self.l2 = l2
+        self.vocabulary = {}        # term -> column
+        self.idf = None
+        self.classes = []
+        self.weights = None         # (terms, classes); no bias, so class priors can't decide by themselves
+
+    def _vectorize(self, texts):
+        """
+        Sparse TF-IDF rows as (row, column, value) arrays with L2-normalised rows.
+        Inputs only hold a few dozen terms, so this stays small however many
+        examples the log has, where a dense matrix would grow with the vocabulary.
+        """
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            for term, count in Counter(tokenize(text)).items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    values.append((1.0 + math.log(count)) * self.idf[column])
+        rows = np.array(rows, dtype=np.int64)
+        columns = np.array(columns, dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=len(texts)))
+        values /= np.maximum(norms[rows], 1e-12)
+        return rows, columns, values, len(texts)
+
+    def _logits(self, features):
+        """features @ weights for sparse `features`."""
+        rows, columns, values, count = features
+        logits = np.zeros((count, len(self.classes)))
+        for index in range(len(self.classes)):
+            logits[:, index] = np.bincount(rows, weights=values * self.weights[columns, index], minlength=count)
+        return logits
+
+    def _gradient(self, features, error):
+        """features.T @ error for sparse `features`."""
+        rows, columns, values, _ = features
+        gradient = np.zeros_like(self.weights)
+        for index in range(len(self.classes)):
+            gradient[:, index] = np.bincount(columns, weights=values * error[rows, index],
+                                             minlength=len(self.vocabulary))
+        return gradient
+
+    def fit(self, texts, labels, epochs=200, learning_rate=1.0):
+        """Trains on (text, flow) pairs with full-batch gradient descent; returns self."""
+        if not texts:
+            raise ValueError("No training examples")
+        document_frequency = Counter(term for text in texts for term in set(tokenize(text)))
+        terms = [term for term, _ in document_frequency.most_common(self.max_features)]
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        self.idf = np.array([math.log((1 + len(texts)) / (1 + document_frequency[term])) + 1 for term in terms])
+        self.classes = sorted(set(labels))
+
+        features = self._vectorize(texts)
+        targets = np.zeros((len(texts), len(self.classes)))
+        targets[np.arange(len(texts)), [self.classes.index(label) for label in labels]] = 1.0
+        self.weights = np.zeros((len(terms), len(self.classes)))
+        for _ in range(epochs):
+            error = (self._softmax(features) - targets) / len(texts)
+            self.weights -= learning_rate * (self._gradient(features, error) + self.l2 * self.weights)
+        return self
+
+    def _softmax(self, features):
+        logits = self._logits(features)
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, text):
+        """{flow: probability} for `text`."""
+        probabilities = self._softmax(self._vectorize([text]))[0]
+        return {flow: float(probability) for flow, probability in zip(self.classes, probabilities)}
+
+    def predict(self, text):
+        """
+        (flow, confidence) of the most likely flow. An input without a single
+        known term gives (None, 0.0), so the caller escalates instead of
+        routing on nothing.
+        """
+        features = self._vectorize([text])
+        if not features[2].size:
+            return None, 0.0
+        probabilities = self._softmax(features)[0]
+        best = int(probabilities.argmax())
+        return self.classes[best], float(probabilities[best])
+
+    def accuracy(self, texts, labels):
+        if not texts:
+            return 0.0
+        return sum(self.predict(text)[0] == label for text, label in zip(texts, labels)) / len(texts)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = {"max_features": self.max_features, "l2": self.l2, "classes": self.classes,
+                 "vocabulary": sorted(self.vocabulary, key=self.vocabulary.get),
+                 "idf": self.idf.tolist(), "weights": self.weights.tolist()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        classifier = cls(state["max_features"], state["l2"])
+        classifier.classes = state["classes"]
+        classifier.vocabulary = {term: column for column, term in enumerate(state["vocabulary"])}
+        classifier.idf = np.array(state["idf"])
+        classifier.weights = np.array(state["weights"]).reshape(len(classifier.vocabulary), len(classifier.classes))
+        return classifier
+
+
+def train(log_path, model_path, methods=TRAINING_METHODS, holdout=0.2, epochs=200, max_features=5000):
+    """Trains a classifier from a decision log, reports holdout accuracy and saves it; returns a summary."""
+    examples = [(text, flow) for text, flow in DecisionLog(log_path).read(methods) if text and flow]
+    # Repeated inputs keep their most recent label and count once
+    examples = list({text.strip().lower(): (text, flow) for text, flow in examples}.values())
+    if len({flow for _, flow in examples}) < 2:
+        raise ValueError(f"Need logged decisions for at least 2 flows, found {len(examples)} decisions")
+
+    step = round(1 / holdout) if holdout and len(examples) >= 10 else 0
+    held_out = examples[::step] if step else []
+    training = [example for index, example in enumerate(examples) if not step or index % step]
+    classifier = RoutingClassifier(max_features=max_features)
+    classifier.fit([text for text, _ in training], [flow for _, flow in training], epochs=epochs)
+
+    summary = {"examples": len(examples), "classes": classifier.classes,
+               "train_accuracy": round(classifier.accuracy(*zip(*training)), 3)}
+    if held_out:
+        summary["holdout_accuracy"] = round(classifier.accuracy(*zip(*held_out)), 3)
+        # The shipped model learns from every example
+        classifier.fit([text for text, _ in examples], [flow for _, flow in examples], epochs=epochs)
+    classifier.save(model_path)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the SwitchAgent routing classifier from logged decisions.")
+    parser.add_argument("log", help="JSONL decision log written by the SwitchAgent")
+    parser.add_argument("output", help="Where to save the trained classifier (JSON)")
+    parser.add_argument("--methods", nargs="+", default=list(TRAINING_METHODS),
+                        help="Decision methods to learn from (default: llm embedding)")
+    parser.add_argument("--epochs", type=int, default=200, help="Gradient descent epochs (default: 200)")
+    parser.add_argument("--max-features", type=int, default=5000, help="Vocabulary size (default: 5000)")
+    args = parser.parse_args()
+
+    try:
+        summary = train(args.log, args.output, methods=args.methods, epochs=args.epochs,
+                        max_features=args.max_features)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Trained on {summary['examples']} decisions for {len(summary['classes'])} flows: {summary}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Incremental validators for streamed LLM responses.
+
+A stream validator is called with the text generated so far every time a new
+piece arrives and returns:
+
+- False to abort the generation (counted as a validation failure, so the
+  agent retries under its validation retry policy)
+- True to accept the rest of the stream (it is not called again)
+- None while it can't decide yet
+
+Pass one to an agent as `stream_validate_fn`:
+
+    agent = LLMAgent("Agent1", model_config, stream_validate_fn=reject_prefixes(*REFUSAL_PREFIXES))
+"""
+
+REFUSAL_PREFIXES = ("I'm sorry", "I am sorry", "I cannot", "I can't", "As an AI")
+
+
+def reject_prefixes(*prefixes, case_sensitive=False):
+    """Aborts responses that start with any of `prefixes`, such as refusals."""
+    if not case_sensitive:
+        prefixes = tuple(prefix.lower() for prefix in prefixes)
+    longest = max((len(prefix) for prefix in prefixes), default=0)
+
+    def validate(text):
+        head = text.lstrip()
+        if not case_sensitive:
+            head = head.lower()
+        if any(head.startswith(prefix) for prefix in prefixes):
+            return False
+        if len(head) < longest and any(prefix.startswith(head) for prefix in prefixes):
+            return None
+        return True
+
+    return validate
+
+
+def require_json_object(allow_code_fence=True):
+    """Aborts responses that don't open with "{" (optionally inside a ``` code fence)."""
+
+    def validate(text):
+        head = text.lstrip()
+        if allow_code_fence and head.startswith("`"):
+            if not head.startswith("```"):
+                return None if "```".startswith(head) else False
+            newline = head.find("\n")
+            if newline == -1:
+                return None
+            head = head[newline + 1:].lstrip()
+        if not head:
+            return None
+        return head.startswith("{")
+
+    return validate
+
+
+def max_chars(limit):
+    """Aborts responses that grow beyond `limit` characters."""
+
+    def validate(text):
+        return None if len(text) <= limit else False
+
+    return validate
+
+
+def all_of(*validators):
+    """Combines validators: aborts if any aborts, accepts once all accept."""
+
+    def validate(text):
+        verdicts = [validator(text) for validator in validators]
+        if False in verdicts:
+            return False
+        if all(verdict is True for verdict in verdicts):
+            return True
+        return None
+
+    return validate
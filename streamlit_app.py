@@ -6,11 +6,11 @@ with the multi-workflow AI system without creating tight coupling.
 """
 
 import streamlit as st
-import threading
 import time
 from datetime import datetime
 from ChatInterface import chat_event_bus, ChatEvent
 from enhanced_main import main_chat
+from WorkflowScheduler import WorkflowScheduler, SchedulerFullError
 import sys
 from io import StringIO
 
@@ -40,6 +40,16 @@ def initialize_workflow_manager():
         if manager is None:
             st.error("❌ Failed to initialize workflow manager. Check if prompts are loaded correctly.")
             return None
+        
+        # Stream the long gemma3 answers so the chat shows tokens while they are generated
+        for agent in manager.agents.values():
+            if isinstance(agent.model_config, dict) and agent.model_config.get("model") == "gemma3:latest":
+                agent.model_config["stream"] = True
+        
+        # Keep the models loaded between chats and load them now, before the first request
+        for model in manager.collect_models():
+            manager.set_keep_alive(model, "30m")
+        manager.warm_models(wait=False)
             
         return manager
         
@@ -51,23 +61,48 @@ def initialize_workflow_manager():
         sys.stderr = original_stderr
 
 
+@st.cache_resource
+def get_workflow_scheduler():
+    """Process-wide scheduler shared by all sessions, so bursts queue instead of overloading Ollama"""
+    return WorkflowScheduler(
+        max_workers=4,
+        model_limits={"gemma3:latest": 1, "llama3.2:1b": 2},
+        max_queue_depth=16
+    )
+
+
+def _report_workflow_error(future):
+    """Publish an error message if a scheduled workflow run raised"""
+    error = future.exception()
+    if error is not None:
+        chat_event_bus.publish(ChatEvent("message", {
+            "sender": "System",
+            "content": f"❌ Error running workflow: {str(error)}",
+            "type": "error"
+        }))
+
+
 def run_workflow_in_background(manager, user_input, workflow_name="WorkflowStart"):
-    """Run workflow in background thread"""
+    """Queue the workflow on the shared scheduler; returns False if the system is too busy"""
     try:
-        # Suppress console output during workflow execution
-        original_stdout = sys.stdout
-        sys.stdout = StringIO()
-        
-        manager.run_workflow(start_agent_name=workflow_name, input_data=user_input)
-        
-        sys.stdout = original_stdout
-        
+        future = get_workflow_scheduler().submit(workflow_name, user_input, manager=manager)
+    except SchedulerFullError:
+        chat_event_bus.publish(ChatEvent("message", {
+            "sender": "System",
+            "content": "⏳ The system is busy right now, please try again in a moment.",
+            "type": "error"
+        }))
+        return False
     except Exception as e:
         chat_event_bus.publish(ChatEvent("message", {
             "sender": "System",
             "content": f"❌ Error running workflow: {str(e)}",
             "type": "error"
         }))
+        return False
+
+    future.add_done_callback(_report_workflow_error)
+    return True
 
 
 def format_message_content(data):
@@ -139,6 +174,8 @@ def main():
         st.session_state.workflow_running = False
     if 'total_messages' not in st.session_state:
         st.session_state.total_messages = 0
+    if 'streaming' not in st.session_state:
+        st.session_state.streaming = {}  # stream_id -> partial response of a streaming agent
     
     # Status indicator
     status_container = st.container()
@@ -158,6 +195,7 @@ def main():
         with col3:
             if st.button("🔄 Reset Chat", help="Clear all messages and reset the chat"):
                 st.session_state.messages = []
+                st.session_state.streaming = {}
                 chat_event_bus.clear_events()
                 st.rerun()
     
@@ -194,6 +232,17 @@ def main():
             if message not in st.session_state.messages:
                 st.session_state.messages.append(message)
                 new_messages_added = True
+
+        elif event.event_type == "token":
+            # Streamed tokens build a live partial answer until the agent's final message arrives
+            data = event.data
+            if data.get("done"):
+                st.session_state.streaming.pop(data["stream_id"], None)
+            else:
+                stream = st.session_state.streaming.setdefault(
+                    data["stream_id"], {"sender": data["sender"], "content": ""})
+                stream["content"] += data["content"]
+            new_messages_added = True
     
     # Display chat messages
     with chat_container:
@@ -203,6 +252,12 @@ def main():
                 if message["role"] == "assistant":
                     st.caption(f"{message['sender']} • {message['timestamp']}")
                 st.markdown(message["content"])
+        
+        # Answers still being generated
+        for stream in st.session_state.streaming.values():
+            with st.chat_message("assistant"):
+                st.caption(f"{stream['sender']} • typing...")
+                st.markdown(stream["content"] + "▌")
     
     # Handle user input requests
     if chat_event_bus.waiting_for_input and chat_event_bus.current_input_request:
@@ -247,13 +302,9 @@ def main():
             # Switch workflow based on selection
             workflow_name = workflow_options[selected_workflow]
             
-            # Run workflow in background thread
-            workflow_thread = threading.Thread(
-                target=run_workflow_in_background,
-                args=(st.session_state.workflow_manager, prompt, workflow_name),
-                daemon=True
-            )
-            workflow_thread.start()
+            # Queue the workflow on the shared scheduler
+            if not run_workflow_in_background(st.session_state.workflow_manager, prompt, workflow_name):
+                st.session_state.workflow_running = False
             
             st.rerun()
     
@@ -268,7 +319,8 @@ def main():
     # Auto-refresh while workflow is running or waiting for input
     if st.session_state.workflow_running or chat_event_bus.waiting_for_input or new_messages_added:
         if auto_scroll:
-            time.sleep(0.5)  # Small delay for smoother updates
+            # Small delay for smoother updates, shorter while tokens are streaming in
+            time.sleep(0.1 if st.session_state.streaming else 0.5)
         st.rerun()
     
     # Footer information
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Shared fakes for tests that talk to an LLM backend
+
+Test files import these directly (the tests directory is on sys.path both
+under pytest and when a test file runs as a script), so a test only declares
+what differs from the defaults.
+"""
+
+
+def model_config(backend=None, model="llama3.2:1b", temperature=0.0, top_p=0.9, **extra):
+    """LLMAgent model_config with neutral sampling options; `extra` adds or overrides keys."""
+    config = {"model": model, "temperature": temperature, "top_p": top_p,
+              "frequency_penalty": 0.0, "presence_penalty": 0.0}
+    if backend is not None:
+        config["backend"] = backend
+    config.update(extra)
+    return config
+
+
+class FakeBackend:
+    """Backend that records chat requests and answers each with `reply` (override reply_for to vary it)"""
+
+    def __init__(self, reply="ok", host="fake"):
+        self.host = host
+        self.reply = reply
+        self.requests = []      # kwargs of every chat call
+
+    @property
+    def chats(self):
+        return len(self.requests)
+
+    def reply_for(self, **request):
+        return self.reply
+
+    def chat(self, **kwargs):
+        self.requests.append(kwargs)
+        return {"message": {"content": self.reply_for(**kwargs)}}
+
+    async def achat(self, **kwargs):
+        return self.chat(**kwargs)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for the asyncio workflow engine (WorkflowManager.arun_workflow)
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent
+from PromptAgent import PromptAgent, EnhancedLLMAgent
+from WorkflowManager import WorkflowManager
+from llm_fakes import FakeBackend, model_config
+
+
+class AsyncSleepAgent(Agent):
+    """Agent whose async execution simulates a non-blocking LLM call"""
+
+    def __init__(self, name, delay=0.1, expected_inputs=1):
+        super().__init__(name, {}, retry_limit=1, expected_inputs=expected_inputs)
+        self.delay = delay
+        self.calls = []
+
+    async def aexecute(self, user_input):
+        self.calls.append(user_input)
+        await asyncio.sleep(self.delay)
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+class SyncAgent(Agent):
+    """Agent with only a synchronous execute, run in a worker thread by default"""
+
+    def execute(self, user_input):
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+class RouterAgent(Agent):
+    """Agent that always switches to the given workflow"""
+
+    def __init__(self, name, target_flow):
+        super().__init__(name, {}, retry_limit=1)
+        self.target_flow = target_flow
+
+    def execute(self, user_input):
+        return {"output": user_input, "success": True, "switch_flow": self.target_flow}
+
+
+class PromptingBackend(FakeBackend):
+    """Backend answering the PromptAgent with a prompt set and echoing the worker's system prompt"""
+
+    def reply_for(self, messages, **request):
+        if "prompt_modifications" in messages[-1]["content"]:
+            return ('{"analysis": "science", "prompt_modifications": '
+                    '{"Explainer": "You are a physicist"}, "workflow_suggestions": ""}')
+        return f"[{messages[0]['content']}] answer"
+
+
+def build_chain_manager():
+    manager = WorkflowManager()
+    for agent in [AsyncSleepAgent("A"), AsyncSleepAgent("B"), SyncAgent("C", {}), RouterAgent("Router", "chain_flow")]:
+        manager.add_agent(agent)
+    manager.add_workflow("chain_flow", {
+        "A": ["B"],
+        "B": ["C"],
+        "C": []
+    })
+    manager.switch_workflow("chain_flow")
+    return manager
+
+
+def test_many_runs_share_one_event_loop():
+    """Hundreds of runs on one loop should take about as long as a single run"""
+    manager = build_chain_manager()
+
+    async def run_all():
+        await asyncio.gather(*[manager.arun_workflow("A", f"input{i}") for i in range(200)])
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    elapsed = time.perf_counter() - started
+
+    print(f"  200 async runs took {elapsed:.2f}s")
+    assert elapsed < 1.5, f"runs did not overlap ({elapsed:.2f}s)"
+    assert len(manager.agents["B"].calls) == 200
+
+
+def test_async_fan_out_and_join():
+    manager = WorkflowManager()
+    for agent in [AsyncSleepAgent("Start", 0.0), AsyncSleepAgent("Left", 0.2),
+                  AsyncSleepAgent("Right", 0.2), AsyncSleepAgent("Join", 0.0, expected_inputs=2)]:
+        manager.add_agent(agent)
+    manager.add_workflow("diamond", {
+        "Start": ["Left", "Right"],
+        "Left": ["Join"],
+        "Right": ["Join"],
+        "Join": []
+    })
+    manager.switch_workflow("diamond")
+
+    started = time.perf_counter()
+    asyncio.run(manager.arun_workflow("Start", "x"))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.35
+    join_input = manager.agents["Join"].calls[0]
+    assert "Left(Start(x))" in join_input and "Right(Start(x))" in join_input
+
+
+def test_async_switch_restarts_from_first_agent():
+    manager = build_chain_manager()
+    asyncio.run(manager.arun_workflow("Router", "hello"))
+    assert manager.agents["A"].calls == ["hello"]
+    assert manager.agents["B"].calls == ["A(hello)"]
+
+
+def test_execute_only_llm_agents_keep_their_logic():
+    """PromptAgent and EnhancedLLMAgent only override execute; the async engine must still use it"""
+    config = model_config(PromptingBackend(), temperature=0.7)
+    manager = WorkflowManager()
+    manager.add_agent(PromptAgent("PA", config, system="Return JSON", target_agents={"Explainer": "Explains"}))
+    manager.add_agent(EnhancedLLMAgent("Explainer", config, system="You are helpful"))
+    manager.add_workflow("prompted", {"PA": ["Explainer"], "Explainer": []})
+    manager.switch_workflow("prompted")
+
+    sync_context = manager.run_workflow("PA", "Why is the sky blue?")
+    async_context = asyncio.run(manager.arun_workflow("PA", "Why is the sky blue?"))
+
+    for run_context in (sync_context, async_context):
+        assert run_context.outputs["PA"]["prompt_modifications"] == {"Explainer": "You are a physicist"}
+        explained = run_context.final_outputs["Explainer"]
+        assert explained["applied_prompt_modification"]
+        assert "[You are a physicist] answer" in explained["processed_output"]
+        assert explained["original_input"] == "Why is the sky blue?"
+    assert async_context.final_outputs == sync_context.final_outputs
+
+
+if __name__ == "__main__":
+    test_many_runs_share_one_event_loop()
+    test_async_fan_out_and_join()
+    test_async_switch_restarts_from_first_agent()
+    test_execute_only_llm_agents_keep_their_logic()
+    print("✅ Async workflow tests passed")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the JSONL batch runner
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent
+from WorkflowManager import WorkflowManager
+from batch_runner import run_batch, load_completed_ids
+
+
+class UpperAgent(Agent):
+    """Agent that upper-cases its input and fails on inputs containing 'boom'"""
+
+    def __init__(self, name):
+        super().__init__(name, {}, retry_limit=1)
+        self.calls = []
+
+    def execute(self, user_input):
+        self.calls.append(user_input)
+        return {"output": f"{self.name}:{user_input.upper()}", "success": "boom" not in user_input}
+
+
+def build_manager():
+    manager = WorkflowManager()
+    manager.add_agent(UpperAgent("First"))
+    manager.add_agent(UpperAgent("Second"))
+    manager.add_workflow("batch_flow", {
+        "First": ["Second"],
+        "Second": []
+    })
+    return manager
+
+
+def write_jsonl(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_batch_writes_results_and_resumes():
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "requests.jsonl")
+        output_path = os.path.join(tmp, "results.jsonl")
+        write_jsonl(input_path, [
+            {"id": "a", "input": "hello"},
+            {"id": "b", "input": "boom"},
+            {"id": "c", "input": "world"},
+        ])
+
+        manager = build_manager()
+        summary = run_batch(manager, input_path, output_path, workflow="batch_flow", concurrency=2)
+        assert summary == {"submitted": 3, "skipped": 0, "completed": 2, "failed": 1}
+
+        results = {record["id"]: record for record in read_jsonl(output_path)}
+        assert results["a"]["outputs"] == {"Second": "Second:FIRST:HELLO"}
+        assert results["a"]["workflow"] == "batch_flow"
+        assert results["b"]["status"] == "failed"
+        assert load_completed_ids(output_path) == {"a", "c"}
+
+        # Restart with one more request: only the failed and the new one run
+        write_jsonl(input_path, [
+            {"id": "a", "input": "hello"},
+            {"id": "b", "input": "boom"},
+            {"id": "c", "input": "world"},
+            {"id": "d", "input": "again"},
+        ])
+        manager = build_manager()
+        summary = run_batch(manager, input_path, output_path, workflow="batch_flow", concurrency=2)
+        assert summary["skipped"] == 2
+        assert summary["submitted"] == 2
+        assert sorted(manager.agents["First"].calls) == ["again", "boom"]
+        assert load_completed_ids(output_path) == {"a", "c", "d"}
+
+
+def test_custom_fields_and_start_agent():
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "requests.jsonl")
+        output_path = os.path.join(tmp, "results.jsonl")
+        write_jsonl(input_path, [
+            {"request_id": "r1", "body": "one"},
+            {"request_id": "r2", "title": "no body"},
+        ])
+
+        manager = build_manager()
+        manager.switch_workflow("batch_flow")
+        summary = run_batch(manager, input_path, output_path, start_agent="Second",
+                            id_field="request_id", input_field="body")
+
+        assert summary["completed"] == 1 and summary["skipped"] == 1
+        assert read_jsonl(output_path)[0]["outputs"] == {"Second": "Second:ONE"}
+
+
+def test_failed_branch_fails_the_request():
+    """A fan-out with one failed branch is retried on restart, not skipped"""
+    class BranchAgent(UpperAgent):
+        def execute(self, user_input):
+            self.calls.append(user_input)
+            return {"output": f"{self.name}:{user_input}", "success": self.name != "B1" or "fixed" in user_input}
+
+    def fan_out_manager():
+        manager = WorkflowManager()
+        for name in ("Start", "B1", "B2"):
+            manager.add_agent(BranchAgent(name))
+        manager.add_workflow("fan_out", {"Start": ["B1", "B2"], "B1": [], "B2": []})
+        return manager
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "requests.jsonl")
+        output_path = os.path.join(tmp, "results.jsonl")
+        write_jsonl(input_path, [{"id": "a", "input": "x"}])
+
+        summary = run_batch(fan_out_manager(), input_path, output_path, workflow="fan_out")
+        assert summary["failed"] == 1
+        record = read_jsonl(output_path)[0]
+        assert record["status"] == "failed"
+        assert record["failed_agents"] == ["B1"]
+        assert record["outputs"] == {"B2": "B2:Start:x"}
+        assert load_completed_ids(output_path) == set()
+
+        write_jsonl(input_path, [{"id": "a", "input": "fixed"}])
+        summary = run_batch(fan_out_manager(), input_path, output_path, workflow="fan_out")
+        assert summary["submitted"] == 1 and summary["completed"] == 1
+        assert load_completed_ids(output_path) == {"a"}
+
+
+if __name__ == "__main__":
+    test_batch_writes_results_and_resumes()
+    test_custom_fields_and_start_agent()
+    test_failed_branch_fails_the_request()
+    print("✅ Batch runner tests passed")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for checkpointed, resumable workflow runs
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent
+from CheckpointStore import CheckpointStore
+from WorkflowManager import WorkflowManager
+
+
+class StepAgent(Agent):
+    """Agent that tags its input and can be told to fail"""
+
+    def __init__(self, name, expected_inputs=1):
+        super().__init__(name, {}, retry_limit=3, expected_inputs=expected_inputs)
+        self.calls = 0
+        self.broken = False
+
+    def execute(self, user_input):
+        self.calls += 1
+        return {"output": f"{self.name}({user_input})", "success": not self.broken}
+
+
+def build_chain():
+    manager = WorkflowManager()
+    for i in range(1, 6):
+        manager.add_agent(StepAgent(f"Agent{i}"))
+    manager.add_workflow("chain", {f"Agent{i}": [f"Agent{i + 1}"] for i in range(1, 5)})
+    manager.switch_workflow("chain")
+    return manager
+
+
+def test_resume_continues_after_failed_agent():
+    manager = build_chain()
+    store = CheckpointStore(tempfile.mkdtemp())
+    manager.agents["Agent4"].broken = True
+
+    failed = manager.run_workflow("Agent1", "hello", checkpoint_store=store)
+    assert "Agent5" not in failed.outputs
+    state = store.load(failed.run_id)
+    assert state["status"] == "failed"
+    assert state["frontier"] == [["Agent4", "Agent3(Agent2(Agent1(hello)))", True]]
+
+    manager.agents["Agent4"].broken = False
+    resumed = manager.resume_workflow(failed.run_id, checkpoint_store=store)
+
+    assert resumed.run_id == failed.run_id
+    assert resumed.final_outputs["Agent5"] == "Agent5(Agent4(Agent3(Agent2(Agent1(hello)))))"
+    assert [manager.agents[f"Agent{i}"].calls for i in range(1, 6)] == [1, 1, 1, 4, 1]
+    assert store.load(failed.run_id)["status"] == "completed"
+    assert store.list_runs(status="completed") == [failed.run_id]
+
+
+def test_resume_keeps_fan_in_buffers():
+    manager = WorkflowManager()
+    for agent in [StepAgent("Start"), StepAgent("Left"), StepAgent("Right"), StepAgent("Join", expected_inputs=2)]:
+        manager.add_agent(agent)
+    manager.add_workflow("diamond", {
+        "Start": ["Left", "Right"],
+        "Left": ["Join"],
+        "Right": ["Join"],
+        "Join": []
+    })
+    manager.switch_workflow("diamond")
+    manager.checkpoint_store = CheckpointStore(tempfile.mkdtemp())
+    manager.agents["Right"].broken = True
+
+    failed = manager.run_workflow("Start", "x", max_workers=2)
+    state = manager.checkpoint_store.load(failed.run_id)
+    assert state["pending_inputs"] == {"Join": ["Left(Start(x))"]}
+
+    manager.agents["Right"].broken = False
+    resumed = manager.resume_workflow(failed.run_id, max_workers=2)
+
+    assert resumed.outputs["Join"] == "Join(Left(Start(x)) | Right(Start(x)))"
+    assert manager.agents["Left"].calls == 1
+    assert manager.agents["Start"].calls == 1
+
+
+def test_async_resume_and_missing_checkpoint():
+    manager = build_chain()
+    store = CheckpointStore(tempfile.mkdtemp())
+    manager.agents["Agent2"].broken = True
+    failed = asyncio.run(manager.arun_workflow("Agent1", "a", checkpoint_store=store))
+
+    manager.agents["Agent2"].broken = False
+    resumed = asyncio.run(manager.aresume_workflow(failed.run_id, checkpoint_store=store))
+    assert resumed.outputs["Agent5"].startswith("Agent5(Agent4(Agent3(Agent2(Agent1(a")
+    assert manager.agents["Agent1"].calls == 1
+
+    try:
+        manager.resume_workflow("no-such-run", checkpoint_store=store)
+        assert False, "resuming an unknown run should fail"
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    test_resume_continues_after_failed_agent()
+    test_resume_keeps_fan_in_buffers()
+    test_async_resume_and_missing_checkpoint()
+    print("✅ Checkpoint tests passed")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent fan-out execution in WorkflowManager.run_workflow
+"""
+
+import sys
+import os
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent
+from WorkflowManager import WorkflowManager
+
+
+class SleepAgent(Agent):
+    """Agent that simulates a blocking LLM call by sleeping"""
+
+    def __init__(self, name, delay=0.2, expected_inputs=1):
+        super().__init__(name, {}, retry_limit=1, expected_inputs=expected_inputs)
+        self.delay = delay
+        self.calls = []
+
+    def execute(self, user_input):
+        self.calls.append(user_input)
+        time.sleep(self.delay)
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+def build_fan_out_manager(max_workers=1):
+    """Start -> [Branch1, Branch2, Branch3] -> Join"""
+    manager = WorkflowManager(max_workers=max_workers)
+    agents = [
+        SleepAgent("Start", delay=0.0),
+        SleepAgent("Branch1"),
+        SleepAgent("Branch2"),
+        SleepAgent("Branch3"),
+        SleepAgent("Join", delay=0.0, expected_inputs=3),
+    ]
+    for agent in agents:
+        manager.add_agent(agent)
+    manager.add_workflow("fan_out_flow", {
+        "Start": ["Branch1", "Branch2", "Branch3"],
+        "Branch1": ["Join"],
+        "Branch2": ["Join"],
+        "Branch3": ["Join"],
+        "Join": []
+    })
+    manager.switch_workflow("fan_out_flow")
+    return manager
+
+
+def test_concurrent_fan_out_runs_branches_in_parallel():
+    """Branches should overlap, so wall-clock time is close to a single branch"""
+    manager = build_fan_out_manager(max_workers=4)
+
+    started = time.perf_counter()
+    manager.run_workflow("Start", "input")
+    elapsed = time.perf_counter() - started
+
+    print(f"  Concurrent fan-out took {elapsed:.2f}s")
+    assert elapsed < 0.5, f"branches did not run concurrently ({elapsed:.2f}s)"
+
+    join_calls = manager.agents["Join"].calls
+    assert len(join_calls) == 1
+    for branch in ["Branch1", "Branch2", "Branch3"]:
+        assert f"{branch}(Start(input))" in join_calls[0]
+
+
+def test_sequential_mode_is_default():
+    """Without max_workers the engine keeps the original one-at-a-time order"""
+    manager = build_fan_out_manager()
+
+    started = time.perf_counter()
+    manager.run_workflow("Start", "input")
+    elapsed = time.perf_counter() - started
+
+    assert elapsed >= 0.6
+    assert manager.agents["Join"].calls == [
+        "Branch1(Start(input)) | Branch2(Start(input)) | Branch3(Start(input))"
+    ]
+
+
+def test_max_workers_argument_overrides_manager_default():
+    manager = build_fan_out_manager(max_workers=1)
+
+    started = time.perf_counter()
+    manager.run_workflow("Start", "input", max_workers=3)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.5
+    assert len(manager.agents["Join"].calls) == 1
+
+
+if __name__ == "__main__":
+    test_concurrent_fan_out_runs_branches_in_parallel()
+    test_sequential_mode_is_default()
+    test_max_workers_argument_overrides_manager_default()
+    print("✅ Concurrent workflow tests passed")
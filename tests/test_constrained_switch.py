@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the constrained, token-capped SwitchAgent decision
+"""
+
+import sys
+import os
+import asyncio
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SwitchAgent import SwitchAgent
+from llm_fakes import FakeBackend, model_config
+
+FLOWS = ["chat_default_flow", "chat_science_flow", "chat_engineering_flow"]
+
+
+def switch_agent(backend, constrained=True):
+    agent = SwitchAgent("SwitchAgent", model_config(backend), system="Pick a flow",
+                        workflow_config={"use_llm_decision": True, "constrained_decision": constrained,
+                                         "default_flow": "chat_default_flow"})
+    agent.set_available_flows(FLOWS)
+    return agent
+
+
+def test_request_is_schema_constrained_and_capped():
+    backend = FakeBackend('"chat_science_flow"')
+    result = switch_agent(backend).execute("Run a regression on my data")
+
+    request = backend.requests[0]
+    assert request["format"] == {"type": "string", "enum": FLOWS}
+    assert request["options"]["num_predict"] == len("chat_engineering_flow") + 2
+    assert request["options"]["stop"] == ["\n"]
+    assert result["switch_flow"] == "chat_science_flow"
+    assert result["llm_decision"] == "chat_science_flow"
+
+
+def test_unconstrained_mode_is_unchanged():
+    backend = FakeBackend("chat_engineering_flow\n")
+    result = switch_agent(backend, constrained=False).execute("Build me an app")
+
+    request = backend.requests[0]
+    assert "format" not in request
+    assert "num_predict" not in request["options"] and "stop" not in request["options"]
+    assert result["switch_flow"] == "chat_engineering_flow"
+
+
+def test_async_constrained_decision():
+    backend = FakeBackend('"chat_engineering_flow"')
+    agent = switch_agent(backend)
+
+    result = asyncio.run(agent.aexecute("Build me an app"))
+
+    assert result["switch_flow"] == "chat_engineering_flow"
+    assert backend.requests[0]["format"]["enum"] == FLOWS
+
+
+def test_without_flows_no_schema_is_sent():
+    backend = FakeBackend("chat_default_flow")
+    agent = switch_agent(backend)
+    agent.set_available_flows([])
+
+    agent.execute("Anything")
+
+    assert "format" not in backend.requests[0]
+    assert "num_predict" not in backend.requests[0]["options"]
+
+
+if __name__ == "__main__":
+    test_request_is_schema_constrained_and_capped()
+    test_unconstrained_mode_is_unchanged()
+    test_async_constrained_decision()
+    test_without_flows_no_schema_is_sent()
+    print("✅ Constrained switch tests passed")
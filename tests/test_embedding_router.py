@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for embedding-based SwitchAgent routing with LLM fallback
+"""
+
+import sys
+import os
+import asyncio
+import re
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from EmbeddingRouter import EmbeddingRouter
+from LLMBackend import LoadBalancedBackend
+from SwitchAgent import SwitchAgent
+from llm_fakes import FakeBackend, model_config
+
+VOCABULARY = ["science", "physics", "biology", "experiment", "software", "code", "build", "api"]
+
+
+class WordCountBackend(FakeBackend):
+    """Backend whose embeddings count vocabulary words and whose chat answers with a fixed flow"""
+
+    def __init__(self, llm_answer="engineering_flow", host="embed-host", fail_embed=False):
+        super().__init__(llm_answer, host)
+        self.fail_embed = fail_embed
+        self.embedded = []
+
+    def embed(self, model, input):
+        if self.fail_embed:
+            raise ConnectionError("embedding model not pulled")
+        self.embedded.append(list(input))
+        words = [re.findall(r"[a-z]+", text.lower()) for text in input]
+        return {"embeddings": [[text.count(word) for word in VOCABULARY] for text in words]}
+
+
+ROUTES = {
+    "science_flow": ["science questions about physics or biology", "design an experiment"],
+    "engineering_flow": ["build software", "write code for an api"],
+}
+
+
+def switch_agent(backend, **config):
+    workflow_config = {"use_llm_decision": True, "embedding_routes": ROUTES,
+                       "default_flow": "default_flow", **config}
+    agent = SwitchAgent("SwitchAgent", model_config(backend), system="Pick a flow", workflow_config=workflow_config)
+    agent.set_available_flows(["default_flow", "science_flow", "engineering_flow"])
+    return agent
+
+
+def test_router_scores_flows_by_closest_text():
+    backend = WordCountBackend()
+    router = EmbeddingRouter(ROUTES, backend=backend, min_margin=0.1)
+
+    match = router.route("Which experiment shows biology at work?")
+    assert match["flow"] == "science_flow" and match["confident"]
+    assert match["scores"]["science_flow"] > match["scores"]["engineering_flow"]
+
+    router.route("build the api")
+    assert len(backend.embedded) == 3           # Route texts once, then one call per input
+    assert len(backend.embedded[0]) == 4
+
+    router.add_route("engineering_flow", "physics engine code")
+    router.route("physics")
+    assert len(backend.embedded[3]) == 5        # Re-embedded after the new example
+
+
+def test_low_margin_is_not_confident():
+    router = EmbeddingRouter(ROUTES, backend=WordCountBackend(), min_margin=0.1)
+    match = router.route("hello there")
+    assert match["margin"] == 0.0 and not match["confident"]
+
+    strict = EmbeddingRouter(ROUTES, backend=WordCountBackend(), min_margin=0.0, min_score=0.9)
+    assert not strict.route("code experiment")["confident"]
+
+
+def test_confident_inputs_skip_the_llm():
+    backend = WordCountBackend()
+    agent = switch_agent(backend)
+
+    result = agent.execute("Can you build software with code?")
+
+    assert result["switch_flow"] == "engineering_flow"
+    assert result["decision_method"] == "embedding"
+    assert backend.chats == 0
+
+
+def test_ambiguous_inputs_fall_back_to_the_llm():
+    backend = WordCountBackend(llm_answer="science_flow")
+    agent = switch_agent(backend)
+
+    result = agent.execute("Tell me something interesting")
+
+    assert result["switch_flow"] == "science_flow"
+    assert result["llm_decision"] == "science_flow"
+    assert backend.chats == 1
+
+
+def test_unavailable_embedding_flows_fall_back_to_the_llm():
+    backend = WordCountBackend(llm_answer="science_flow")
+    agent = switch_agent(backend)
+    agent.set_available_flows(["default_flow", "science_flow"])   # The manager has no engineering_flow
+
+    result = agent.execute("Can you build software with code?")
+
+    assert result["switch_flow"] == "science_flow"
+    assert result["decision_method"] == "llm"
+    assert backend.chats == 1
+
+
+def test_embedding_errors_fall_back_to_the_llm():
+    backend = WordCountBackend(fail_embed=True)
+    agent = switch_agent(backend)
+
+    result = asyncio.run(agent.aexecute("build an api"))
+
+    assert result["llm_decision"] == "engineering_flow"
+    assert backend.chats == 1
+
+
+def test_async_routing_and_load_balanced_embeddings():
+    hosts = [WordCountBackend(host="box1"), WordCountBackend(host="box2")]
+    balancer = LoadBalancedBackend(hosts)
+    agent = switch_agent(balancer, embedding_margin=0.2)
+
+    result = asyncio.run(agent.aexecute("physics and biology science"))
+
+    assert result["switch_flow"] == "science_flow"
+    assert sum(stats["requests"] for stats in balancer.stats().values()) == 2
+    assert all(stats["in_flight"] == 0 for stats in balancer.stats().values())
+
+
+if __name__ == "__main__":
+    test_router_scores_flows_by_closest_text()
+    test_low_margin_is_not_confident()
+    test_confident_inputs_skip_the_llm()
+    test_ambiguous_inputs_fall_back_to_the_llm()
+    test_unavailable_embedding_flows_fall_back_to_the_llm()
+    test_embedding_errors_fall_back_to_the_llm()
+    test_async_routing_and_load_balanced_embeddings()
+    print("✅ Embedding router tests passed")
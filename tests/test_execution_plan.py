@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for compiling workflows into immutable execution plans
+"""
+
+import sys
+import os
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent
+from ExecutionPlan import compile_workflow, WorkflowCompileError
+from WorkflowManager import WorkflowManager
+
+
+class EchoAgent(Agent):
+    def __init__(self, name):
+        super().__init__(name, {}, retry_limit=1)
+        self.calls = []
+
+    def execute(self, user_input):
+        self.calls.append(user_input)
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+DIAMOND = {
+    "Start": ["Left", "Right"],
+    "Left": ["Join"],
+    "Right": ["Join"],
+    "Join": []
+}
+
+
+def test_plan_precomputes_order_degrees_and_entries():
+    plan = compile_workflow("diamond", DIAMOND)
+
+    assert plan.start_node == "Start"
+    assert plan.entry_nodes == ("Start",)
+    assert plan.topological_order == ("Start", "Left", "Right", "Join")
+    assert plan.in_degree["Join"] == 2
+    assert plan.next_agents("Start") == ("Left", "Right")
+    assert plan.next_agents("Unknown") == ()
+    assert plan.join_count("Start", "Join") == 2
+    # Entered at one branch only, the join must not wait for the other one
+    assert plan.join_count("Left", "Join") == 1
+
+
+def test_plan_is_immutable():
+    plan = compile_workflow("diamond", DIAMOND)
+    try:
+        plan.successors["Start"] = ("Join",)
+        assert False, "successors should be read-only"
+    except TypeError:
+        pass
+    try:
+        plan.start_node = "Join"
+        assert False, "plan should be frozen"
+    except AttributeError:
+        pass
+
+
+def test_cycles_are_rejected():
+    try:
+        compile_workflow("loop", {"A": ["B"], "B": ["C"], "C": ["A"]})
+        assert False, "cycle should be rejected"
+    except WorkflowCompileError as e:
+        assert "cycle" in str(e)
+
+    manager = WorkflowManager()
+    try:
+        manager.add_workflow("loop", {"A": ["A"]})
+        assert False, "add_workflow should reject cycles"
+    except WorkflowCompileError:
+        pass
+    assert "loop" not in manager.workflows
+
+
+def test_missing_agents_are_reported():
+    try:
+        compile_workflow("diamond", DIAMOND, agent_names={"Start", "Left", "Right"})
+        assert False, "missing agent should be rejected"
+    except WorkflowCompileError as e:
+        assert "Join" in str(e)
+
+    manager = WorkflowManager()
+    manager.add_agent(EchoAgent("Start"))
+    manager.add_workflow("diamond", DIAMOND)
+    try:
+        manager.create_context("diamond")
+        assert False, "runs should not start on a plan with unknown agents"
+    except WorkflowCompileError:
+        pass
+
+
+def test_fan_in_uses_computed_join_counts():
+    """The join runs once with both inputs although no expected_inputs was set"""
+    manager = WorkflowManager()
+    for name in DIAMOND:
+        manager.add_agent(EchoAgent(name))
+    manager.add_workflow("diamond", DIAMOND)
+    manager.switch_workflow("diamond")
+
+    manager.run_workflow("Start", "x")
+
+    assert manager.agents["Join"].calls == ["Left(Start(x)) | Right(Start(x))"]
+
+
+class RouterAgent(EchoAgent):
+    def execute(self, user_input):
+        self.calls.append(user_input)
+        return {"output": user_input, "success": True, "switch_flow": "f1"}
+
+
+def test_router_runs_ignore_flows_they_never_enter():
+    """Cycles and stale agents in other merged flows don't stop a router run"""
+    manager = WorkflowManager()
+    for name in ("Router", "A", "B"):
+        manager.add_agent(EchoAgent(name) if name != "Router" else RouterAgent(name))
+    manager.add_workflow("f1", {"A": ["B"], "B": []})
+    manager.add_workflow("f2", {"B": ["A"]})
+    manager.add_workflow("stale", {"Ghost": []})
+
+    run_context = manager.run_workflow("Router", "x")
+
+    assert manager.agents["B"].calls == ["A(x)"]
+    assert run_context.final_outputs == {"B": "B(A(x))"}
+    assert run_context.failed == []
+
+
+if __name__ == "__main__":
+    test_plan_precomputes_order_degrees_and_entries()
+    test_plan_is_immutable()
+    test_cycles_are_rejected()
+    test_missing_agents_are_reported()
+    test_fan_in_uses_computed_join_counts()
+    test_router_runs_ignore_flows_they_never_enter()
+    print("✅ Execution plan tests passed")
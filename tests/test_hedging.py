@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for hedged LLM requests
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import LLMAgent
+from HedgingPolicy import HedgingPolicy, LatencyTracker
+from LLMBackend import LoadBalancedBackend
+from llm_fakes import model_config
+
+
+class TimedHost:
+    """Backend for one host that answers after a fixed delay, streamed in `chunks` pieces"""
+
+    def __init__(self, host, delay, chunks=10):
+        self.host = host
+        self.delay = delay
+        self.chunks = chunks
+        self.calls = 0
+        self.cancelled = 0
+
+    def chat(self, stream=False, **kwargs):
+        self.calls += 1
+        if not stream:
+            time.sleep(self.delay)
+            return {"message": {"content": f"answer from {self.host}"}}
+        return self._stream()
+
+    def _stream(self):
+        sent = 0
+        try:
+            for _ in range(self.chunks):
+                time.sleep(self.delay / self.chunks)
+                sent += 1
+                yield {"message": {"content": f"answer from {self.host}" if sent == 1 else ""}}
+        finally:
+            if sent < self.chunks:
+                self.cancelled += 1
+
+    async def achat(self, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"message": {"content": f"answer from {self.host}"}}
+
+
+def warmed_policy(key, latency=0.02):
+    policy = HedgingPolicy(percentile=90, min_samples=5, min_delay=0.05)
+    for _ in range(5):
+        policy.tracker.record(key, latency)
+    return policy
+
+
+def test_percentiles_are_learned_per_key():
+    tracker = LatencyTracker(window=10)
+    for seconds in [0.1, 0.2, 0.3, 0.4, 5.0]:
+        tracker.record(("Agent4", "gemma3"), seconds)
+    assert tracker.percentile(("Agent4", "gemma3"), 50) == 0.3
+    assert tracker.percentile(("Agent4", "gemma3"), 100) == 5.0
+    assert tracker.percentile(("Agent1", "gemma3"), 50) is None
+
+
+def test_no_hedging_while_learning():
+    stall, fast = TimedHost("stall", 0.1), TimedHost("fast", 0.0)
+    policy = HedgingPolicy(min_samples=5)
+    response = policy.chat(LoadBalancedBackend([stall, fast]), ("A", "m"), model="m", messages=[])
+
+    assert response["message"]["content"] == "answer from stall"
+    assert policy.stats()["hedged"] == 0
+    assert policy.tracker.count(("A", "m")) == 1
+
+
+def test_slow_request_is_hedged_to_another_host():
+    stall, fast = TimedHost("stall", 1.0), TimedHost("fast", 0.0)
+    policy = warmed_policy(("A", "m"))
+    started = time.monotonic()
+    response = policy.chat(LoadBalancedBackend([stall, fast]), ("A", "m"), model="m", messages=[])
+
+    assert response["message"]["content"] == "answer from fast"
+    assert time.monotonic() - started < 0.5
+    assert policy.stats() == {"hedged": 1, "hedge_wins": 1, "win_rate": 1.0}
+
+
+def test_sync_hedge_stops_the_loser():
+    """The losing stream is closed at its next chunk and gives its host slot back"""
+    stall, fast = TimedHost("stall", 1.0), TimedHost("fast", 0.0)
+    balancer = LoadBalancedBackend([stall, fast])
+    policy = warmed_policy(("A", "m"))
+
+    response = policy.chat(balancer, ("A", "m"), model="m", messages=[], stream=False)
+
+    assert response["message"]["content"] == "answer from fast"
+    deadline = time.monotonic() + 0.5
+    while stall.cancelled == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stall.cancelled == 1
+    assert balancer.stats()["stall"]["in_flight"] == 0
+
+
+def test_async_hedge_cancels_the_loser():
+    stall, fast = TimedHost("stall", 1.0), TimedHost("fast", 0.0)
+    balancer = LoadBalancedBackend([stall, fast])
+    policy = warmed_policy(("A", "m"))
+
+    async def main():
+        response = await policy.achat(balancer, ("A", "m"), model="m", messages=[])
+        await asyncio.sleep(0)
+        return response
+
+    assert asyncio.run(main())["message"]["content"] == "answer from fast"
+    assert stall.cancelled == 1
+    assert balancer.stats()["stall"]["in_flight"] == 0
+
+
+def test_llm_agent_uses_hedging_policy():
+    stall, fast = TimedHost("stall", 1.0), TimedHost("fast", 0.0)
+    config = model_config(LoadBalancedBackend([stall, fast]), model="m", temperature=0.1,
+                          hedging=warmed_policy(("Agent4", "m")))
+    agent = LLMAgent("Agent4", config)
+
+    result = agent.execute("hello")
+    assert result["success"] and "answer from fast" in result["output"]
+    assert config["hedging"].stats()["hedge_wins"] == 1
+
+
+if __name__ == "__main__":
+    test_percentiles_are_learned_per_key()
+    test_no_hedging_while_learning()
+    test_slow_request_is_hedged_to_another_host()
+    test_sync_hedge_stops_the_loser()
+    test_async_hedge_cancels_the_loser()
+    test_llm_agent_uses_hedging_policy()
+    print("✅ Hedging tests passed")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled keyword matcher behind SwitchAgent.keyword_mapping
+"""
+
+import sys
+import os
+import random
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from KeywordMatcher import KeywordMatcher
+from SwitchAgent import SwitchAgent
+from llm_fakes import model_config
+
+MAPPING = {
+    "machine learning": "science_flow",
+    "data analysis": "science_flow",
+    "software": "engineering_flow",
+    "app": "engineering_flow",
+    "c++": "engineering_flow",
+    "quick": "quick_analysis",
+}
+
+
+def test_whole_words_case_insensitive():
+    matcher = KeywordMatcher(MAPPING)
+    assert matcher.match("Train a MACHINE LEARNING model") == ("machine learning", "science_flow")
+    assert matcher.match("Write some C++ code") == ("c++", "engineering_flow")
+    assert matcher.match("Fill in the application form") is None      # "app" inside a word
+    assert matcher.match("Nothing relevant here") is None
+
+    substring = KeywordMatcher(MAPPING, word_boundaries=False)
+    assert substring.match("Fill in the application form") == ("app", "engineering_flow")
+
+
+def test_priority_then_longest_then_first():
+    matcher = KeywordMatcher(MAPPING)
+    assert matcher.match("quick software data analysis") == ("data analysis", "science_flow")
+
+    prioritised = KeywordMatcher(MAPPING, priorities={"quick": -1})
+    assert prioritised.match("quick software data analysis") == ("quick", "quick_analysis")
+
+    nested = KeywordMatcher({"machine": "a", "machine learning": "b"}, priorities={"machine": 0, "machine learning": 0})
+    assert nested.match("machine learning") == ("machine learning", "b")   # Same start and priority: longest wins
+    tied = KeywordMatcher({"x": "a", "yy": "b", "zz": "c"}, priorities={"x": 0, "yy": 0, "zz": 0})
+    assert tied.match("x zz yy") == ("zz", "c")
+
+
+def test_prefix_keywords_keep_their_priority():
+    mapping = {"machine": "science", "machine learning": "ai"}
+    assert KeywordMatcher(mapping).match("machine learning rocks") == ("machine", "science")   # Mapping order
+    prioritised = KeywordMatcher(mapping, priorities={"machine": 0, "machine learning": 5})
+    assert prioritised.match("machine learning rocks") == ("machine", "science")
+    assert KeywordMatcher(mapping).find_all("Machine learning") == [
+        ("machine", "science", 0), ("machine learning", "ai", 0)]
+    assert KeywordMatcher(mapping).find_all("machinery learning") == []
+
+
+def test_matches_the_brute_force_scan():
+    random.seed(7)
+    # Keywords of mixed length nest in each other; the old first-match scan is the oracle
+    words = dict.fromkeys("".join(random.choice("abcd") for _ in range(random.randint(1, 4))) for _ in range(40))
+    mapping = {word: f"flow_{index}" for index, word in enumerate(words)}
+    matcher = KeywordMatcher(mapping, word_boundaries=False)
+
+    for _ in range(300):
+        text = "".join(random.choice("abcd ") for _ in range(20))
+        expected = next(((keyword, flow) for keyword, flow in mapping.items() if keyword in text), None)
+        assert matcher.match(text) == expected
+
+
+def test_thousands_of_keywords_scan_once():
+    mapping = {f"product{index} term": f"flow_{index % 7}" for index in range(5000)}
+    mapping["routing table"] = "special_flow"
+    matcher = KeywordMatcher(mapping)
+    text = "please look up the routing table for product4999 term " * 20
+
+    started = time.perf_counter()
+    for _ in range(50):
+        result = matcher.match(text)
+    elapsed = time.perf_counter() - started
+
+    assert result == ("product4999 term", "flow_1")
+    assert elapsed < 1.0
+
+
+def test_switch_agent_recompiles_on_assignment():
+    agent = SwitchAgent("SwitchAgent", model_config(), workflow_config={"keyword_mapping": MAPPING,
+                                                                "default_flow": "default_flow"})
+    assert agent.execute("Build an app")["switch_flow"] == "engineering_flow"
+
+    agent.keyword_mapping = {"app": "chat_engineering_flow"}
+    result = agent.execute("Build an app")
+    assert result["switch_flow"] == "chat_engineering_flow"
+    assert result["decision_method"] == "keyword"
+    assert dict(agent.keyword_mapping) == {"app": "chat_engineering_flow"}
+
+    try:
+        agent.keyword_mapping["software"] = "engineering_flow"
+        assert False, "in-place edits would bypass the compiled matcher"
+    except TypeError:
+        pass
+
+
+def test_switch_agent_recompiles_on_setting_changes():
+    agent = SwitchAgent("SwitchAgent", model_config(), workflow_config={
+        "keyword_mapping": {"machine learning": "ai_flow", "machine": "science_flow", "app": "engineering_flow"}})
+    assert agent.execute("machine learning rocks")["switch_flow"] == "ai_flow"
+
+    agent.keyword_priorities = {"machine": -1}
+    assert agent.execute("machine learning rocks")["switch_flow"] == "science_flow"
+
+    assert agent.execute("an application")["switch_flow"] == "default_flow"
+    agent.keyword_word_boundaries = False
+    assert agent.execute("an application")["switch_flow"] == "engineering_flow"
+
+
+if __name__ == "__main__":
+    test_whole_words_case_insensitive()
+    test_priority_then_longest_then_first()
+    test_prefix_keywords_keep_their_priority()
+    test_matches_the_brute_force_scan()
+    test_thousands_of_keywords_scan_once()
+    test_switch_agent_recompiles_on_assignment()
+    test_switch_agent_recompiles_on_setting_changes()
+    print("✅ Keyword matcher tests passed")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled LLM backend layer
+"""
+
+import sys
+import os
+import asyncio
+import threading
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import LLMAgent
+from LLMBackend import OllamaBackend, get_backend, backend_for
+from RetryPolicy import TRANSPORT
+from llm_fakes import FakeBackend, model_config
+
+
+def test_backends_are_shared_per_host():
+    assert get_backend("http://host-a:11434") is get_backend("http://host-a:11434")
+    assert get_backend("http://host-a:11434") is not get_backend("http://host-b:11434")
+    assert backend_for({"host": "http://host-a:11434"}) is get_backend("http://host-a:11434")
+
+    custom = FakeBackend("hi")
+    assert backend_for({"host": "http://host-a:11434", "backend": custom}) is custom
+
+
+def test_client_is_pooled_with_finite_timeouts():
+    backend = OllamaBackend("http://127.0.0.1:11434", timeout=60, connect_timeout=2, max_connections=4)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(backend.client)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(client is clients[0] for client in clients)
+    timeout = clients[0]._client.timeout
+    assert timeout.read == 60 and timeout.connect == 2
+
+    async def get_async_clients():
+        return backend.async_client(), backend.async_client()
+
+    first, second = asyncio.run(get_async_clients())
+    assert first is second
+    assert asyncio.run(get_async_clients())[0] is not first  # New loop, new client
+    backend.close()
+
+
+def test_agents_call_their_configured_backend():
+    backend = FakeBackend("Why is the sky blue?")
+    agent = LLMAgent("Asker", model_config(backend, model="test-model"), system="sys", prompt="Ask")
+
+    result = agent.execute("sky")
+    assert result["success"] and "Why is the sky blue?" in result["output"]
+    assert backend.requests[0]["model"] == "test-model"
+    assert backend.requests[0]["messages"][0] == {"role": "system", "content": "sys"}
+
+    assert asyncio.run(agent.aexecute("sky"))["success"]
+    assert backend.chats == 2
+
+
+def test_unreachable_host_is_a_transport_error():
+    agent = LLMAgent("Offline", model_config(OllamaBackend("http://127.0.0.1:9", connect_timeout=1)))
+    result = agent.execute("hello")
+    assert not result["success"]
+    assert result["error_kind"] == TRANSPORT
+
+
+if __name__ == "__main__":
+    test_backends_are_shared_per_host()
+    test_client_is_pooled_with_finite_timeouts()
+    test_agents_call_their_configured_backend()
+    test_unreachable_host_is_a_transport_error()
+    print("✅ LLM backend tests passed")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for least-outstanding-requests load balancing across Ollama hosts
+"""
+
+import sys
+import os
+import threading
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import LLMAgent
+from LLMBackend import LoadBalancedBackend, set_default_backend
+from llm_fakes import FakeBackend, model_config
+
+
+class FakeHost(FakeBackend):
+    """Backend standing in for one Ollama server"""
+
+    def __init__(self, host, gate=None, down=False):
+        super().__init__(f"answer from {host}", host)
+        self.gate = gate
+        self.down = down
+
+    def reply_for(self, **request):
+        if self.down:
+            raise ConnectionError(f"{self.host} refused the connection")
+        if self.gate is not None:
+            self.gate.wait(2)
+        return self.reply
+
+    def ps(self):
+        if self.down:
+            raise ConnectionError(f"{self.host} is down")
+        return {"models": []}
+
+
+def test_requests_go_to_least_busy_host():
+    gate = threading.Event()
+    slow, fast = FakeHost("slow", gate=gate), FakeHost("fast")
+    balancer = LoadBalancedBackend([slow, fast])
+
+    first = threading.Thread(target=balancer.chat, kwargs={"model": "m", "host": "slow"})
+    first.start()
+    while balancer.stats()["slow"]["in_flight"] == 0:
+        pass
+    assert balancer.select_host("m") == "fast"
+    balancer.chat(model="m")
+    gate.set()
+    first.join()
+
+    assert fast.chats == 1 and slow.chats == 1
+    assert balancer.stats()["slow"]["in_flight"] == 0
+
+
+def test_model_tags_restrict_routing():
+    big, small, spare = FakeHost("big"), FakeHost("small"), FakeHost("spare")
+    balancer = LoadBalancedBackend([{"host": big, "models": ["llama3:70b"]},
+                                    {"host": small, "models": ["llama3.2:1b"]}])
+
+    for _ in range(3):
+        assert balancer.chat(model="llama3:70b")["message"]["content"] == "answer from big"
+    assert small.chats == 0
+    assert balancer.select_host("llama3:70b", exclude=("big",)) is None
+
+    untagged = LoadBalancedBackend([{"host": big, "models": ["llama3:70b"]}, spare])
+    assert untagged.select_host("llama3:70b", exclude=("big",)) == "spare"  # Untagged hosts serve any model
+
+
+def test_failing_host_is_ejected_and_health_check_restores_it():
+    flaky, steady = FakeHost("flaky", down=True), FakeHost("steady")
+    balancer = LoadBalancedBackend([flaky, steady], failure_threshold=2, ejection_time=60)
+
+    for _ in range(2):
+        try:
+            balancer.chat(model="m", host="flaky")
+        except ConnectionError:
+            pass
+    assert not balancer.stats()["flaky"]["healthy"]
+    for _ in range(4):
+        balancer.chat(model="m")
+    assert steady.chats == 4 and flaky.chats == 2
+
+    flaky.down = False
+    assert balancer.check_health() == {"flaky": True, "steady": True}
+    assert balancer.stats()["flaky"]["healthy"]
+
+
+def test_default_backend_reaches_agents_without_config_changes():
+    balancer = LoadBalancedBackend([FakeHost("box1"), FakeHost("box2")])
+    set_default_backend(balancer)
+    try:
+        agent = LLMAgent("Writer", model_config(model="m"))
+        outputs = {agent.execute("hi")["output"] for _ in range(4)}
+    finally:
+        set_default_backend(None)
+
+    assert any("box1" in output for output in outputs) and any("box2" in output for output in outputs)
+    assert sum(host["requests"] for host in balancer.stats().values()) == 4
+
+
+if __name__ == "__main__":
+    test_requests_go_to_least_busy_host()
+    test_model_tags_restrict_routing()
+    test_failing_host_is_ejected_and_health_check_restores_it()
+    test_default_backend_reaches_agents_without_config_changes()
+    print("✅ Load balancing tests passed")
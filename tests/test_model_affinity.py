@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for model-affinity scheduling (ModelAffinityLimiter)
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+
+from Agent import Agent
+from RunContext import RunContext
+from WorkflowManager import WorkflowManager
+from WorkflowScheduler import WorkflowScheduler, ModelAffinityLimiter
+
+
+class PsBackend:
+    """Backend whose ps() reports a fixed set of loaded models"""
+
+    def __init__(self, models):
+        self.models = models
+
+    def ps(self):
+        return {"models": [{"model": model} for model in self.models]}
+
+
+def request(limiter, model, label, order, hold=0.02):
+    limiter.acquire(model)
+    order.append(label)
+    time.sleep(hold)
+    limiter.release(model)
+
+
+def start_in_order(targets):
+    threads = []
+    for args in targets:
+        thread = threading.Thread(target=request, args=args)
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)
+    return threads
+
+
+def test_requests_are_grouped_by_loaded_model():
+    limiter = ModelAffinityLimiter(backend=PsBackend([]), max_active_models=1)
+    order = []
+    limiter.acquire("gemma3")
+    threads = start_in_order([(limiter, "llama3", "llama-1", order), (limiter, "gemma3", "gemma-2", order),
+                              (limiter, "llama3", "llama-2", order), (limiter, "gemma3", "gemma-3", order)])
+    limiter.release("gemma3")
+    for thread in threads:
+        thread.join()
+
+    assert order == ["gemma-2", "gemma-3", "llama-1", "llama-2"]
+    assert limiter.switches == 1
+
+
+def test_waiting_model_is_not_starved():
+    limiter = ModelAffinityLimiter(backend=PsBackend([]), max_active_models=1, max_wait=0.1)
+    stop = threading.Event()
+    admitted = {}
+
+    def busy_gemma():
+        while not stop.is_set():
+            request(limiter, "gemma3", "gemma", [], hold=0.03)
+
+    workers = [threading.Thread(target=busy_gemma) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    limiter.acquire("llama3")
+    admitted["llama3"] = time.monotonic() - started
+    limiter.release("llama3")
+    stop.set()
+    for worker in workers:
+        worker.join()
+
+    assert admitted["llama3"] < 0.5
+
+
+def test_resident_models_are_preferred():
+    limiter = ModelAffinityLimiter(backend=PsBackend(["llama3"]), max_active_models=1)
+    order = []
+    limiter.acquire("phi3")
+    assert limiter.resident == {"llama3", "phi3"}
+    threads = start_in_order([(limiter, "gemma3", "gemma", order), (limiter, "llama3", "llama", order)])
+    limiter.release("phi3")
+    for thread in threads:
+        thread.join()
+
+    assert order == ["llama", "gemma"]
+
+
+class ModelAgent(Agent):
+    """Agent that records which models are running at the same time"""
+
+    active = set()
+    overlaps = []
+    lock = threading.Lock()
+
+    def __init__(self, name, model):
+        super().__init__(name, {"model": model}, retry_limit=1)
+
+    def execute(self, user_input):
+        model = self.get_model_name()
+        with ModelAgent.lock:
+            if ModelAgent.active - {model}:
+                ModelAgent.overlaps.append(model)
+            ModelAgent.active.add(model)
+        time.sleep(0.01)
+        with ModelAgent.lock:
+            ModelAgent.active.discard(model)
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+def test_scheduler_runs_one_model_at_a_time():
+    manager = WorkflowManager()
+    manager.add_agent(ModelAgent("SwitchAgent", "llama3.2:1b"))
+    manager.add_agent(ModelAgent("Agent1", "gemma3:latest"))
+    manager.add_workflow("flow", {"SwitchAgent": ["Agent1"], "Agent1": []})
+    manager.switch_workflow("flow")
+
+    limiter = ModelAffinityLimiter(backend=PsBackend([]), max_active_models=1)
+    with WorkflowScheduler(manager, max_workers=6, limiter=limiter) as scheduler:
+        contexts = [future.result() for future in [scheduler.submit(input_data=f"q{i}") for i in range(6)]]
+
+    assert all(context.outputs["Agent1"].startswith("Agent1(SwitchAgent(q") for context in contexts)
+    assert ModelAgent.overlaps == []
+    assert scheduler.stats()["model_switches"] <= 3     # Strict alternation would switch 11 times
+
+
+def test_async_requests_wait_without_executor_threads():
+    """Async waiters across two models outnumber the loop's threads and still all get in"""
+    limiter = ModelAffinityLimiter(backend=PsBackend([]), max_active_models=1)
+    run_context = RunContext(None)
+    run_context.model_limiter = limiter
+    agents = [ModelAgent("Llama", "llama3"), ModelAgent("Gemma", "gemma3")]
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        return await asyncio.gather(*[agents[i % 2].arun_with_retries(f"q{i}", run_context) for i in range(40)])
+
+    results = asyncio.run(asyncio.wait_for(main(), timeout=20))
+
+    assert all(result["success"] for result in results)
+    assert ModelAgent.overlaps == []
+    assert limiter.switches <= 5
+    assert limiter.stats()["waiting"] == {}
+
+
+if __name__ == "__main__":
+    test_requests_are_grouped_by_loaded_model()
+    test_waiting_model_is_not_starved()
+    test_resident_models_are_preferred()
+    test_scheduler_runs_one_model_at_a_time()
+    test_async_requests_wait_without_executor_threads()
+    print("✅ Model affinity tests passed")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Tests for prefetching the next agents' models while the current agent runs
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent
+from SwitchAgent import SwitchAgent
+from WorkflowManager import WorkflowManager
+from llm_fakes import model_config
+
+
+class RecordingBackend:
+    """Backend that records when each model load starts"""
+
+    def __init__(self, fail=False, load_time=0.05):
+        self.host = "box"
+        self.fail = fail
+        self.load_time = load_time
+        self.loads = []
+        self.lock = threading.Lock()
+
+    def generate(self, **kwargs):
+        with self.lock:
+            self.loads.append((kwargs["model"], time.monotonic()))
+        time.sleep(self.load_time)
+        if self.fail:
+            raise ConnectionError("host down")
+        return {"response": ""}
+
+
+class TimedAgent(Agent):
+    """Agent that takes a while and records when it finished"""
+
+    finished = {}
+
+    def __init__(self, name, model, backend):
+        super().__init__(name, {"model": model, "backend": backend})
+
+    def execute(self, user_input):
+        time.sleep(0.1)
+        TimedAgent.finished[self.name] = time.monotonic()
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+def build_manager(backend):
+    manager = WorkflowManager()
+    manager.add_agent(TimedAgent("SwitchAgent", "llama3.2:1b", backend))
+    manager.add_agent(TimedAgent("Agent1", "gemma3:latest", backend))
+    manager.add_agent(TimedAgent("Agent2", "gemma3:latest", backend))
+    manager.add_agent(TimedAgent("Summarizer", "llama3.2:1b", backend))
+    manager.add_workflow("flow", {"SwitchAgent": ["Agent1", "Agent2"], "Agent1": ["Summarizer"],
+                                  "Agent2": ["Summarizer"], "Summarizer": []})
+    manager.switch_workflow("flow")
+    manager.prefetch_models = True
+    return manager
+
+
+def wait_for_loads(backend, count):
+    deadline = time.monotonic() + 1.0
+    while len(backend.loads) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_next_model_loads_while_current_agent_runs():
+    backend = RecordingBackend()
+    manager = build_manager(backend)
+
+    run_context = manager.run_workflow("SwitchAgent", "question")
+    wait_for_loads(backend, 2)
+
+    assert "Summarizer" in run_context.outputs
+    models = [model for model, _ in backend.loads]
+    assert models == ["gemma3:latest", "llama3.2:1b"]          # Each switch prefetched once
+    gemma_loaded = backend.loads[0][1]
+    assert gemma_loaded < TimedAgent.finished["SwitchAgent"]     # Overlapped with the router
+
+
+def test_prefetch_is_off_by_default_and_skips_same_model():
+    backend = RecordingBackend()
+    manager = build_manager(backend)
+    manager.prefetch_models = False
+    manager.run_workflow("SwitchAgent", "question")
+    assert backend.loads == []
+
+    manager.prefetch_models = True
+    manager.add_workflow("same", {"Agent1": ["Agent2"], "Agent2": []})
+    manager.switch_workflow("same")
+    manager.run_workflow("Agent1", "question")
+    assert backend.loads == []
+
+
+def test_cooldown_dedupes_prefetches_across_runs():
+    backend = RecordingBackend()
+    manager = build_manager(backend)
+    manager.run_workflow("SwitchAgent", "first", max_workers=3)
+    manager.run_workflow("SwitchAgent", "second", max_workers=3)
+    wait_for_loads(backend, 2)
+    assert sorted(model for model, _ in backend.loads) == ["gemma3:latest", "llama3.2:1b"]
+
+    manager.prefetch_cooldown = 0
+    asyncio.run(manager.arun_workflow("SwitchAgent", "third"))
+    wait_for_loads(backend, 4)
+    assert len(backend.loads) == 4                               # Agent1 and Agent2 share one llama3.2 load
+
+
+def test_failed_prefetch_does_not_break_the_run():
+    backend = RecordingBackend(fail=True)
+    manager = build_manager(backend)
+
+    run_context = manager.run_workflow("SwitchAgent", "question")
+    wait_for_loads(backend, 2)
+    time.sleep(backend.load_time * 2)
+
+    assert run_context.outputs["Summarizer"].startswith("Summarizer(")
+    assert manager._prefetched == {}                             # Failures may be retried at once
+
+
+def test_switch_agent_prefetches_its_candidate_flows():
+    """The router has no plan successors; the entry agents of the flows it can pick are prefetched"""
+    backend = RecordingBackend()
+    manager = WorkflowManager()
+    router = SwitchAgent("SwitchAgent", model_config(backend),
+                         workflow_config={"keyword_mapping": {"code": "engineering_flow"}, "default_flow": "science_flow"})
+    router.set_available_flows(["engineering_flow"])
+    manager.add_agent(router)
+    manager.add_agent(TimedAgent("Start", None, backend))
+    manager.add_agent(TimedAgent("Scientist", "gemma3:latest", backend))
+    manager.add_agent(TimedAgent("Engineer", "qwen2.5:7b", backend))
+    manager.add_workflow("router", {"SwitchAgent": []})
+    manager.add_workflow("science_flow", {"Start": ["Scientist"], "Scientist": []})
+    manager.add_workflow("engineering_flow", {"Start": ["Engineer"], "Engineer": []})
+    manager.switch_workflow("router")
+    manager.prefetch_models = True
+
+    assert manager.get_plan("router").next_agents("SwitchAgent") == ()
+    run_context = manager.run_workflow("SwitchAgent", "write code")
+    wait_for_loads(backend, 2)
+
+    assert run_context.outputs["Engineer"] == "Engineer(Start(write code))"
+    assert sorted(model for model, _ in backend.loads) == ["gemma3:latest", "qwen2.5:7b"]
+    assert all(loaded < TimedAgent.finished["Start"] for _, loaded in backend.loads)
+
+
+if __name__ == "__main__":
+    test_next_model_loads_while_current_agent_runs()
+    test_prefetch_is_off_by_default_and_skips_same_model()
+    test_cooldown_dedupes_prefetches_across_runs()
+    test_failed_prefetch_does_not_break_the_run()
+    test_switch_agent_prefetches_its_candidate_flows()
+    print("✅ Model prefetch tests passed")
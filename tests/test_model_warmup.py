@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for model preloading and keep_alive policies in WorkflowManager
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent, LLMAgent
+from LLMBackend import LoadBalancedBackend
+from WorkflowManager import WorkflowManager
+from llm_fakes import FakeBackend, model_config
+
+
+class LoadingBackend(FakeBackend):
+    """Backend that takes a while to 'load' a model and records every request"""
+
+    def __init__(self, host="box", load_time=0.1):
+        super().__init__(host=host)
+        self.load_time = load_time
+        self.loads = []
+        self.lock = threading.Lock()
+
+    def generate(self, **kwargs):
+        time.sleep(self.load_time)
+        with self.lock:
+            self.loads.append(kwargs)
+        return {"response": ""}
+
+
+def config(model, backend):
+    return model_config(backend, model=model, temperature=0.7)
+
+
+def build_manager(backend):
+    manager = WorkflowManager()
+    manager.add_agent(LLMAgent("SwitchAgent", config("llama3.2:1b", backend)))
+    gemma = config("gemma3:latest", backend)
+    manager.add_agent(LLMAgent("Agent1", gemma))
+    manager.add_agent(LLMAgent("Agent2", gemma))
+    manager.add_agent(LLMAgent("Summarizer", config("phi3:mini", backend)))
+    manager.add_agent(Agent("UserInput", {}))
+    return manager
+
+
+def test_models_are_collected_from_agents():
+    manager = build_manager(LoadingBackend())
+    assert manager.collect_models() == {
+        "llama3.2:1b": ["SwitchAgent"],
+        "gemma3:latest": ["Agent1", "Agent2"],
+        "phi3:mini": ["Summarizer"],
+    }
+
+
+def test_models_are_warmed_in_parallel_with_keep_alive():
+    backend = LoadingBackend(load_time=0.1)
+    manager = build_manager(backend)
+    manager.set_keep_alive("gemma3:latest", "1h")
+
+    started = time.monotonic()
+    results = manager.warm_models()
+    elapsed = time.monotonic() - started
+
+    assert set(results) == {"llama3.2:1b", "gemma3:latest", "phi3:mini"}
+    assert elapsed < 0.25                    # Three 0.1s loads at once, not one after another
+    keep_alive = {load["model"]: load.get("keep_alive") for load in backend.loads}
+    assert keep_alive == {"llama3.2:1b": None, "gemma3:latest": "1h", "phi3:mini": None}
+
+
+def test_keep_alive_policy_is_sent_with_requests():
+    backend = LoadingBackend()
+    manager = build_manager(backend)
+    manager.set_keep_alive("gemma3:latest", -1)
+    manager.add_agent(LLMAgent("Agent3", config("gemma3:latest", backend)))
+
+    manager.agents["Agent3"].execute("hello")
+    manager.agents["SwitchAgent"].execute("hello")
+
+    assert backend.requests[0]["keep_alive"] == -1
+    assert "keep_alive" not in backend.requests[1]
+
+
+def test_every_host_of_a_load_balancer_is_warmed():
+    hosts = [LoadingBackend("box1", 0.0), LoadingBackend("box2", 0.0)]
+    balancer = LoadBalancedBackend([hosts[0], {"host": hosts[1], "models": ["gemma3:latest"]}])
+    manager = WorkflowManager()
+    manager.add_agent(LLMAgent("Agent1", config("gemma3:latest", balancer)))
+    manager.add_agent(LLMAgent("SwitchAgent", config("llama3.2:1b", balancer)))
+
+    results = manager.warm_models()
+
+    assert set(results) == {"gemma3:latest@box1", "gemma3:latest@box2", "llama3.2:1b@box1"}
+    assert [load["model"] for load in hosts[1].loads] == ["gemma3:latest"]
+
+
+def test_scheduled_warmup_repeats_until_cancelled():
+    backend = LoadingBackend(load_time=0.0)
+    manager = WorkflowManager()
+    manager.add_agent(LLMAgent("Agent1", config("gemma3:latest", backend)))
+
+    manager.schedule_warmup(0.05, repeat=0.05)
+    time.sleep(0.2)
+    manager.cancel_warmups()
+    warmed = len(backend.loads)
+    time.sleep(0.15)
+
+    assert warmed >= 2
+    assert len(backend.loads) <= warmed + 1  # At most one warmup that was already running
+
+
+if __name__ == "__main__":
+    test_models_are_collected_from_agents()
+    test_models_are_warmed_in_parallel_with_keep_alive()
+    test_keep_alive_policy_is_sent_with_requests()
+    test_every_host_of_a_load_balancer_is_warmed()
+    test_scheduled_warmup_repeats_until_cancelled()
+    print("✅ Model warmup tests passed")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for the intent-keyed cache of PromptAgent prompt modifications
+"""
+
+import sys
+import os
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PromptAgent import PromptAgent
+from PromptCache import PromptCache, keyword_intent, classifier_intent
+from routing_classifier import RoutingClassifier
+from llm_fakes import FakeBackend, model_config
+
+
+class PromptSetBackend(FakeBackend):
+    """Backend that returns a fresh prompt set per call unless given a fixed reply"""
+
+    def __init__(self, reply=None):
+        super().__init__(reply, host="prompt-host")
+
+    def reply_for(self, **request):
+        return self.reply or ('{"analysis": "call %d", "prompt_modifications": {"Agent1": "Prompt %d"}, '
+                              '"workflow_suggestions": ""}' % (self.chats, self.chats))
+
+
+def prompt_agent(backend, cache, system="Return JSON"):
+    return PromptAgent("PromptAgent", model_config(backend, temperature=0.7), system=system, target_agents={"Agent1": "Explains"},
+                       prompt_cache=cache)
+
+
+INTENTS = {"photosynthesis": "biology", "plants": "biology", "api": "software", "python": "software"}
+
+
+def test_same_intent_reuses_the_prompt_set():
+    backend = PromptSetBackend()
+    cache = PromptCache(keyword_intent(INTENTS))
+    agent = prompt_agent(backend, cache)
+
+    first = agent.execute("How does photosynthesis work?")
+    second = agent.execute("Why are plants green?")
+    other = agent.execute("Design an API in Python")
+
+    assert backend.chats == 2
+    assert second["success"] and second["output"]["cached_intent"] == "biology"
+    assert second["output"]["original_input"] == "Why are plants green?"
+    assert second["output"]["prompt_modifications"] == first["output"]["prompt_modifications"]
+    assert other["output"]["prompt_modifications"] == {"Agent1": "Prompt 2"}
+    assert cache.stats()["hit_rate"] == round(1 / 3, 3)
+
+
+def test_unknown_intents_and_bad_replies_are_not_cached():
+    backend = PromptSetBackend(reply="No JSON today")
+    cache = PromptCache(keyword_intent(INTENTS))
+    agent = prompt_agent(backend, cache)
+
+    agent.execute("Tell me a story")
+    agent.execute("Tell me a story")
+    agent.execute("Explain photosynthesis")
+    agent.execute("Explain photosynthesis")
+
+    assert backend.chats == 4
+    stats = cache.stats()
+    assert stats["uncategorized"] == 2 and stats["entries"] == 0
+
+
+def test_cached_sets_are_isolated_and_scoped_to_the_agent_setup():
+    backend = PromptSetBackend()
+    cache = PromptCache(keyword_intent(INTENTS))
+    agent = prompt_agent(backend, cache)
+
+    agent.execute("photosynthesis")
+    reused = agent.execute("plants")
+    reused["output"]["prompt_modifications"]["Agent1"] = "mutated"
+    assert agent.execute("plants")["output"]["prompt_modifications"] == {"Agent1": "Prompt 1"}
+
+    other_system = prompt_agent(backend, cache, system="Return JSON, be brief")
+    other_system.execute("plants")
+    assert backend.chats == 2
+
+
+def test_lru_ttl_and_invalidation():
+    cache = PromptCache(lambda text: text, max_entries=2, ttl=0.05)
+    for intent in ["a", "b", "c"]:
+        cache.set(intent, {"prompt_modifications": {"Agent1": intent}})
+    assert cache.get("a") is None and cache.stats()["evictions"] == 1
+    assert cache.get("c")["prompt_modifications"] == {"Agent1": "c"}
+
+    cache.invalidate("c")
+    assert cache.get("c") is None
+    cache.set("b", {"prompt_modifications": {}})
+    time.sleep(0.06)
+    assert cache.get("b") is None
+
+
+def test_classifier_labels_as_intents():
+    classifier = RoutingClassifier().fit(
+        ["explain photosynthesis", "how do plants grow", "write a python api", "debug my python code"],
+        ["biology", "biology", "software", "software"])
+    intent = classifier_intent(classifier, min_confidence=0.6)
+
+    assert intent("photosynthesis in plants") == "biology"
+    assert intent("completely unrelated words") is None
+
+
+if __name__ == "__main__":
+    test_same_intent_reuses_the_prompt_set()
+    test_unknown_intents_and_bad_replies_are_not_cached()
+    test_cached_sets_are_isolated_and_scoped_to_the_agent_setup()
+    test_lru_ttl_and_invalidation()
+    test_classifier_labels_as_intents()
+    print("✅ Prompt cache tests passed")
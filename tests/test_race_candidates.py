@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Tests for best-of-k candidate racing in LLMAgent
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import LLMAgent
+from RunContext import RunContext
+from WorkflowScheduler import ModelConcurrencyLimiter
+from llm_fakes import model_config
+
+
+class CandidateAgent(LLMAgent):
+    """LLMAgent whose generations are scripted as (delay, valid) per candidate"""
+
+    def __init__(self, candidates, race_candidates):
+        super().__init__("Racer", {"model": "test", "race_candidates": race_candidates}, retry_limit=2)
+        self.candidates = list(candidates)
+        self.started = 0
+        self.cancelled = 0
+        self.lock = threading.Lock()
+
+    def _next_candidate(self):
+        with self.lock:
+            index = self.started
+            self.started += 1
+        return index, self.candidates[index % len(self.candidates)]
+
+    def execute(self, user_input):
+        index, (delay, valid) = self._next_candidate()
+        time.sleep(delay)
+        return {"output": f"candidate{index}", "success": valid}
+
+    async def aexecute(self, user_input):
+        index, (delay, valid) = self._next_candidate()
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"output": f"candidate{index}", "success": valid}
+
+
+class StreamingBackend:
+    """Backend streaming scripted candidates as (seconds per chunk, text); records closed streams"""
+
+    def __init__(self, candidates, chunks=20):
+        self.host = "fake"
+        self.candidates = list(candidates)
+        self.chunks = chunks
+        self.requests = []
+        self.closed = []
+        self.lock = threading.Lock()
+
+    def chat(self, stream=False, **kwargs):
+        with self.lock:
+            index = len(self.requests)
+            self.requests.append(stream)
+        delay, text = self.candidates[index % len(self.candidates)]
+
+        def generate():
+            sent = 0
+            try:
+                for _ in range(self.chunks):
+                    time.sleep(delay)
+                    sent += 1
+                    yield {"message": {"content": text}}
+            finally:
+                if sent < self.chunks:
+                    with self.lock:
+                        self.closed.append((index, sent))
+
+        if stream:
+            return generate()
+        return {"message": {"content": text * self.chunks}}
+
+
+def streaming_racer(backend, **config):
+    return LLMAgent("Racer", model_config(backend, model="test", race_candidates=3, **config),
+                    validate_fn=lambda result: "good" in result["output"], retry_limit=1)
+
+
+def test_first_valid_candidate_wins():
+    agent = CandidateAgent([(0.5, True), (0.02, False), (0.1, True)], race_candidates=3)
+    started = time.monotonic()
+    result = agent.run_with_retries("question")
+    elapsed = time.monotonic() - started
+
+    assert result == {"output": "candidate2", "success": True}
+    assert elapsed < 0.4
+    assert agent.get_retry_count() == 0
+
+
+def test_all_invalid_candidates_count_as_one_attempt():
+    agent = CandidateAgent([(0.01, False)], race_candidates=3)
+    result = agent.run_with_retries("question")
+
+    assert not result["success"]
+    assert agent.started == 6           # Two attempts of three candidates
+    assert agent.get_retry_count() == 2
+
+
+def test_async_race_cancels_losers():
+    agent = CandidateAgent([(0.5, True), (0.02, True), (0.5, True)], race_candidates=3)
+    result = asyncio.run(agent.arun_with_retries("question"))
+
+    assert result["output"] == "candidate1"
+    assert agent.cancelled == 2
+
+
+def test_sync_race_stops_the_losing_generations():
+    backend = StreamingBackend([(0.05, "slow "), (0.001, "good "), (0.05, "slow ")])
+    result = streaming_racer(backend).run_with_retries("question")
+
+    assert result["success"] and "good" in result["output"] and "slow" not in result["output"]
+    assert backend.requests == [True, True, True]                # Candidates are streamed
+    deadline = time.monotonic() + 1.0
+    while len(backend.closed) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(index for index, _ in backend.closed) == [0, 2]
+    assert all(sent < backend.chunks for _, sent in backend.closed)
+
+
+def test_streamed_agents_do_not_race():
+    backend = StreamingBackend([(0.0, "good ")], chunks=2)
+    agent = streaming_racer(backend, stream=True, event_bus=type("Bus", (), {"publish": lambda self, event: None})())
+    assert agent.run_with_retries("question")["success"]
+    assert backend.requests == [True]
+
+
+def test_without_race_a_single_generation_runs():
+    agent = CandidateAgent([(0.0, True)], race_candidates=None)
+    assert agent.run_with_retries("question")["output"] == "candidate0"
+    assert agent.started == 1
+
+
+def limited_run(limits):
+    run_context = RunContext(plan=None)
+    run_context.model_limiter = ModelConcurrencyLimiter(limits)
+    return run_context
+
+
+def test_race_is_capped_at_the_model_limit():
+    """Candidates beyond the model's slots would only queue and still reach the backend"""
+    backend = StreamingBackend([(0.001, "good ")], chunks=2)
+    assert streaming_racer(backend).run_with_retries("question", limited_run({"test": 1}))["success"]
+    assert backend.requests == [False]                          # Limit 1: a single plain request
+
+    backend = StreamingBackend([(0.001, "good ")], chunks=2)
+    assert streaming_racer(backend).run_with_retries("question", limited_run({"test": 2}))["success"]
+    assert backend.requests == [True, True]
+
+
+def test_candidates_that_get_their_slot_after_the_race_send_nothing():
+    backend = StreamingBackend([(0.001, "good "), (0.05, "slow ")])
+    run_context = limited_run({"test": 3})
+    limiter = run_context.model_limiter
+    limiter.acquire("test")                                     # Only one candidate gets a slot at once
+    limiter.acquire("test")
+    result = []
+    thread = threading.Thread(target=lambda: result.append(streaming_racer(backend).run_with_retries("question", run_context)))
+    thread.start()
+    thread.join(1.0)                                            # The first candidate wins alone
+    limiter.release("test")
+    limiter.release("test")
+    time.sleep(0.1)                                             # Let the waiting losers take their slots
+
+    assert result and result[0]["success"]
+    assert backend.requests == [True]
+    assert limiter.in_flight["test"] == 0
+
+
+if __name__ == "__main__":
+    test_first_valid_candidate_wins()
+    test_all_invalid_candidates_count_as_one_attempt()
+    test_async_race_cancels_losers()
+    test_sync_race_stops_the_losing_generations()
+    test_streamed_agents_do_not_race()
+    test_without_race_a_single_generation_runs()
+    test_race_is_capped_at_the_model_limit()
+    test_candidates_that_get_their_slot_after_the_race_send_nothing()
+    print("✅ Race candidate tests passed")
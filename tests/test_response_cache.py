@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk LLM response cache
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import LLMAgent
+from ResponseCache import ResponseCache
+from llm_fakes import model_config
+
+
+MODEL_CONFIG = model_config(model="gemma3:latest", temperature=0.7, top_p=0.2)
+
+
+def test_keys_depend_on_everything_that_shapes_the_answer():
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "hi"}]
+    key = ResponseCache.make_key("m", {"temperature": 0.7}, messages)
+
+    assert key == ResponseCache.make_key("m", {"temperature": 0.7}, [dict(m) for m in messages])
+    assert key != ResponseCache.make_key("other", {"temperature": 0.7}, messages)
+    assert key != ResponseCache.make_key("m", {"temperature": 0.1}, messages)
+    assert key != ResponseCache.make_key("m", {"temperature": 0.7}, messages[:1])
+
+
+def test_lru_eviction_and_ttl():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, "cache.sqlite3"), max_entries=2)
+        cache.set("a", "A")
+        time.sleep(0.01)
+        cache.set("b", "B")
+        time.sleep(0.01)
+        assert cache.get("a") == "A"      # "a" is now more recent than "b"
+        time.sleep(0.01)
+        cache.set("c", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A" and cache.get("c") == "C"
+        assert len(cache) == 2
+
+        sized = ResponseCache(os.path.join(tmp, "sized.sqlite3"), max_entries=None, max_bytes=10)
+        sized.set("x", "12345")
+        time.sleep(0.01)
+        sized.set("y", "1234567")
+        assert sized.get("x") is None and sized.get("y") == "1234567"
+
+        expiring = ResponseCache(os.path.join(tmp, "ttl.sqlite3"), ttl=0.05)
+        expiring.set("k", "v")
+        assert expiring.get("k") == "v"
+        time.sleep(0.1)
+        assert expiring.get("k") is None
+
+        for store in (cache, sized, expiring):
+            store.close()
+
+
+def test_llm_agent_serves_cache_hits_without_calling_the_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(os.path.join(tmp, "cache.sqlite3"))
+        config = dict(MODEL_CONFIG, response_cache=cache)
+        agent = LLMAgent("Agent1", config, system="Explain things", validate_fn=lambda r: "?" in r["output"])
+
+        messages = agent._build_messages("photosynthesis")
+        cache.set(cache.make_key(config["model"], agent._chat_options(), messages), "What is light? ")
+
+        result = agent.execute("photosynthesis")
+
+        assert result["success"]
+        assert "What is light?" in result["output"]
+        assert cache.stats()["hits"] == 1
+        cache.close()
+
+
+if __name__ == "__main__":
+    test_keys_depend_on_everything_that_shapes_the_answer()
+    test_lru_eviction_and_ttl()
+    test_llm_agent_serves_cache_hits_without_calling_the_model()
+    print("✅ Response cache tests passed")
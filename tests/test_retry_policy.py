@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for retry policies, error classification and per-run retry budgets
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+import httpx
+import ollama
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent
+from RetryPolicy import RetryPolicy, RetryBudget, classify_error, TRANSPORT, FATAL
+from WorkflowManager import WorkflowManager
+
+
+class ScriptedAgent(Agent):
+    """Agent that returns a scripted sequence of failures before succeeding"""
+
+    def __init__(self, name, failures, retry_limit=5, **kwargs):
+        super().__init__(name, {}, retry_limit=retry_limit, **kwargs)
+        self.failures = list(failures)
+        self.call_times = []
+
+    def execute(self, user_input):
+        self.call_times.append(time.monotonic())
+        if self.failures:
+            kind = self.failures.pop(0)
+            if kind == "validation":
+                return {"output": "rejected", "success": False}
+            return {"output": None, "success": False, "error": kind, "error_kind": kind}
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+def test_error_classification():
+    assert classify_error(ConnectionError("refused")) == TRANSPORT
+    assert classify_error(httpx.ReadTimeout("model loading")) == TRANSPORT
+    assert classify_error(ollama.ResponseError("overloaded", 503)) == TRANSPORT
+    assert classify_error(ollama.ResponseError("model 'x' not found", 404)) == FATAL
+    assert classify_error(KeyError("message")) == FATAL
+
+
+def test_backoff_grows_and_is_capped():
+    policy = RetryPolicy(base_delay=0.5, max_delay=3.0, jitter=False)
+    assert [policy.delay(n) for n in range(1, 5)] == [0.5, 1.0, 2.0, 3.0]
+    jittered = RetryPolicy(base_delay=1.0, max_delay=4.0)
+    assert all(0 <= jittered.delay(3) <= 4.0 for _ in range(50))
+
+
+def test_transport_errors_back_off_and_fatal_errors_stop():
+    agent = ScriptedAgent("Net", ["transport", "transport"],
+                          retry_policy=RetryPolicy(base_delay=0.05, jitter=False))
+    result = agent.run_with_retries("q")
+    assert result["success"]
+    gaps = [b - a for a, b in zip(agent.call_times, agent.call_times[1:])]
+    assert gaps[0] >= 0.05 and gaps[1] >= 0.1
+
+    fatal = ScriptedAgent("Fatal", ["fatal", "fatal"])
+    assert not fatal.run_with_retries("q")["success"]
+    assert len(fatal.call_times) == 1
+
+
+def test_validation_failures_use_their_own_policy():
+    agent = ScriptedAgent("Picky", ["validation"] * 4,
+                          validation_retry_policy=RetryPolicy(max_retries=1, base_delay=0.0))
+    assert not agent.run_with_retries("q")["success"]
+    assert len(agent.call_times) == 2
+
+
+def test_retry_budget_counts_down_to_zero():
+    budget = RetryBudget(2)
+    assert budget.remaining == 2
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+    assert budget.remaining == 0 and budget.spent == 2
+
+
+def test_run_retry_budget_is_shared_by_agents():
+    manager = WorkflowManager()
+    manager.add_agent(ScriptedAgent("Start", []))
+    manager.add_agent(ScriptedAgent("A", ["validation"] * 5))
+    manager.add_agent(ScriptedAgent("B", ["validation"] * 5))
+    manager.add_workflow("fan", {"Start": ["A", "B"], "A": [], "B": []})
+    manager.switch_workflow("fan")
+    manager.retry_budget = 3
+
+    run_context = manager.run_workflow("Start", "x")
+
+    attempts = len(manager.agents["A"].call_times) + len(manager.agents["B"].call_times)
+    assert attempts == 2 + 3    # One first attempt each plus the shared budget
+    assert run_context.retry_budget.remaining == 0
+
+
+def test_async_retries_sleep_without_blocking():
+    agent = ScriptedAgent("Async", ["transport"], retry_policy=RetryPolicy(base_delay=0.05, jitter=False))
+
+    async def main():
+        ticks = []
+
+        async def ticker():
+            while len(ticks) < 3:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        result, _ = await asyncio.gather(agent.arun_with_retries("q"), ticker())
+        return result, ticks
+
+    result, ticks = asyncio.run(main())
+    assert result["success"]
+    assert ticks[-1] < agent.call_times[-1]  # The loop kept running during the backoff
+
+
+if __name__ == "__main__":
+    test_error_classification()
+    test_backoff_grows_and_is_capped()
+    test_transport_errors_back_off_and_fatal_errors_stop()
+    test_validation_failures_use_their_own_policy()
+    test_retry_budget_counts_down_to_zero()
+    test_run_retry_budget_is_shared_by_agents()
+    test_async_retries_sleep_without_blocking()
+    print("✅ Retry policy tests passed")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for the SwitchAgent routing-decision cache
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RoutingCache import RoutingCache
+from SwitchAgent import SwitchAgent
+from llm_fakes import FakeBackend, model_config
+
+
+def switch_agent(backend, cache):
+    agent = SwitchAgent("SwitchAgent", model_config(backend), system="Pick a flow",
+                        workflow_config={"use_llm_decision": True, "routing_cache": cache})
+    agent.set_available_flows(["default_flow", "science_flow"])
+    return agent
+
+
+def test_repeated_questions_skip_the_llm():
+    backend = FakeBackend("science_flow")
+    cache = RoutingCache()
+    agent = switch_agent(backend, cache)
+
+    first = agent.execute("What is a black hole?")
+    again = agent.execute({"output": "  what is a   BLACK hole "})
+
+    assert first["switch_flow"] == again["switch_flow"] == "science_flow"
+    assert again["cached"] and again["output"] == "  what is a   BLACK hole "
+    assert backend.chats == 1
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "invalidations": 0}
+
+
+def test_flow_or_prompt_changes_invalidate():
+    backend = FakeBackend("science_flow")
+    cache = RoutingCache()
+    agent = switch_agent(backend, cache)
+
+    agent.execute("What is a black hole?")
+    agent.set_available_flows(["default_flow", "science_flow", "engineering_flow"])
+    agent.execute("What is a black hole?")
+    assert backend.chats == 2
+
+    agent.system = "Pick a flow, carefully"
+    agent.execute("What is a black hole?")
+    assert backend.chats == 3
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_invalid_llm_answers_are_not_cached():
+    backend = FakeBackend("no_such_flow")
+    agent = switch_agent(backend, RoutingCache())
+
+    assert agent.execute("hello")["switch_flow"] == "default_flow"
+    agent.execute("hello")
+    assert backend.chats == 2
+
+
+def test_ttl_and_lru_bound():
+    cache = RoutingCache(max_entries=2, ttl=0.05)
+    decision = {"switch_flow": "science_flow", "success": True}
+    for text in ["a", "b", "c"]:
+        cache.set(text, "sig", decision)
+    assert cache.get("a", "sig") is None                 # Evicted as least recently used
+    assert cache.get("c", "sig") == decision
+    time.sleep(0.06)
+    assert cache.get("c", "sig") is None                 # Expired
+
+
+def test_concurrent_access():
+    cache = RoutingCache(max_entries=50)
+    errors = []
+
+    def worker(offset):
+        try:
+            for index in range(500):
+                text = f"question {(index + offset) % 80}"
+                if cache.get(text, "sig") is None:
+                    cache.set(text, "sig", {"switch_flow": text})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert cache.stats()["entries"] <= 50
+
+
+def test_async_path_uses_the_cache():
+    backend = FakeBackend("science_flow")
+    agent = switch_agent(backend, RoutingCache())
+
+    async def route_twice():
+        await agent.aexecute("Why is the sky blue?")
+        return await agent.aexecute("why is the sky blue")
+
+    assert asyncio.run(route_twice())["cached"]
+    assert backend.chats == 1
+
+
+if __name__ == "__main__":
+    test_repeated_questions_skip_the_llm()
+    test_flow_or_prompt_changes_invalidate()
+    test_invalid_llm_answers_are_not_cached()
+    test_ttl_and_lru_bound()
+    test_concurrent_access()
+    test_async_path_uses_the_cache()
+    print("✅ Routing cache tests passed")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for decision logging and the distilled routing classifier
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routing_classifier import DecisionLog, RoutingClassifier, train
+from SwitchAgent import SwitchAgent
+from llm_fakes import FakeBackend, model_config
+
+SCIENCE = ["How do black holes form", "Explain photosynthesis in plants", "What is quantum entanglement",
+           "Why do stars shine", "How does DNA replication work", "What causes earthquakes",
+           "Explain the theory of relativity", "How do vaccines train the immune system"]
+ENGINEERING = ["Build a REST API in Python", "Write code for a login page", "Debug my JavaScript function",
+               "Design a database schema for a shop", "Deploy a web app with Docker",
+               "Refactor this Java class", "Write unit tests for my code", "Build a mobile app"]
+
+
+class KeywordLLM(FakeBackend):
+    """Backend standing in for the router LLM: engineering if the input mentions code words"""
+
+    def __init__(self):
+        super().__init__(host="router")
+
+    def reply_for(self, messages, **request):
+        text = messages[-1]["content"].lower()
+        words = ("build", "code", "debug", "api", "deploy", "app", "java", "database", "refactor", "tests")
+        return "engineering_flow" if any(w in text for w in words) else "science_flow"
+
+
+def switch_agent(backend, **config):
+    agent = SwitchAgent("SwitchAgent", model_config(backend), system="Pick a flow",
+                        workflow_config={"use_llm_decision": True, **config})
+    agent.set_available_flows(["default_flow", "science_flow", "engineering_flow"])
+    return agent
+
+
+def test_classifier_learns_and_round_trips():
+    texts = SCIENCE + ENGINEERING
+    labels = ["science_flow"] * len(SCIENCE) + ["engineering_flow"] * len(ENGINEERING)
+    classifier = RoutingClassifier().fit(texts, labels)
+
+    assert classifier.accuracy(texts, labels) == 1.0
+    assert classifier.predict("Write code for my API")[0] == "engineering_flow"
+    assert classifier.predict("Why do black holes shine")[0] == "science_flow"
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model.json")
+        classifier.save(path)
+        loaded = RoutingClassifier.load(path)
+    assert loaded.predict_proba("Debug my code") == classifier.predict_proba("Debug my code")
+
+
+def test_logged_llm_decisions_train_the_router():
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "decisions.jsonl")
+        model_path = os.path.join(directory, "model.json")
+
+        teacher = KeywordLLM()
+        logging_agent = switch_agent(teacher, decision_log=log_path)
+        for text in SCIENCE + ENGINEERING:
+            logging_agent.execute(text)
+        with open(log_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 16 and {record["method"] for record in records} == {"llm"}
+        assert records[0]["input"] == SCIENCE[0] and records[0]["flow"] == "science_flow"
+
+        summary = train(log_path, model_path)
+        assert summary["examples"] == 16 and summary["classes"] == ["engineering_flow", "science_flow"]
+
+        student = KeywordLLM()
+        agent = switch_agent(student, routing_classifier=model_path, decision_log=log_path)
+        confident = agent.execute("Build a REST API with tests")
+        assert confident["decision_method"] == "classifier"
+        assert confident["switch_flow"] == "engineering_flow"
+        assert student.chats == 0
+
+        unsure = agent.execute("Hello there")
+        assert unsure["decision_method"] == "llm"
+        assert student.chats == 1
+        assert DecisionLog(log_path).read(methods=None)[-2:] == [
+            ("Build a REST API with tests", "engineering_flow"), ("Hello there", "science_flow")]
+
+
+def test_unknown_words_escalate_despite_imbalanced_training():
+    """Class priors alone must never look like a confident decision"""
+    texts = SCIENCE + ["What is dark matter"] + ENGINEERING[:1]
+    labels = ["science_flow"] * (len(SCIENCE) + 1) + ["engineering_flow"]
+    classifier = RoutingClassifier().fit(texts, labels)
+
+    assert classifier.predict("zzz qqq") == (None, 0.0)
+    assert classifier.predict("Build a REST API")[0] == "engineering_flow"
+
+    agent = switch_agent(KeywordLLM())
+    agent.routing_classifier = classifier
+    backend = agent.model_config["backend"]
+    decision = agent.execute("zzz qqq")
+    assert decision["decision_method"] != "classifier"
+    assert backend.chats == 1
+
+
+def test_training_needs_two_flows_and_missing_model_is_ignored():
+    with tempfile.TemporaryDirectory() as directory:
+        log = DecisionLog(os.path.join(directory, "decisions.jsonl"))
+        log.append("How do stars form", "science_flow", "llm")
+        log.append("Build an app", "engineering_flow", "keyword")     # Not a training method
+        try:
+            train(log.path, os.path.join(directory, "model.json"))
+            assert False, "a single flow can't train a classifier"
+        except ValueError:
+            pass
+
+        agent = switch_agent(KeywordLLM(), routing_classifier=os.path.join(directory, "missing.json"))
+        assert agent.routing_classifier is None
+        assert agent.execute("Build an app")["switch_flow"] == "engineering_flow"
+
+
+if __name__ == "__main__":
+    test_classifier_learns_and_round_trips()
+    test_logged_llm_decisions_train_the_router()
+    test_unknown_words_escalate_despite_imbalanced_training()
+    test_training_needs_two_flows_and_missing_model_is_ignored()
+    print("✅ Routing classifier tests passed")
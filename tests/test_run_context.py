@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for per-run execution state (RunContext) in WorkflowManager
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import Agent
+from ExecutionPlan import compile_workflow
+from RunContext import RunContext
+from WorkflowManager import WorkflowManager
+
+
+class EchoAgent(Agent):
+    """Agent that tags its input with its name after a short delay"""
+
+    def __init__(self, name, delay=0.05, expected_inputs=1):
+        super().__init__(name, {}, retry_limit=2, expected_inputs=expected_inputs)
+        self.delay = delay
+        self.calls = []
+
+    def execute(self, user_input):
+        self.calls.append(user_input)
+        time.sleep(self.delay)
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+class FlakyAgent(Agent):
+    """Agent that fails for inputs containing 'fail'"""
+
+    def execute(self, user_input):
+        return {"output": user_input, "success": "fail" not in user_input}
+
+
+class RouterAgent(Agent):
+    def execute(self, user_input):
+        return {"output": user_input, "success": True, "switch_flow": "second_flow"}
+
+
+def build_manager():
+    manager = WorkflowManager()
+    for agent in [EchoAgent("Start", 0.0), EchoAgent("Left"), EchoAgent("Right"),
+                  EchoAgent("Join", 0.0, expected_inputs=2), RouterAgent("Router", {}),
+                  FlakyAgent("Flaky", {}, retry_limit=2)]:
+        manager.add_agent(agent)
+    manager.add_workflow("diamond", {
+        "Start": ["Left", "Right"],
+        "Left": ["Join"],
+        "Right": ["Join"],
+        "Join": []
+    })
+    manager.add_workflow("second_flow", {
+        "Left": [],
+    })
+    manager.switch_workflow("diamond")
+    return manager
+
+
+def test_concurrent_runs_keep_separate_fan_in_buffers():
+    manager = build_manager()
+    contexts = {}
+
+    def run(label):
+        contexts[label] = manager.run_workflow("Start", label, max_workers=2)
+
+    threads = [threading.Thread(target=run, args=(f"run{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(manager.agents["Join"].calls) == 8
+    for label, run_context in contexts.items():
+        joined = run_context.outputs["Join"]
+        assert f"Left(Start({label}))" in joined and f"Right(Start({label}))" in joined
+        assert run_context.pending_inputs.get("Join", []) == []
+
+    run_ids = {run_context.run_id for run_context in contexts.values()}
+    assert len(run_ids) == 8
+
+
+def test_switch_only_affects_the_run():
+    manager = build_manager()
+    connections_before = dict(manager.connections)
+
+    run_context = manager.run_workflow("Router", "hello")
+
+    assert run_context.workflow_name == "second_flow"
+    assert run_context.outputs["Left"] == "Left(hello)"
+    assert manager.connections == connections_before
+    assert manager.active_workflow == "diamond"
+
+
+def test_retry_counters_are_per_run():
+    manager = build_manager()
+    flaky = manager.agents["Flaky"]
+
+    failed = manager.run_workflow("Flaky", "please fail")
+    assert failed.retry_counts["Flaky"] == 2
+    assert "Flaky" not in failed.outputs
+
+    # A failed run must not exhaust the agent's retries for the next run
+    succeeded = manager.run_workflow("Flaky", "please work")
+    assert succeeded.outputs["Flaky"] == "please work"
+    assert flaky.retry_count == 0
+
+
+def test_agent_without_context_keeps_instance_state():
+    agent = EchoAgent("Solo", expected_inputs=2)
+    assert agent.receive_input("a") is None
+    assert agent.receive_input("b") == "a | b"
+
+    run_context = RunContext(compile_workflow(None, {}))
+    assert agent.receive_input("c", run_context) is None
+    assert agent.received_inputs == []
+    assert run_context.pending_inputs["Solo"] == ["c"]
+
+
+def test_switch_drops_fan_in_buffers_of_the_old_workflow():
+    """A join shared by both flows must not keep an input buffered before the switch"""
+    class SwitchToX(Agent):
+        def execute(self, user_input):
+            return {"output": user_input, "success": True, "switch_flow": "x_flow"}
+
+    manager = WorkflowManager()
+    for agent in [EchoAgent("Start", 0.0), EchoAgent("A", 0.0), EchoAgent("B", 0.0),
+                  EchoAgent("X", 0.0), EchoAgent("C", 0.0), SwitchToX("R", {})]:
+        manager.add_agent(agent)
+    manager.add_workflow("fan_flow", {"Start": ["A", "B"], "A": ["C"], "B": ["R"], "R": ["C"], "C": []})
+    manager.add_workflow("x_flow", {"X": ["C"], "C": []})
+
+    run_context = manager.run_workflow("Start", "in", run_context=manager.create_context("fan_flow"))
+
+    assert manager.agents["C"].calls == ["X(B(Start(in)))"]
+    assert run_context.final_outputs == {"C": "C(X(B(Start(in))))"}
+
+
+if __name__ == "__main__":
+    test_concurrent_runs_keep_separate_fan_in_buffers()
+    test_switch_only_affects_the_run()
+    test_retry_counters_are_per_run()
+    test_agent_without_context_keeps_instance_state()
+    test_switch_drops_fan_in_buffers_of_the_old_workflow()
+    print("✅ Run context tests passed")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming validators that abort doomed generations early
+"""
+
+import sys
+import os
+import asyncio
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import LLMAgent
+from PromptAgent import PromptAgent
+from stream_validators import reject_prefixes, require_json_object, max_chars, all_of, REFUSAL_PREFIXES
+from llm_fakes import model_config
+
+
+class ScriptedStreamHost:
+    """Backend that streams one scripted reply per request, word by word"""
+
+    def __init__(self, replies):
+        self.host = "scripted"
+        self.replies = list(replies)
+        self.sent = []      # Pieces streamed per request
+        self.closed = 0
+
+    def _pieces(self):
+        reply = self.replies.pop(0)
+        return [word + " " for word in reply.split(" ")]
+
+    def chat(self, stream=False, **kwargs):
+        assert stream
+        pieces = self._pieces()
+        self.sent.append(0)
+
+        def generate():
+            try:
+                for piece in pieces:
+                    self.sent[-1] += 1
+                    yield {"message": {"content": piece}}
+            finally:
+                self.closed += 1
+
+        return generate()
+
+    async def achat(self, stream=False, **kwargs):
+        assert stream
+        pieces = self._pieces()
+        self.sent.append(0)
+
+        async def generate():
+            try:
+                for piece in pieces:
+                    self.sent[-1] += 1
+                    yield {"message": {"content": piece}}
+            finally:
+                self.closed += 1
+
+        return generate()
+
+
+def config(backend):
+    return model_config(backend, model="gemma3:latest", temperature=0.7, top_p=0.2)
+
+
+LONG_REFUSAL = "I'm sorry, but I can't help with that. " + "More words follow here. " * 50
+
+
+def test_validators_decide_incrementally():
+    refusals = reject_prefixes(*REFUSAL_PREFIXES)
+    assert refusals("I'm") is None
+    assert refusals("I'm sorry") is False
+    assert refusals("Light travels") is True
+
+    json_object = require_json_object()
+    assert json_object("  ") is None
+    assert json_object("``") is None
+    assert json_object("```json\n{") is True
+    assert json_object("{\"analysis\"") is True
+    assert json_object("Sure! Here is") is False
+
+    combined = all_of(refusals, max_chars(20))
+    assert combined("Light is") is None
+    assert combined("Light is a wave and a particle") is False
+
+
+def test_refusal_is_aborted_and_retried():
+    backend = ScriptedStreamHost([LONG_REFUSAL, "Light is a wave?"])
+    agent = LLMAgent("Agent1", config(backend), llm_fn=lambda result: result["output"],
+                     stream_validate_fn=reject_prefixes(*REFUSAL_PREFIXES))
+
+    result = agent.run_with_retries("What is light?")
+
+    assert result == {"output": "Light is a wave?", "success": True}
+    assert backend.sent[0] <= 3             # Refusal stopped after a few pieces
+    assert backend.closed == 2
+    assert agent.get_retry_count() == 1
+
+
+def test_prompt_agent_requires_json_object():
+    backend = ScriptedStreamHost(["Sure! Here are some prompt ideas for you.",
+                                  '{"analysis": "science", "prompt_modifications": {"Agent1": "Be precise"}}'])
+    agent = PromptAgent("PromptAgent", config(backend), system="Return JSON",
+                        stream_validate_fn=require_json_object())
+
+    result = agent.run_with_retries("Explain gravity")
+
+    assert result["success"]
+    assert result["output"]["prompt_modifications"] == {"Agent1": "Be precise"}
+    assert backend.sent[0] == 1
+
+
+def test_async_stream_is_aborted():
+    backend = ScriptedStreamHost([LONG_REFUSAL])
+    agent = LLMAgent("Agent1", config(backend), stream_validate_fn=reject_prefixes("I'm sorry"))
+
+    result = asyncio.run(agent.aexecute("What is light?"))
+
+    assert not result["success"] and "error_kind" not in result
+    assert backend.sent[0] <= 3 and backend.closed == 1
+
+
+if __name__ == "__main__":
+    test_validators_decide_incrementally()
+    test_refusal_is_aborted_and_retried()
+    test_prompt_agent_requires_json_object()
+    test_async_stream_is_aborted()
+    print("✅ Stream validator tests passed")
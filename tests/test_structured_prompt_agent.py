@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for PromptAgent's schema-enforced JSON output and tolerant JSON extraction
+"""
+
+import sys
+import os
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PromptAgent import PromptAgent, extract_json
+from llm_fakes import FakeBackend, model_config
+
+
+def prompt_agent(backend, **kwargs):
+    return PromptAgent("PromptAgent", model_config(backend, temperature=0.7), system="Return JSON",
+                       target_agents={"Agent1": "Breaks down the request", "Agent2": "Explains in detail"},
+                       **kwargs)
+
+
+def test_extract_json_tolerates_fences_and_trailing_text():
+    assert extract_json('{"a": 1}') == {"a": 1}
+    assert extract_json('```json\n{"a": {"b": "}"}}\n```') == {"a": {"b": "}"}}
+    assert extract_json('Sure! Here it is: {"a": 1} Hope this helps {x}') == {"a": 1}
+    assert extract_json('{broken {"a": 2}') == {"a": 2}
+    assert extract_json("[1, 2]") is None
+    assert extract_json("no json here") is None
+
+
+def test_schema_is_sent_through_format():
+    backend = FakeBackend('{"analysis": "science", "prompt_modifications": {"Agent1": "Be precise"}, '
+                           '"workflow_suggestions": ""}')
+    result = prompt_agent(backend).execute("Explain gravity")
+
+    schema = backend.requests[0]["format"]
+    assert schema["required"] == ["analysis", "prompt_modifications", "workflow_suggestions"]
+    assert set(schema["properties"]["prompt_modifications"]["properties"]) == {"Agent1", "Agent2"}
+    assert result["success"]
+    assert result["output"]["prompt_modifications"] == {"Agent1": "Be precise"}
+
+
+def test_fenced_reply_is_parsed_without_a_schema():
+    backend = FakeBackend('```json\n{"analysis": "code", "prompt_modifications": {"Agent2": "Show code"}}\n```\n'
+                           'Let me know if you need anything else!')
+    result = prompt_agent(backend, structured_output=False).execute("Write a parser")
+
+    assert "format" not in backend.requests[0]
+    assert result["output"]["prompt_data"]["analysis"] == "code"
+    assert result["output"]["prompt_modifications"] == {"Agent2": "Show code"}
+
+
+def test_unusable_replies_degrade_to_no_modifications():
+    result = prompt_agent(FakeBackend('{"analysis": "x", "prompt_modifications": "none"}')).execute("hi")
+    assert result["output"]["prompt_modifications"] == {}
+
+    result = prompt_agent(FakeBackend("I can't produce JSON")).execute("hi")
+    assert result["output"]["prompt_data"]["analysis"] == "Could not parse structured response"
+    assert result["output"]["prompt_modifications"] == {}
+
+
+if __name__ == "__main__":
+    test_extract_json_tolerates_fences_and_trailing_text()
+    test_schema_is_sent_through_format()
+    test_fenced_reply_is_parsed_without_a_schema()
+    test_unusable_replies_degrade_to_no_modifications()
+    print("✅ Structured PromptAgent tests passed")
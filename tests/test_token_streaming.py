@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for token streaming from LLMAgent to the chat event bus
+"""
+
+import sys
+import os
+import asyncio
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Agent import LLMAgent
+from ChatInterface import ChatEventBus
+from LLMBackend import LoadBalancedBackend
+from llm_fakes import model_config
+
+
+class StreamingHost:
+    """Backend that streams a reply in pieces with a pause between them"""
+
+    def __init__(self, pieces, pause=0.05, host="stream-host"):
+        self.host = host
+        self.pieces = pieces
+        self.pause = pause
+
+    def chat(self, stream=False, **kwargs):
+        if not stream:
+            return {"message": {"content": "".join(self.pieces)}}
+        return self._stream()
+
+    def _stream(self):
+        for piece in self.pieces:
+            yield {"message": {"content": piece}, "done": False}
+            time.sleep(self.pause)
+        yield {"message": {"content": ""}, "done": True}
+
+    async def achat(self, stream=False, **kwargs):
+        if not stream:
+            return self.chat(**kwargs)
+        return self._astream()
+
+    async def _astream(self):
+        for piece in self.pieces:
+            yield {"message": {"content": piece}, "done": False}
+            await asyncio.sleep(self.pause)
+
+
+def streaming_agent(backend):
+    bus = ChatEventBus()
+    bus.enable()
+    config = model_config(backend, model="gemma3:latest", temperature=0.7, top_p=0.2, stream=True, event_bus=bus)
+    return LLMAgent("Agent2", config, llm_fn=lambda result: result["output"]), bus
+
+
+def test_tokens_are_published_as_they_arrive():
+    agent, bus = streaming_agent(StreamingHost(["Light ", "is ", "a wave."]))
+    arrivals = []
+    bus.subscribe("token", lambda event: arrivals.append((time.monotonic(), event.data)))
+
+    started = time.monotonic()
+    result = agent.execute("What is light?")
+    finished = time.monotonic()
+
+    assert result == {"output": "Light is a wave.", "success": True}
+    assert [data["content"] for _, data in arrivals] == ["Light ", "is ", "a wave.", ""]
+    assert arrivals[-1][1]["done"] and not arrivals[0][1]["done"]
+    assert len({data["stream_id"] for _, data in arrivals}) == 1
+    assert arrivals[0][0] - started < (finished - started) / 2  # First token well before the end
+
+
+def test_async_streaming_builds_full_output():
+    agent, bus = streaming_agent(StreamingHost(["a", "b", "c"], pause=0.01))
+    result = asyncio.run(agent.aexecute("letters"))
+
+    assert result["output"] == "abc"
+    tokens = [event.data for event in bus.get_events() if event.event_type == "token"]
+    assert "".join(token["content"] for token in tokens) == "abc" and tokens[-1]["done"]
+
+
+def test_streams_stay_in_flight_on_the_load_balancer():
+    balancer = LoadBalancedBackend([StreamingHost(["x", "y"], pause=0.0)])
+    stream = balancer.chat(model="m", messages=[], stream=True)
+    next(stream)
+    assert balancer.stats()["stream-host"]["in_flight"] == 1
+    list(stream)
+    assert balancer.stats()["stream-host"]["in_flight"] == 0
+
+
+if __name__ == "__main__":
+    test_tokens_are_published_as_they_arrive()
+    test_async_streaming_builds_full_output()
+    test_streams_stay_in_flight_on_the_load_balancer()
+    print("✅ Token streaming tests passed")
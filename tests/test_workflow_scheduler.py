@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded multi-run WorkflowScheduler
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add the project directory to the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+
+from Agent import Agent, LLMAgent
+from RunContext import RunContext
+from SwitchAgent import SwitchAgent
+from WorkflowManager import WorkflowManager
+from WorkflowScheduler import WorkflowScheduler, SchedulerFullError, ModelConcurrencyLimiter
+from llm_fakes import FakeBackend, model_config
+
+
+class ModelAgent(Agent):
+    """Agent that records how many calls to its model overlap"""
+
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def __init__(self, name, model, delay=0.05):
+        super().__init__(name, {"model": model}, retry_limit=1)
+        self.delay = delay
+
+    def execute(self, user_input):
+        model = self.get_model_name()
+        with ModelAgent.lock:
+            ModelAgent.active[model] = ModelAgent.active.get(model, 0) + 1
+            ModelAgent.peak[model] = max(ModelAgent.peak.get(model, 0), ModelAgent.active[model])
+        time.sleep(self.delay)
+        with ModelAgent.lock:
+            ModelAgent.active[model] -= 1
+        return {"output": f"{self.name}({user_input})", "success": True}
+
+
+def build_manager(delay=0.05):
+    ModelAgent.active.clear()
+    ModelAgent.peak.clear()
+    manager = WorkflowManager()
+    manager.add_agent(ModelAgent("Router", "small", delay))
+    manager.add_agent(ModelAgent("Worker", "big", delay))
+    manager.add_workflow("flow", {
+        "Router": ["Worker"],
+        "Worker": []
+    })
+    manager.switch_workflow("flow")
+    return manager
+
+
+def test_per_model_limits_are_respected():
+    manager = build_manager()
+    with WorkflowScheduler(manager, max_workers=6, model_limits={"big": 1, "small": 3}) as scheduler:
+        futures = [scheduler.submit("Router", f"req{i}") for i in range(6)]
+        contexts = [future.result() for future in futures]
+
+    assert ModelAgent.peak["big"] == 1
+    assert 1 < ModelAgent.peak["small"] <= 3
+    assert all(context.outputs["Worker"].startswith("Worker(Router(req") for context in contexts)
+    assert scheduler.stats()["completed"] == 6
+
+
+def test_submissions_beyond_queue_depth_are_rejected():
+    manager = build_manager(delay=0.2)
+    scheduler = WorkflowScheduler(manager, max_workers=1, max_queue_depth=1)
+    try:
+        scheduler.submit("Router", "first")
+        scheduler.submit("Router", "second")
+        try:
+            scheduler.submit("Router", "third")
+            assert False, "third submission should be shed"
+        except SchedulerFullError:
+            pass
+        assert scheduler.stats()["rejected"] == 1
+    finally:
+        scheduler.shutdown()
+
+
+def test_blocking_mode_queues_instead_of_rejecting():
+    manager = build_manager(delay=0.05)
+    with WorkflowScheduler(manager, max_workers=1, max_queue_depth=0, block_when_full=True) as scheduler:
+        futures = [scheduler.submit(input_data=f"req{i}", workflow_name="flow") for i in range(3)]
+        results = [future.result() for future in futures]
+
+    assert [context.outputs["Worker"] for context in results] == [
+        "Worker(Router(req0))", "Worker(Router(req1))", "Worker(Router(req2))"
+    ]
+    assert scheduler.stats()["rejected"] == 0
+
+
+class AsyncRacer(LLMAgent):
+    """LLMAgent racing async candidates of one model"""
+
+    def __init__(self):
+        super().__init__("Racer", {"model": "m", "race_candidates": 3}, retry_limit=1)
+
+    async def aexecute(self, user_input):
+        await asyncio.sleep(0.05)
+        return {"output": user_input, "success": True}
+
+
+def test_cancelled_async_attempts_give_their_slot_back():
+    """Race losers cancelled while waiting for the model's only slot must not keep it"""
+    limiter = ModelConcurrencyLimiter({"m": 1})
+    run_context = RunContext(None)
+    run_context.model_limiter = limiter
+    outcome = {}
+
+    def run():
+        outcome["result"] = asyncio.run(AsyncRacer().arun_with_retries("question", run_context))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive(), "event loop shutdown hung on a leaked slot"
+    assert outcome["result"]["success"]
+    assert limiter.in_flight == {"m": 0}
+    assert not limiter._waiters.get("m")
+
+
+class AsyncRouterBackend(FakeBackend):
+    """Backend answering every routing question with the same flow after a short async pause"""
+
+    async def achat(self, **kwargs):
+        await asyncio.sleep(0.001)
+        return self.chat(**kwargs)
+
+
+def run_on_small_executor(make_coroutines, workers=4, timeout=20):
+    """Runs the coroutines on one loop whose default executor has fewer threads than waiters"""
+    outcome = {}
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+        outcome["results"] = await asyncio.gather(*make_coroutines())
+
+    thread = threading.Thread(target=lambda: asyncio.run(main()), daemon=True)
+    thread.start()
+    thread.join(timeout=timeout)
+    assert not thread.is_alive(), "event loop deadlocked waiting for model slots"
+    return outcome["results"]
+
+
+def test_async_slot_waiters_do_not_hold_executor_threads():
+    """More tasks waiting for a model than executor threads must not starve the slot holder"""
+    limiter = ModelConcurrencyLimiter({"m": 1})
+    run_context = RunContext(None)
+    run_context.model_limiter = limiter
+    agent = ModelAgent("Worker", "m", delay=0.001)
+
+    results = run_on_small_executor(lambda: [agent.arun_with_retries(f"q{i}", run_context) for i in range(200)])
+
+    assert all(result["success"] for result in results)
+    assert ModelAgent.peak["m"] == 1
+    assert limiter.in_flight == {"m": 0}
+
+
+def test_many_async_switch_runs_under_a_model_limit():
+    manager = WorkflowManager()
+    manager.add_agent(SwitchAgent("SwitchAgent", model_config(AsyncRouterBackend("science_flow"), model="llama"), system="Pick a flow",
+                                  workflow_config={"use_llm_decision": True}))
+    manager.add_agent(ModelAgent("Scientist", "phi", delay=0.0))
+    manager.add_workflow("science_flow", {"Scientist": []})
+    limiter = ModelConcurrencyLimiter({"llama": 1})
+
+    def runs():
+        for i in range(100):
+            run_context = manager.create_context(start_agent="SwitchAgent")
+            run_context.model_limiter = limiter
+            yield manager.arun_workflow("SwitchAgent", f"question {i}", run_context=run_context)
+
+    results = run_on_small_executor(lambda: list(runs()))
+
+    assert all(run_context.final_outputs for run_context in results)
+    assert limiter.in_flight["llama"] == 0
+
+
+if __name__ == "__main__":
+    test_per_model_limits_are_respected()
+    test_submissions_beyond_queue_depth_are_rejected()
+    test_blocking_mode_queues_instead_of_rejecting()
+    test_cancelled_async_attempts_give_their_slot_back()
+    test_async_slot_waiters_do_not_hold_executor_threads()
+    test_many_async_switch_runs_under_a_model_limit()
+    print("✅ Workflow scheduler tests passed")